@@ -24,15 +24,11 @@ from data.data_preparation import (
     GHG_ER_RES,
     RISE_SUB_INDICATORS,
     RESULTS_TITLE_HELP,
+    WORLD_ID,
+    REGIONS_GPD,
+    REGIONS_NDC,
 )
 
-WORLD_ID = 'WD'
-# Region names in nice format
-REGIONS_GPD = dict(WD='World', SA='Central & South America', AF='Africa', AS='Asia')
-
-# code in the raw data columns
-REGIONS_NDC = dict(WD=['LA', 'SSA', 'DA'], SA='LA', AF='SSA', AS='DA')
-
 # Region names for div dynamic creation
 MAP_REGIONS = {'africa': 'AF', 'asia': 'AS', 'southamerica': 'SA'}
 
@@ -122,6 +118,15 @@ for opt in ELECTRIFICATION_OPTIONS + [NO_ACCESS] + ['total']:
     COMPARE_COLUMNS_ID.append(opt)
     COMPARE_COLUMNS_ID.append('comp_{}'.format(opt))
 
+# ids and labels of the columns of the tables of the impacts of the RISE sub-indicators
+RISE_IMPACTS_COLUMNS = [
+    ('sub_indicator_text', 'Sub-indicator'),
+    ('rise_after', 'RISE score'),
+    ('pop_offgrid', 'Change of off-grid population (million)'),
+    ('invest', 'Change of investment (billion USD)'),
+    ('ghg', 'Change of GHG emissions (million tons CO2)'),
+]
+
 
 BARPLOT_ELECTRIFICATION_COLORS = {
     GRID: '#005386',
@@ -322,7 +327,7 @@ def results_div(result_type, result_category, flex_case=''):
                     className='cell medium-1 align__right',
                     children=html.Img(
                         id='{}-results-title-help'.format(id_name),
-                        src='data:image/png;base64,{}'.format(INFO_ICON.decode()),
+                        src=INFO_ICON,
                         title=RESULTS_TITLE_HELP[result_category],
                         className='info__icon'
                     )
@@ -348,7 +353,7 @@ def results_div(result_type, result_category, flex_case=''):
                     className='cell medium-1 align__right display__none',
                     children=html.Img(
                         id='{}-results-table-title-help'.format(id_name),
-                        src='data:image/png;base64,{}'.format(INFO_ICON.decode()),
+                        src=INFO_ICON,
                         title='Hover text',
                         className='info__icon'
                     )
@@ -501,6 +506,24 @@ def sub_indicator_table(id_name, sub_df=RISE_SUB_INDICATORS):
         for i in range(len(sub_group_df.index)):
             divs.append(sub_indicator_line(id_name, texts[i], values[i], j, i))
 
+    divs.append(html.H4(className='cell', children='Impacts of answering yes in the uEA scenario'))
+    divs.append(
+        html.Div(
+            className='cell',
+            children=dash_table.DataTable(
+                id='flex-rise-{}-impacts-table'.format(id_name),
+                columns=[
+                    {'name': label, 'id': col_id} for col_id, label in RISE_IMPACTS_COLUMNS
+                ],
+                data=[],
+                style_header=TABLES_HEADER_STYLING,
+                style_cell={
+                    'fontFamily': 'roboto',
+                    'whiteSpace': 'normal',
+                },
+            )
+        )
+    )
     return divs
 
 
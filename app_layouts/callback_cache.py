@@ -0,0 +1,132 @@
+"""Memoization of the deterministic callbacks
+
+Most callbacks of the layouts are pure functions of their inputs over the static results of the
+results store. The decorator `memoize_callback` keeps their outputs in a bounded LRU cache so that
+the tables and figures are only computed once per combination of inputs.
+
+The callbacks receive their arguments from the browser as json, the key of an entry is a hash of
+the canonical json of the arguments and of the version of the results store. All the arguments
+are part of the key: the callbacks which update a copy of a component's state (e.g. the `figure`
+of a barplot) memoize a function computing the values from their inputs only, which they apply to
+the state of the session.
+
+Environment variables:
+- NDC_CALLBACK_CACHE_SIZE : maximum number of entries per callback (default 256), set to '0' to
+disable the memoization
+- NDC_CALLBACK_CACHE_TTL : lifetime of an entry in seconds (default 0, i.e. no expiry)
+"""
+import collections
+import functools
+import os
+import threading
+import time
+
+from app_server.keys import canonical_key
+
+CALLBACK_CACHE_SIZE = int(os.environ.get('NDC_CALLBACK_CACHE_SIZE', 256))
+
+CALLBACK_CACHE_TTL = float(os.environ.get('NDC_CALLBACK_CACHE_TTL', 0))
+
+# name of the callback -> its cache
+_CACHES = {}
+
+_LOCK = threading.Lock()
+
+
+class _CallbackCache(object):
+    """Thread safe LRU cache with an optional time to live and hit/miss counters."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) if key is cached and not expired, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                timestamp, value = entry
+                if not self.ttl or time.monotonic() - timestamp < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits = self.hits + 1
+                    return True, value
+                del self._entries[key]
+            self.misses = self.misses + 1
+            return False, None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+def memoize_callback(name, maxsize=None, ttl=None):
+    """Memoize the output of a deterministic callback.
+
+    To be placed below the `app.callback` decorator.
+
+    :param name: (str) unique name of the callback, used to report the cache statistics
+    :param maxsize: (int) maximum number of entries, default is CALLBACK_CACHE_SIZE
+    :param ttl: (float) lifetime of an entry in seconds, default is CALLBACK_CACHE_TTL
+    """
+    if maxsize is None:
+        maxsize = CALLBACK_CACHE_SIZE
+    if ttl is None:
+        ttl = CALLBACK_CACHE_TTL
+
+    def decorator(func):
+        # the results store is only loaded by the memoized callbacks, the statistics of the
+        # caches are available without the model data
+        from data import results_store
+
+        if maxsize <= 0:
+            return func
+
+        cache = _CallbackCache(maxsize, ttl)
+        with _LOCK:
+            # a callback registered again replaces the previous cache of the same name
+            _CACHES[name] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = canonical_key([results_store.results_version()] + list(args))
+            found, value = cache.get(key)
+            if not found:
+                value = func(*args)
+                cache.set(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def cache_stats():
+    """Return the hits, misses and size of the cache of each memoized callback."""
+    with _LOCK:
+        caches = dict(_CACHES)
+    return {name: cache.stats() for name, cache in sorted(caches.items())}
+
+
+def clear_caches():
+    """Empty the caches of all memoized callbacks."""
+    with _LOCK:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,112 @@
+"""Coalescing of the rapid successive recomputations of a session
+
+Dragging a slider of the flex page sends a request for every step of the slider, only the last one
+is displayed. Each request of a session gets a sequence number, `latest_only` waits for
+DEBOUNCE_DELAY and drops the request if a newer one of the same session arrived in the meantime,
+before and after its computation. A dropped request raises PreventUpdate so that neither its
+output nor the callbacks depending on it are updated.
+
+The sequence numbers are held in shared memory allocated when this module is imported, the workers
+forked after the import (see wsgi.py) thus see the requests of a session served by the other
+workers. The sessions are hashed in a fixed number of slots: a session which takes over the slot of
+another one only prevents the other session's requests from being dropped, never the reverse.
+
+Environment variables:
+- NDC_FLEX_DEBOUNCE : delay in seconds before a recomputation starts (default 0.1), with 0 the
+superseded requests are only dropped after their computation
+- NDC_DEBOUNCE_SLOTS : number of sessions tracked at the same time (default 4096)
+"""
+import hashlib
+import multiprocessing
+import os
+import time
+from dash.exceptions import PreventUpdate
+
+DEBOUNCE_DELAY = float(os.environ.get('NDC_FLEX_DEBOUNCE', 0.1))
+
+DEBOUNCE_SLOTS = int(os.environ.get('NDC_DEBOUNCE_SLOTS', 4096))
+
+_LOCK = multiprocessing.Lock()
+
+# slot -> (hash of the session, sequence number of its latest request)
+_SLOTS = multiprocessing.RawArray('q', 2 * DEBOUNCE_SLOTS)
+
+# numbers of completed and cancelled recomputations
+_COUNTERS = multiprocessing.RawArray('q', 2)
+COMPLETED = 0
+CANCELLED = 1
+
+
+def _session_hash(session_id):
+    """Hash a session id on 63 bits, 0 is kept for the empty slots."""
+    digest = hashlib.sha1(str(session_id).encode()).digest()
+    return (int.from_bytes(digest[:8], 'big') >> 1) or 1
+
+
+def _slot(session_hash):
+    return 2 * (session_hash % DEBOUNCE_SLOTS)
+
+
+def new_request(session_id):
+    """Record a new request of a session.
+
+    :param session_id: (str) id of the session
+    :return: the sequence number of the request
+    """
+    session_hash = _session_hash(session_id)
+    slot = _slot(session_hash)
+    with _LOCK:
+        if _SLOTS[slot] != session_hash:
+            _SLOTS[slot] = session_hash
+            _SLOTS[slot + 1] = 0
+        _SLOTS[slot + 1] = _SLOTS[slot + 1] + 1
+        return _SLOTS[slot + 1]
+
+
+def is_superseded(session_id, sequence):
+    """Return True if a newer request of the session was recorded after this one."""
+    session_hash = _session_hash(session_id)
+    slot = _slot(session_hash)
+    with _LOCK:
+        return _SLOTS[slot] == session_hash and _SLOTS[slot + 1] > sequence
+
+
+def _count(counter):
+    with _LOCK:
+        _COUNTERS[counter] = _COUNTERS[counter] + 1
+
+
+def latest_only(session_id, compute, delay=None):
+    """Run a computation unless a newer request of the same session supersedes it.
+
+    :param session_id: (str) id of the session, None to always run the computation
+    :param compute: function without arguments which returns the output of the request
+    :param delay: (float) seconds to wait for a newer request, default is DEBOUNCE_DELAY
+    :return: the output of compute
+    :raise PreventUpdate: if the request is superseded
+    """
+    if session_id is None:
+        return compute()
+    if delay is None:
+        delay = DEBOUNCE_DELAY
+
+    sequence = new_request(session_id)
+    if delay > 0:
+        time.sleep(delay)
+    if is_superseded(session_id, sequence):
+        _count(CANCELLED)
+        raise PreventUpdate
+
+    answer = compute()
+    # the newer request will send a more recent output
+    if is_superseded(session_id, sequence):
+        _count(CANCELLED)
+        raise PreventUpdate
+    _count(COMPLETED)
+    return answer
+
+
+def debounce_stats():
+    """Return the numbers of completed and cancelled recomputations of all the workers."""
+    with _LOCK:
+        return {'completed': _COUNTERS[COMPLETED], 'cancelled': _COUNTERS[CANCELLED]}
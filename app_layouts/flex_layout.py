@@ -2,14 +2,15 @@ import numpy as np
 import pandas as pd
 import dash
 from dash.dependencies import Output, Input, State
+from dash.exceptions import PreventUpdate
 import dash_core_components as dcc
 import dash_html_components as html
 import plotly.graph_objs as go
 
 from app_main import app
+from app_server.compute_pool import run_job
 
 from data.data_preparation import (
-    MIN_TIER_LEVEL,
     SCENARIOS,
     BAU_SCENARIO,
     SE4ALL_SCENARIO,
@@ -22,60 +23,40 @@ from data.data_preparation import (
     RISE_INDICES,
     POP_GET,
     _find_tier_level,
-    compute_ndc_results_from_raw_data,
     prepare_results_tables,
-    prepare_scenario_data,
-    extract_results_scenario,
     POP_RES,
     INVEST_RES,
     GHG_RES,
     GHG_ER_RES,
     RISE_SUB_INDICATOR_STRUCTURE
 )
+from data import results_store, rise_sub_indicators, rise_impacts
 
+from . import results_tables
+from .callback_cache import memoize_callback
+from .debounce import latest_only
 from .app_components import (
     results_div,
     controls_div,
-    format_percent,
-    round_digits,
     TABLES_LABEL_STYLING,
     BARPLOT_ELECTRIFICATION_COLORS,
     RES_COMPARE,
     TABLE_ROWS,
     TABLE_COLUMNS_ID,
-    COMPARE_COLUMNS_ID,
     TABLE_COLUMNS_LABEL,
-    REGIONS_NDC,
+    RISE_IMPACTS_COLUMNS,
+    round_digits,
 )
 
 URL_PATHNAME = 'flex'
 
-
-def extract_centroids(reg):
-    """Load the longitude and latitude of countries per region."""
-    if not isinstance(reg, list):
-        reg = [reg]
-    centroids = pd.read_csv('data/centroid.csv')
-    return centroids.loc[centroids.region.isin(reg)].copy()
-
-
 VIEW_COUNTRY_SELECT = 'country'
 VIEW_CONTROLS = 'general'
 VIEW_COMPARE = 'compare'
 
 
-# A dict with the data for each scenario in json format
-SCENARIOS_DATA = {
-    sce: compute_ndc_results_from_raw_data(sce, MIN_TIER_LEVEL).to_json() for sce in SCENARIOS
-}
-SCENARIOS_DATA.update(
-    {reg: extract_centroids(REGIONS_NDC[reg]).to_json() for reg in REGIONS_NDC}
-)
-
-RISE_SUB_INDICATOR_SCORES = pd.read_csv('data/RISE_subindicators_country.csv')
-
 list_countries_dropdown = []
-DF = pd.read_json(SCENARIOS_DATA[SE4ALL_SCENARIO])
+DF = results_store.scenario_results(SE4ALL_SCENARIO)
 DF = DF.sort_values('country')
 for idx, row in DF.iterrows():
     list_countries_dropdown.append({'label': row['country'], 'value': row['country_iso']})
@@ -138,10 +119,12 @@ fig_map = go.Figure(data=data, layout=layout)
 layout = html.Div(
     id='flex-main-div',
     children=[
+        # the results of the custom scenario are computed on the server, the browser only holds
+        # the parameters of the scenario
         dcc.Store(
             id='flex-store',
             storage_type='session',
-            data=SCENARIOS_DATA.copy()
+            data={'version': results_store.results_version()}
         ),
         dcc.Store(
             id='flex-view-store',
@@ -152,11 +135,6 @@ layout = html.Div(
                 'sub_indicators_change': True
             }
         ),
-        dcc.Store(
-            id='flex-rise-store',
-            storage_type='session',
-            data={}
-        ),
         html.Div(
             id='flex-main-content',
             className='grid-x',
@@ -276,6 +254,26 @@ layout = html.Div(
 )
 
 
+def flex_results(flex_data, run=None):
+    """Return the results of the custom scenario whose parameters are stored in flex-store.
+
+    The results are computed in the compute pool by the update of the flex-store and cached in
+    the results store of the worker, the other callbacks read them from that cache.
+
+    :param flex_data: (dict) the data of the flex-store
+    :param run: see `results_store.flex_scenario_results`
+    :return: a DataFrame with one row, None if no country was selected
+    """
+    if flex_data is None or flex_data.get('country_iso') is None:
+        return None
+    return results_store.flex_scenario_results(
+        flex_data['country_iso'],
+        *[flex_data.get(opt) for opt in RISE_INDICES],
+        flex_data.get('min_tier_mg_level'),
+        run=run
+    )
+
+
 def result_title_callback(app_handle, result_category):
 
     id_name = 'flex-{}-{}'.format(RES_COMPARE, result_category)
@@ -340,6 +338,27 @@ def compare_barplot_callback(app_handle, result_category):
 
     id_name = 'flex-{}-{}'.format(RES_COMPARE, result_category)
 
+    # only the values of the barplot are memoized, they are applied to the figure of the session
+    @memoize_callback('{}-barplot'.format(id_name))
+    def barplot_values(y_sel, cur_data, scenario, country_iso):
+
+        if y_sel is None:
+            idx_y = 0
+        else:
+            idx_y = TABLE_ROWS[result_category].index(y_sel)
+
+        flex_results_data = prepare_results_tables(
+            flex_results(cur_data),
+            SE4ALL_FLEX_SCENARIO,
+            result_category
+        )
+        comp_results_data = results_tables.table_numbers(
+            scenario,
+            country_iso,
+            result_category
+        )
+        return flex_results_data[idx_y], comp_results_data[idx_y]
+
     @app_handle.callback(
         Output('{}-barplot'.format(id_name), 'figure'),
         [
@@ -354,63 +373,46 @@ def compare_barplot_callback(app_handle, result_category):
     )
     def flex_update_barplot(y_sel, cur_data, scenario, country_iso, fig):
 
-        if y_sel is None:
-            idx_y = 0
-        else:
-            idx_y = TABLE_ROWS[result_category].index(y_sel)
+        if scenario is None or country_iso is None or flex_results(cur_data) is None:
+            raise PreventUpdate
 
-        if scenario is not None and country_iso is not None:
+        y_flex, y_comp = barplot_values(y_sel, cur_data, scenario, country_iso)
 
-            df_flex = pd.read_json(cur_data[SE4ALL_FLEX_SCENARIO])
-            df_comp = pd.read_json(cur_data[scenario])
-            # narrow to the country's results
-            df_flex = df_flex.loc[df_flex.country_iso == country_iso]
-            df_comp = df_comp.loc[df_comp.country_iso == country_iso]
+        x = [opt.upper() for opt in ELECTRIFICATION_OPTIONS] + [NO_ACCESS]
 
-            flex_results_data = prepare_results_tables(
-                df_flex,
-                SE4ALL_FLEX_SCENARIO,
-                result_category
-            )
-            comp_results_data = prepare_results_tables(df_comp, scenario, result_category)
-
-            x = [opt.upper() for opt in ELECTRIFICATION_OPTIONS] + [NO_ACCESS]
-            y_flex = flex_results_data[idx_y]
-            y_comp = comp_results_data[idx_y]
-
-            fs = 12
-
-            fig.update(
-                {'data': [
-                    go.Bar(
-                        x=x,
-                        y=y_flex,
-                        text=[FLEX_SCENARIO_NAME for i in range(4)],
-                        name=SE4ALL_FLEX_SCENARIO,
-                        showlegend=False,
-                        insidetextfont={'size': fs, 'color': 'white'},
-                        textposition='inside',
-                        marker=dict(
-                            color=list(BARPLOT_ELECTRIFICATION_COLORS.values())
-                        ),
-                        hoverinfo='y+text'
+        fs = 12
+
+        fig.update(
+            {'data': [
+                go.Bar(
+                    x=x,
+                    y=y_flex,
+                    text=[FLEX_SCENARIO_NAME for i in range(4)],
+                    name=SE4ALL_FLEX_SCENARIO,
+                    showlegend=False,
+                    insidetextfont={'size': fs, 'color': 'white'},
+                    textposition='inside',
+                    marker=dict(
+                        color=list(BARPLOT_ELECTRIFICATION_COLORS.values())
                     ),
-                    go.Bar(
-                        x=x,
-                        y=y_comp,
-                        text=[SCENARIOS_DICT[scenario] for i in range(4)],
-                        name=scenario,
-                        showlegend=False,
-                        insidetextfont={'size': fs, 'color': 'white'},
-                        textposition='inside',
-                        marker=dict(
-                            color=['#a062d0', '#9ac1e5', '#f3a672', '#cccccc']
-                        ),
-                        hoverinfo='y+text'
+                    hoverinfo='y+text'
+                ),
+                go.Bar(
+                    x=x,
+                    y=y_comp,
+                    text=[SCENARIOS_DICT[scenario] for i in range(4)],
+                    name=scenario,
+                    showlegend=False,
+                    insidetextfont={'size': fs, 'color': 'white'},
+                    textposition='inside',
+                    marker=dict(
+                        color=['#a062d0', '#9ac1e5', '#f3a672', '#cccccc']
                     ),
-                ]
-                }
-            )
+                    hoverinfo='y+text'
+                ),
+            ]
+            }
+        )
         return fig
 
     flex_update_barplot.__name__ = 'flex_update_%s_barplot' % id_name
@@ -430,6 +432,7 @@ def compare_table_callback(app_handle, result_category):
         ],
         [State('flex-country-input', 'value')]
     )
+    @memoize_callback('{}-results-table'.format(id_name))
     def flex_update_table(cur_data, scenario, country_iso):
         """Display information and study's results comparison between countries."""
         answer_table = []
@@ -437,13 +440,8 @@ def compare_table_callback(app_handle, result_category):
         result_cat = result_category
 
         # extract the data from the selected scenario if a country was selected
-        if scenario is not None and country_iso is not None:
-
-            df_flex = pd.read_json(cur_data[SE4ALL_FLEX_SCENARIO])
-            df_comp = pd.read_json(cur_data[scenario])
-            # narrow to the country's results
-            df_flex = df_flex.loc[df_flex.country_iso == country_iso]
-            df_comp = df_comp.loc[df_comp.country_iso == country_iso]
+        df_flex = flex_results(cur_data)
+        if scenario is not None and country_iso is not None and df_flex is not None:
 
             ghg_er = False
             if result_cat == GHG_RES:
@@ -456,43 +454,11 @@ def compare_table_callback(app_handle, result_category):
                 result_cat,
                 ghg_er
             )
-            comp_results_data = prepare_results_tables(
-                df_comp,
-                scenario,
-                result_cat,
-                ghg_er
-            )
-
-            flex_total = np.nansum(flex_results_data, axis=0)
-            comp_total = np.nansum(comp_results_data, axis=0)
 
-            results_data = np.hstack([flex_results_data, comp_results_data])
-
-            comp_ids = ['comp_{}'.format(c) for c in ELECTRIFICATION_OPTIONS] \
-                + ['comp_{}'.format(NO_ACCESS)]
-            # prepare a DataFrame
-            results_data = pd.DataFrame(
-                data=results_data,
-                columns=ELECTRIFICATION_OPTIONS + [NO_ACCESS] + comp_ids
+            answer_table = results_tables.merge_compare_rows(
+                results_tables.format_table(flex_results_data, result_cat),
+                results_tables.formatted_rows(scenario, country_iso, result_cat, ghg_er)
             )
-            # sums of the rows
-            results_data['total'] = pd.Series(flex_total)
-            results_data['comp_total'] = pd.Series(comp_total)
-            # Format the digits
-            if result_cat == POP_RES:
-                results_data.iloc[1:, 0:] = results_data.iloc[1:, 0:].applymap(
-                    round_digits
-                )
-                results_data.iloc[0, 0:] = results_data.iloc[0, 0:].map(
-                    format_percent
-                )
-            else:
-                results_data = results_data.applymap(round_digits)
-            # label of the table rows
-            table_rows = TABLE_ROWS[result_cat]
-            results_data['labels'] = pd.Series(table_rows)
-
-            answer_table = results_data[COMPARE_COLUMNS_ID].to_dict('records')
         return answer_table
 
     flex_update_table.__name__ = 'flex_update_%s_table' % id_name
@@ -680,112 +646,144 @@ def rise_sub_indicator_button_style_callback(app_handle, id_name):
     return rise_update_button_style
 
 
+def rise_sub_indicator_ids(id_name):
+    """Ids of the toggles of the RISE sub-indicators questions of an electrification option."""
+    return [
+        'flex-rise-{}-sub-group{}-{}-toggle'.format(id_name, p, q)
+        for p, m in enumerate(RISE_SUB_INDICATOR_STRUCTURE[id_name])
+        for q in range(m)
+    ]
+
+
+def rise_sub_indicator_defaults(country_iso, id_name):
+    """Values of the toggles of the RISE sub-indicators questions given the country's answers.
+
+    :param country_iso: iso code of the country
+    :param id_name: one the ELECTRIFICATION_OPTIONS
+    :return: the values of the toggles, in the order of `rise_sub_indicator_ids`
+    """
+    return rise_sub_indicators.country_toggle_values(country_iso, id_name)
+
+
+def compute_rise_score(id_name, sub_indicator_values):
+    """Compute the RISE score of an electrification option from its sub-indicators values.
+
+    The RISE score is the average over the sub-indicators groups of the sum of the values of the
+    questions of each group.
+    """
+    answers = [0 if v is None or v == 0 else 1 for v in sub_indicator_values]
+    return float(rise_sub_indicators.option_rise_scores(id_name, answers))
+
+
 def rise_update_scores(app_handle, id_name):
 
     @app_handle.callback(
         Output('flex-rise-{}-input'.format(id_name), 'value'),
-        [
-            Input('flex-country-input', 'value'),
-            Input('flex-rise-store', 'data')
-        ],
-        [
-            State('flex-store', 'data'),
-            State('flex-view-store', 'data'),
-            State('flex-rise-{}-input'.format(id_name), 'value')
-        ]
+        [Input(toggle_id, 'value') for toggle_id in rise_sub_indicator_ids(id_name)],
+        [State('flex-country-input', 'value')]
     )
-    def flex_update_rise_value(country_iso, cur_rise_data, cur_data, cur_view, cur_val):
-        ctx = dash.callback_context
-        answer = cur_val
-        if ctx.triggered:
-            prop_id = ctx.triggered[0]['prop_id']
-            # trigger comes from selecting a country
-            if 'country-input' in prop_id:
-                if country_iso is not None:
-                    df = pd.read_json(cur_data[SE4ALL_SCENARIO])
-                    answer = df.loc[
-                        df.country_iso == country_iso, 'rise_{}'.format(id_name)
-                    ].values[0]
-            if 'rise-store' in prop_id:
-                answer = cur_rise_data.get(id_name)
-
-        if answer is None:
-            answer = cur_val
-        return answer
+    def flex_update_rise_value(*args):
+        """Compute the RISE score from the values of all the sub-indicators at once."""
+        country_iso = args[-1]
+        if country_iso is None:
+            raise PreventUpdate
+        return compute_rise_score(id_name, args[:-1])
 
     flex_update_rise_value.__name__ = 'flex_update_rise_%s_value' % id_name
     return flex_update_rise_value
 
 
-def rise_update_set_all_upon_country_selection(app_handle, id_name):
+def rise_update_set_all_upon_country_selection(app_handle):
     """When a country is selected, the rise subindicators values are displayed
 
     :param app_handle:
-    :param id_name:
     :return:
     """
     @app_handle.callback(
-        Output('flex-rise-{}-general-toggle'.format(id_name), 'value'),
+        [
+            Output('flex-rise-{}-general-toggle'.format(id_name), 'value')
+            for id_name in ELECTRIFICATION_OPTIONS
+        ],
         [Input('flex-country-input', 'value')]
     )
     def flex_update_set_all(_):
-        return -1  # correspond to default value of the dropdown
+        # correspond to default value of the dropdown
+        return [-1 for _ in ELECTRIFICATION_OPTIONS]
 
-    flex_update_set_all.__name__ = 'flex_update_set_all_{}'.format(id_name)
     return flex_update_set_all
 
 
-def rise_update_subscore_values(app_handle, id_name, p, q):
-    """Update the values of the RISE subindicators upon country selection
+def rise_update_subscore_values(app_handle, id_name):
+    """Update the values of all the RISE subindicators of an option upon country selection
 
         flex-country-input triggers the callback rise_update_set_all_upon_country_selection
         which triggers this call back
     :param app_handle: handle to the dash app
     :param id_name: one the ELECTRIFICATION_OPTIONS
-    :param p: the index of the rise sub-indicator's group
-    :param q: the index of the question within the rise sub-indicator's group
     :return: callback function
     """
     @app_handle.callback(
-        Output('flex-rise-{}-sub-group{}-{}-toggle'.format(id_name, p, q), 'value'),
+        [Output(toggle_id, 'value') for toggle_id in rise_sub_indicator_ids(id_name)],
         [
             Input('flex-rise-{}-general-toggle'.format(id_name), 'value'),
         ],
-        [
-            State('flex-country-input', 'value'),
-            State('flex-rise-store', 'data')
-        ]
+        [State('flex-country-input', 'value')]
     )
-    def flex_update_subscore_value(set_all, country_iso, cur_rise_data):
-        answer = 0
+    def flex_update_subscore_values(set_all, country_iso):
+        n_questions = sum(RISE_SUB_INDICATOR_STRUCTURE[id_name])
+        answer = [0 for _ in range(n_questions)]
         if set_all is not None and country_iso is not None:
             if set_all == 1:
-                answer = float(1./RISE_SUB_INDICATOR_STRUCTURE[id_name][p])
-            elif set_all == 0:
-                answer = 0
+                answer = [
+                    float(1. / m)
+                    for m in RISE_SUB_INDICATOR_STRUCTURE[id_name]
+                    for _ in range(m)
+                ]
             elif set_all == -1:
-                # select country
-                sub_df = RISE_SUB_INDICATOR_SCORES.loc[
-                    RISE_SUB_INDICATOR_SCORES.country_iso == country_iso
-                    ]
-                # select electrification option
-                sub_df = sub_df.loc[sub_df.indicator == 'rise_{}'.format(id_name)]
-                # select sub-indicator group
-                sub_group = sub_df.sub_indicator_group.unique()[p]
-                sub_df = sub_df.loc[sub_df.sub_indicator_group == sub_group]
-                # select question within sub-indicator group
-                value = sub_df.iloc[q].value
-
-                if value:
-                    answer = float(1. / value)
+                answer = rise_sub_indicator_defaults(country_iso, id_name)
         return answer
 
-    flex_update_subscore_value.__name__ = 'flex_update_subscore_value_{}_{}_{}'.format(
-        id_name,
-        p,
-        q
+    flex_update_subscore_values.__name__ = 'flex_update_subscore_values_{}'.format(id_name)
+    return flex_update_subscore_values
+
+
+def rise_impacts_rows(country_iso, id_name, n=5):
+    """Rows of the table of the questions of an option which shift the most people off-grid.
+
+    :param country_iso: iso code of the country
+    :param id_name: one the ELECTRIFICATION_OPTIONS
+    :param n: (int) maximum number of rows
+    :return: the rows of the table as a list of dicts with the ids of RISE_IMPACTS_COLUMNS
+    """
+    impacts = rise_impacts.country_impacts(
+        country_iso,
+        rise_impacts.POP_OFFGRID_IMPACT,
+        'rise_{}'.format(id_name),
+        n
+    )
+    impacts['pop_offgrid'] = impacts.pop_offgrid * 1e-6
+    impacts['invest'] = impacts.invest * 1e-9
+    impacts['ghg'] = impacts.ghg * 1e-6
+    for col_id in ['rise_after', 'pop_offgrid', 'invest', 'ghg']:
+        impacts[col_id] = impacts[col_id].map(round_digits)
+    return impacts[[col_id for col_id, _ in RISE_IMPACTS_COLUMNS]].to_dict('records')
+
+
+def rise_impacts_callback(app_handle, id_name):
+
+    @app_handle.callback(
+        Output('flex-rise-{}-impacts-table'.format(id_name), 'data'),
+        [Input('flex-country-input', 'value')]
     )
-    return flex_update_subscore_value
+    @memoize_callback('flex-rise-{}-impacts'.format(id_name))
+    def flex_update_rise_impacts(country_iso):
+        """Look up the precomputed impacts of the questions answered with no by the country."""
+        if country_iso is None:
+            return []
+        return rise_impacts_rows(country_iso, id_name)
+
+    flex_update_rise_impacts.__name__ = 'flex_update_rise_%s_impacts' % id_name
+    return flex_update_rise_impacts
 
 
 def callbacks(app_handle):
@@ -804,10 +802,10 @@ def callbacks(app_handle):
         rise_sub_indicator_display_callback(app_handle, opt)
         rise_update_scores(app_handle, opt)
         rise_sub_indicator_button_style_callback(app_handle, opt)
-        rise_update_set_all_upon_country_selection(app_handle, opt)
-        for p, m in enumerate(RISE_SUB_INDICATOR_STRUCTURE[opt]):
-            for q in range(m):
-                rise_update_subscore_values(app_handle, opt, p, q)
+        rise_update_subscore_values(app_handle, opt)
+        rise_impacts_callback(app_handle, opt)
+
+    rise_update_set_all_upon_country_selection(app_handle)
 
     @app_handle.callback(
         Output('flex-view-store', 'data'),
@@ -890,7 +888,8 @@ def callbacks(app_handle):
         ],
         [
             State('flex-country-input', 'value'),
-            State('flex-store', 'data')
+            State('flex-store', 'data'),
+            State('session-store', 'data')
         ]
     )
     def flex_update_flex_store(
@@ -900,9 +899,16 @@ def callbacks(app_handle):
             min_tier_mg_level,
             min_tier_shs_level,
             country_iso,
-            flex_data
+            flex_data,
+            session_id
     ):
-        """Recompute the exogenous results with the updated RISE scores"""
+        """Store the parameters of the custom scenario, its results are computed on the server
+
+        The requests sent while a slider is dragged are coalesced, only the latest one of the
+        session (see the session-store of index.py) updates the store.
+        """
+        if flex_data is None:
+            flex_data = {}
         if rise_grid is not None:
             flex_data.update({'rise_grid': rise_grid})
         if rise_mg is not None:
@@ -914,74 +920,17 @@ def callbacks(app_handle):
         if min_tier_shs_level is not None:
             flex_data.update({'min_tier_shs_level': min_tier_shs_level})
 
-        if country_iso is not None:
-            min_tier_mg_level = flex_data.get('min_tier_mg_level')
-            # Load data from csv
-            df = pd.read_json(flex_data[SE4ALL_SCENARIO])
-            for opt in RISE_INDICES:
-                if opt in flex_data:
-                    df.loc[df.country_iso == country_iso, opt] = flex_data[opt]
-            # restrict recalculation to one country to save time
-            df = df.loc[df.country_iso == country_iso]
-            # Compute endogenous results for the given scenario
-            df = prepare_scenario_data(
-                df,
-                SE4ALL_SCENARIO,
-                min_tier_mg_level,
-                prepare_endogenous=True
-            )
-            # Compute the exogenous results
-            df = extract_results_scenario(df, SE4ALL_SCENARIO, min_tier_mg_level)
-            flex_data.update({SE4ALL_FLEX_SCENARIO: df.to_json()})
-            flex_data.update({'country_name': df.country.values[0]})
-
-        return flex_data
-
-    # prepare the inputs of the RISE sub indicators
-    sub_indicators_inputs = []
-    sub_indicators_num = {}
-    num = 0
-    for opt in ELECTRIFICATION_OPTIONS:
-        sub_indicators_num[opt] = [num]
-        for p, m in enumerate(RISE_SUB_INDICATOR_STRUCTURE[opt]):
-            for q in range(m):
-                sub_indicators_inputs.append(
-                    Input('flex-rise-{}-sub-group{}-{}-toggle'.format(opt, p, q), 'value')
-                )
-                num = num + 1
-        sub_indicators_num[opt].append(num)
-
-    @app_handle.callback(
-        Output('flex-rise-store', 'data'),
-        sub_indicators_inputs
-    )
-    def flex_update_rise_sub_indicators(*args):
-        """Change the display of results-div between the app's views."""
-
-        cur_rise_data = {}
-
-        for id_name in ELECTRIFICATION_OPTIONS:
-
-            # find the position of the sub-indicators values in the arguments' list
-            idx_start, idx_end = sub_indicators_num[id_name]
-            sub_indicator_values = args[idx_start:idx_end]
-
-            rise_score = 0
-            idx = 0
-            n_sub_groups = len(RISE_SUB_INDICATOR_STRUCTURE[id_name])
-            for j, n in enumerate(RISE_SUB_INDICATOR_STRUCTURE[id_name]):
-                sub_indicator_value = 0
-                for i in range(n):
-                    sub_indicator_value = sub_indicator_value + sub_indicator_values[idx]
-                    idx = idx + 1
-                rise_score = rise_score + sub_indicator_value / n_sub_groups
-            rise_score = (100 * rise_score)
-
-            # round the total score to 100 if it was 99.999999 due to floating point error
-            if 100 - rise_score < 1e-5:
-                rise_score = 100
-            cur_rise_data[id_name] = round(rise_score, 2)
-        return cur_rise_data
+        def update_results():
+            if country_iso is not None:
+                flex_data.update({'country_iso': country_iso})
+                # the results are computed in the compute pool and cached in this worker for the
+                # other callbacks, whichever the kind of pool
+                df = flex_results(flex_data, run=run_job)
+                flex_data.update({'country_name': df.country.values[0]})
+            flex_data.update({'version': results_store.results_version()})
+            return flex_data
+
+        return latest_only(session_id, update_results)
 
 
 if __name__ == '__main__':
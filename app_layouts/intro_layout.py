@@ -59,7 +59,7 @@ citation_content = [
     html.Div(
         className='medium-offset-1 medium-4',
         children=html.A(href=location, children=html.Img(
-            src='data:image/png;base64,{}'.format(REPORT_IMG.decode()),
+            src=REPORT_IMG,
         ))
     ),
 
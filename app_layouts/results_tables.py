@@ -0,0 +1,181 @@
+"""Index of the results tables of every country and region
+
+The numbers and the formatted rows of the results tables only depend on the entity (a country or
+a region), the scenario, the result category and whether the emissions reductions are displayed.
+They are computed once for all the entities at warm-up, the table callbacks of the layouts then
+only look them up. The comparison tables are assembled from the rows of the two entities.
+
+Environment variables:
+- NDC_TABLES_WORKERS : number of processes used to build the index (default 1)
+"""
+import concurrent.futures
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from data import results_store, snapshot
+from data.data_preparation import (
+    SCENARIOS,
+    ELECTRIFICATION_OPTIONS,
+    NO_ACCESS,
+    POP_RES,
+    INVEST_RES,
+    GHG_RES,
+    GHG_ER_RES,
+    REGIONS_NDC,
+)
+
+from .app_components import (
+    round_digits,
+    format_percent,
+    TABLE_ROWS,
+    TABLE_COLUMNS_ID,
+    COMPARE_COLUMNS_ID,
+)
+
+TABLES_WORKERS = int(os.environ.get('NDC_TABLES_WORKERS', 1))
+
+# (result category, ghg_er) displayed in the tables
+TABLE_CATEGORIES = [
+    (POP_RES, False),
+    (INVEST_RES, False),
+    (GHG_RES, False),
+    (GHG_ER_RES, True),
+]
+
+_LOCK = threading.Lock()
+
+# (scenario, entity, result category, ghg_er) -> (numbers, formatted rows)
+_TABLES = {}
+
+
+def format_table(results_data, result_category):
+    """Format the numbers of a results table.
+
+    :param results_data: output of `prepare_results_tables`
+    :param result_category: (str) one of the result categories of TABLE_ROWS
+    :return: the rows of the table as a list of dicts, with the labels and the sums of the rows
+    """
+    total = np.nansum(results_data, axis=1)
+    # prepare a DataFrame
+    results_data = pd.DataFrame(
+        data=results_data,
+        columns=ELECTRIFICATION_OPTIONS + [NO_ACCESS]
+    )
+    # sums of the rows
+    results_data['total'] = pd.Series(total)
+
+    # Format the digits
+    if result_category == POP_RES:
+        results_data.iloc[1:, 0:] = results_data.iloc[1:, 0:].applymap(round_digits)
+        results_data.iloc[0, 0:] = results_data.iloc[0, 0:].map(format_percent)
+    else:
+        results_data = results_data.applymap(round_digits)
+    # label of the table rows
+    results_data['labels'] = pd.Series(TABLE_ROWS[result_category])
+    return results_data.to_dict('records')
+
+
+def merge_compare_rows(rows, comp_rows):
+    """Assemble the rows of a comparison table from the rows of two entities."""
+    answer = []
+    for row, comp_row in zip(rows, comp_rows):
+        row = dict(row)
+        row.update({'comp_{}'.format(k): v for k, v in comp_row.items() if k != 'labels'})
+        answer.append({k: row[k] for k in COMPARE_COLUMNS_ID})
+    return answer
+
+
+def _build_tables(entities):
+    """Compute the tables of a list of entities for all scenarios and result categories."""
+    tables = {}
+    for entity in entities:
+        for sce in SCENARIOS:
+            for result_category, ghg_er in TABLE_CATEGORIES:
+                results_data = results_store.results_table(
+                    sce,
+                    entity,
+                    result_category,
+                    ghg_er
+                )
+                tables[(sce, entity, result_category, ghg_er)] = (
+                    results_data,
+                    format_table(results_data, result_category)
+                )
+    return tables
+
+
+def build_tables_index(workers=None):
+    """Compute the tables of all countries and regions.
+
+    :param workers: (int) number of processes, default is TABLES_WORKERS
+    :return: a dict with (scenario, entity, result category, ghg_er) as keys
+    """
+    if workers is None:
+        workers = TABLES_WORKERS
+
+    entities = list(REGIONS_NDC) \
+        + results_store.scenario_results(SCENARIOS[0]).country_iso.tolist()
+
+    if workers <= 1:
+        return _build_tables(entities)
+
+    chunks = [entities[i::workers] for i in range(workers)]
+    tables = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_tables in executor.map(_build_tables, chunks):
+            tables.update(chunk_tables)
+    return tables
+
+
+def warm_up(workers=None):
+    """Build the index of the tables, only the first call in a process has an effect.
+
+    :param workers: (int) number of processes, default is TABLES_WORKERS
+    """
+    with _LOCK:
+        if _TABLES:
+            return
+        _TABLES.update(
+            snapshot.cached(
+                'results_tables-{}'.format(results_store.results_version()),
+                lambda: build_tables_index(workers)
+            )
+        )
+
+
+def _lookup(scenario, entity, result_category, ghg_er):
+    warm_up()
+    key = (scenario, entity, result_category, ghg_er)
+    if key not in _TABLES:
+        # entities which are not in the index are computed on demand
+        return _build_tables([entity])[key]
+    return _TABLES[key]
+
+
+def table_numbers(scenario, entity, result_category, ghg_er=False):
+    """Return the numbers of the results table of a country or a region."""
+    return np.array(_lookup(scenario, entity, result_category, ghg_er)[0])
+
+
+def formatted_rows(scenario, entity, result_category, ghg_er=False):
+    """Return the formatted rows of a country or a region with all the columns."""
+    return [dict(row) for row in _lookup(scenario, entity, result_category, ghg_er)[1]]
+
+
+def table_rows(scenario, entity, result_category, ghg_er=False):
+    """Return the formatted rows of the results table of a country or a region."""
+    columns = TABLE_COLUMNS_ID[result_category]
+    return [
+        {k: row[k] for k in columns}
+        for row in _lookup(scenario, entity, result_category, ghg_er)[1]
+    ]
+
+
+def compare_rows(scenario, entity, comp_entity, result_category, ghg_er=False):
+    """Return the formatted rows of the table comparing an entity to another one."""
+    return merge_compare_rows(
+        formatted_rows(scenario, entity, result_category, ghg_er),
+        formatted_rows(scenario, comp_entity, result_category, ghg_er)
+    )
@@ -1,17 +1,19 @@
-import base64
+import json
 import os
+import threading
 import numpy as np
-import pandas as pd
 import dash
 from dash.dependencies import Output, Input, State
+from dash.exceptions import PreventUpdate
 import dash_core_components as dcc
 import dash_html_components as html
+import plotly
 import plotly.graph_objs as go
 
 from app_main import app, APP_BG_COLOR
+from app_server.images import image_url
 
 from data.data_preparation import (
-    MIN_TIER_LEVEL,
     SCENARIOS,
     BAU_SCENARIO,
     SCENARIOS_DESCRIPTIONS,
@@ -22,19 +24,18 @@ from data.data_preparation import (
     ELECTRIFICATION_DICT,
     NO_ACCESS,
     POP_GET,
-    EXO_RESULTS,
     POP_RES,
     INVEST_RES,
     GHG_RES,
     GHG_ER_RES,
-    compute_ndc_results_from_raw_data,
-    prepare_results_tables,
 )
+from data import results_store, snapshot
 
+from . import results_tables
+from .callback_cache import memoize_callback
 from .app_components import (
     results_div,
     map_div,
-    round_digits,
     format_percent,
     TABLES_LABEL_STYLING,
     BARPLOT_ELECTRIFICATION_COLORS,
@@ -43,7 +44,6 @@ from .app_components import (
     RES_COUNTRY,
     TABLE_ROWS,
     TABLE_COLUMNS_ID,
-    COMPARE_COLUMNS_ID,
     TABLE_COLUMNS_LABEL,
     BARPLOT_YAXIS_OPT,
     BARPLOT_INVEST_YLABEL,
@@ -57,39 +57,34 @@ from .app_components import (
 
 URL_PATHNAME = 'static'
 
-
-def extract_centroids(reg):
-    """Load the longitude and latitude of countries per region."""
-    if not isinstance(reg, list):
-        reg = [reg]
-    centroids = pd.read_csv('data/centroid.csv')
-    return centroids.loc[centroids.region.isin(reg)].copy()
-
-
 VIEW_GENERAL = 'general'
 VIEW_COUNTRY = 'specific'
 VIEW_AGGREGATE = 'aggregate'
 VIEW_COMPARE = 'compare'
 
-# A dict with the data for each scenario in json format
-SCENARIOS_DATA = {
-    sce: compute_ndc_results_from_raw_data(sce, MIN_TIER_LEVEL).to_json() for sce in SCENARIOS
-}
-SCENARIOS_DATA.update(
-    {reg: extract_centroids(REGIONS_NDC[reg]).to_json() for reg in REGIONS_NDC}
-)
-
-
 # list all region and countries to sompare with a single country
 COMPARE_OPTIONS = []
-for _, r in pd.read_json(SCENARIOS_DATA[BAU_SCENARIO]).sort_values('country').iterrows():
+for _, r in results_store.scenario_results(BAU_SCENARIO).sort_values('country').iterrows():
     COMPARE_OPTIONS.append({'label': r['country'], 'value': r['country_iso']})
 COMPARE_OPTIONS = [{'label': v, 'value': k} for k, v in REGIONS_GPD.items()] + COMPARE_OPTIONS
 
+# categories and types of the results panels
+RESULTS_CATEGORIES = [POP_RES, INVEST_RES, GHG_RES]
+RESULTS_TYPES = [RES_COUNTRY, RES_AGGREGATE, RES_COMPARE]
+
 # colors for hightlight of comparison
 COLOR_BETTER = '#218380'
 COLOR_WORSE = '#8F2D56'
 
+# draw the bar plots of the maps with one trace per electrification option, set the environment
+# variable NDC_MAP_SINGLE_TRACE to '0' to draw one trace per country and option
+MAP_SINGLE_TRACE = os.environ.get('NDC_MAP_SINGLE_TRACE', '1') != '0'
+
+_MAP_FIGURES_LOCK = threading.Lock()
+
+# (region, scenario) -> figure of the map, as a dict of json types
+_MAP_FIGURES = {}
+
 
 def country_hover_text(input_df):
     """Format the text displayed by the hover."""
@@ -181,10 +176,12 @@ MAP_LAYOUTS = {
 layout = html.Div(
     id='main-div',
     children=[
+        # the results are resolved on the server, the browser only holds the version of the
+        # results and the country selected on the maps
         dcc.Store(
             id='data-store',
             storage_type='session',
-            data=SCENARIOS_DATA.copy()
+            data={'version': results_store.results_version(), 'selected_country': None}
         ),
         dcc.Store(
             id='view-store',
@@ -360,6 +357,28 @@ layout = html.Div(
     ]
 )
 
+def barplot_yaxis_label(result_category, y_sel):
+    """Return the label of the y axis of a barplot of a result category."""
+    if result_category == INVEST_RES:
+        return BARPLOT_INVEST_YLABEL
+    if result_category == GHG_RES:
+        return BARPLOT_GHG_YLABEL
+    return y_sel
+
+
+def set_barplot_yaxis_label(fig, yaxis_label):
+    """Set the label of the y axis of a barplot figure."""
+    fig['layout'].update(
+        {
+            'yaxis': go.layout.YAxis(
+                title=go.layout.yaxis.Title(
+                    text=yaxis_label,
+                )
+            )
+        }
+    )
+
+
 # Barplot and results callbacks for single country
 
 
@@ -370,132 +389,51 @@ def country_barplot_callback(app_handle, result_category):
 
     result_cat = result_category
 
-    @app_handle.callback(
-        Output('{}-barplot'.format(id_name), 'figure'),
-        [
-            Input('country-input', 'value'),
-            Input('{}-barplot-yaxis-input'.format(id_name), 'value')
-        ],
-        [
-            State('data-store', 'data'),
-            State('{}-barplot'.format(id_name), 'figure')
-        ]
-    )
-    def update_barplot(country_sel, y_sel, cur_data, fig):
+    # only the values of the barplot are memoized, they are applied to the figure of the session
+    @memoize_callback('{}-barplot'.format(id_name))
+    def barplot_values(country_iso, y_sel):
 
         if y_sel is None:
             idx_y = 0
         else:
             idx_y = TABLE_ROWS[result_category].index(y_sel)
 
-        country_iso = country_sel
-        if country_iso is not None:
-            x_vals = [SCENARIOS_DICT[sce] for sce in SCENARIOS]
-            y_vals = []
-            for sce_id, sce in enumerate(SCENARIOS):
-
-                df = pd.read_json(cur_data[sce])
-                # narrow to the country's results
-                df = df.loc[df.country_iso == country_iso]
-                # extract the results formatted with good units
-                results_data = prepare_results_tables(df, sce, result_category)
-                # select the row corresponding to the barplot y axis choice
-                y_vals.append(results_data[idx_y])
-
-            y_vals = np.vstack(y_vals)
-
-            for j, opt in enumerate(BARPLOT_YAXIS_OPT[result_cat]):
-                fig['data'][j].update({'x': x_vals})
-                fig['data'][j].update({'y': y_vals[:, j]})
-
-            if result_cat == INVEST_RES:
-                yaxis_label = BARPLOT_INVEST_YLABEL
-            elif result_cat == GHG_RES:
-                yaxis_label = BARPLOT_GHG_YLABEL
-            else:
-                yaxis_label = y_sel
-
-            fig['layout'].update(
-                {
-                    'yaxis': go.layout.YAxis(
-                        title=go.layout.yaxis.Title(
-                            text=yaxis_label,
-                        )
-                    )
-                }
-            )
-
-        return fig
-
-    update_barplot.__name__ = 'update_%s_barplot' % id_name
-
-    return update_barplot
-
-
-def country_table_callback(app_handle, result_category):
-    """Generate a callback for input components."""
+        x_vals = [SCENARIOS_DICT[sce] for sce in SCENARIOS]
+        y_vals = []
+        for sce_id, sce in enumerate(SCENARIOS):
+            # extract the country's results formatted with good units
+            results_data = results_tables.table_numbers(sce, country_iso, result_category)
+            # select the row corresponding to the barplot y axis choice
+            y_vals.append(results_data[idx_y])
 
-    id_name = '{}-{}'.format(RES_COUNTRY, result_category)
+        return x_vals, np.vstack(y_vals), barplot_yaxis_label(result_cat, y_sel)
 
     @app_handle.callback(
-        Output('{}-results-table'.format(id_name), 'data'),
+        Output('{}-barplot'.format(id_name), 'figure'),
         [
             Input('country-input', 'value'),
-            Input('scenario-input', 'value'),
+            Input('{}-barplot-yaxis-input'.format(id_name), 'value')
         ],
-        [State('data-store', 'data')]
+        [State('{}-barplot'.format(id_name), 'figure')]
     )
-    def update_table(
-            country_iso,
-            scenario,
-            cur_data,
-    ):
-        """Display information and study's results for a country."""
+    def update_barplot(country_sel, y_sel, fig):
 
-        result_cat = result_category
+        if country_sel is None:
+            raise PreventUpdate
 
-        answer_table = []
-        if country_iso is not None:
-            if scenario in SCENARIOS:
+        x_vals, y_vals, yaxis_label = barplot_values(country_sel, y_sel)
 
-                df = pd.read_json(cur_data[scenario])
-                df = df.loc[df.country_iso == country_iso]
+        for j, opt in enumerate(BARPLOT_YAXIS_OPT[result_cat]):
+            fig['data'][j].update({'x': x_vals})
+            fig['data'][j].update({'y': y_vals[:, j]})
 
-                ghg_er = False
-                if result_cat == GHG_RES and scenario != BAU_SCENARIO:
-                    ghg_er = True
-                    result_cat = GHG_ER_RES
+        set_barplot_yaxis_label(fig, yaxis_label)
 
-                results_data = prepare_results_tables(df, scenario, result_cat, ghg_er)
-
-                total = np.nansum(results_data, axis=1)
-                # prepare a DataFrame
-                results_data = pd.DataFrame(
-                    data=results_data,
-                    columns=ELECTRIFICATION_OPTIONS + [NO_ACCESS]
-                )
-                # sums of the rows
-                results_data['total'] = pd.Series(total)
-
-                # Format the digits
-                if result_cat == POP_RES:
-                    results_data.iloc[1:, 0:] = results_data.iloc[1:, 0:].applymap(
-                        round_digits
-                    )
-                    results_data.iloc[0, 0:] = results_data.iloc[0, 0:].map(
-                        format_percent
-                    )
-                else:
-                    results_data = results_data.applymap(round_digits)
-                # label of the table rows
-                table_rows = TABLE_ROWS[result_cat]
-                results_data['labels'] = pd.Series(table_rows)
+        return fig
 
-                answer_table = results_data[TABLE_COLUMNS_ID[result_cat]].to_dict('records')
-        return answer_table
+    update_barplot.__name__ = 'update_%s_barplot' % id_name
 
-    update_table.__name__ = 'update_%s_table' % id_name
-    return update_table
+    return update_barplot
 
 
 # Barplot and results callbacks for region
@@ -508,179 +446,50 @@ def aggregate_barplot_callback(app_handle, result_category):
 
     result_cat = result_category
 
-    @app_handle.callback(
-        Output('{}-barplot'.format(id_name), 'figure'),
-        [
-            Input('region-input', 'value'),
-            Input('{}-barplot-yaxis-input'.format(id_name), 'value')
-        ],
-        [
-            State('data-store', 'data'),
-            State('{}-barplot'.format(id_name), 'figure')
-        ]
-    )
-    def update_barplot(region_id, y_sel, cur_data, fig):
+    # only the values of the barplot are memoized, they are applied to the figure of the session
+    @memoize_callback('{}-barplot'.format(id_name))
+    def barplot_values(region_id, y_sel):
 
         if y_sel is None:
             idx_y = 0
         else:
             idx_y = TABLE_ROWS[result_category].index(y_sel)
 
-        if region_id is not None:
-            x_vals = [SCENARIOS_DICT[sce] for sce in SCENARIOS]
-            y_vals = []
-            for sce_id, sce in enumerate(SCENARIOS):
-                df = pd.read_json(cur_data[sce])
-
-                if region_id != WORLD_ID:
-                    # narrow to the region if the scope is not on the whole world
-                    df = df.loc[df.region == REGIONS_NDC[region_id]]
-
-                # aggregate the results
-                df = df[EXO_RESULTS + ['pop_newly_electrified_2030']].sum(axis=0)
-
-                # compute the percentage of population with electricity access
-                results_data = prepare_results_tables(df, sce, result_category)
-
-                y_vals.append(results_data[idx_y])
-
-            y_vals = np.vstack(y_vals)
-
-            for j, opt in enumerate(BARPLOT_YAXIS_OPT[result_cat]):
-                fig['data'][j].update({'x': x_vals})
-                fig['data'][j].update({'y': y_vals[:, j]})
-
-            if result_cat == INVEST_RES:
-                yaxis_label = BARPLOT_INVEST_YLABEL
-            elif result_cat == GHG_RES:
-                yaxis_label = BARPLOT_GHG_YLABEL
-            else:
-                yaxis_label = y_sel
-
-            fig['layout'].update(
-                {
-                    'yaxis': go.layout.YAxis(
-                        title=go.layout.yaxis.Title(
-                            text=yaxis_label,
-                        )
-                    )
-                }
-            )
-
-        return fig
-
-    update_barplot.__name__ = 'update_%s_barplot' % id_name
-    return update_barplot
+        x_vals = [SCENARIOS_DICT[sce] for sce in SCENARIOS]
+        y_vals = []
+        for sce_id, sce in enumerate(SCENARIOS):
+            # aggregated results of the region formatted with good units
+            results_data = results_tables.table_numbers(sce, region_id, result_category)
 
+            y_vals.append(results_data[idx_y])
 
-def aggregate_table_callback(app_handle, result_category):
-    """Generate a callback for input components."""
-
-    id_name = '{}-{}'.format(RES_AGGREGATE, result_category)
+        return x_vals, np.vstack(y_vals), barplot_yaxis_label(result_cat, y_sel)
 
     @app_handle.callback(
-        Output('{}-results-table'.format(id_name), 'data'),
+        Output('{}-barplot'.format(id_name), 'figure'),
         [
             Input('region-input', 'value'),
-            Input('scenario-input', 'value'),
+            Input('{}-barplot-yaxis-input'.format(id_name), 'value')
         ],
-        [State('data-store', 'data')]
+        [State('{}-barplot'.format(id_name), 'figure')]
     )
-    def update_table(
-            region_id,
-            scenario,
-            cur_data,
-    ):
-        """Display information and study's results for a country."""
-
-        result_cat = result_category
+    def update_barplot(region_id, y_sel, fig):
 
-        answer_table = []
-        if region_id is not None:
-            if scenario in SCENARIOS:
-
-                df = pd.read_json(cur_data[scenario])
-                if region_id != WORLD_ID:
-                    # narrow to the region if the scope is not on the whole world
-                    df = df.loc[df.region == REGIONS_NDC[region_id]]
-                # aggregate the results
-                df = df[EXO_RESULTS + ['pop_newly_electrified_2030']].sum(axis=0)
-
-                ghg_er = False
-                if result_cat == GHG_RES and scenario != BAU_SCENARIO:
-                    ghg_er = True
-                    result_cat = GHG_ER_RES
-
-                results_data = prepare_results_tables(df, scenario, result_cat, ghg_er)
-
-                total = np.nansum(results_data, axis=1)
-                # prepare a DataFrame
-                results_data = pd.DataFrame(
-                    data=results_data,
-                    columns=ELECTRIFICATION_OPTIONS + [NO_ACCESS]
-                )
-                # sums of the rows
-                results_data['total'] = pd.Series(total)
-
-                # Format the digits
-                if result_cat == POP_RES:
-                    results_data.iloc[1:, 0:] = results_data.iloc[1:, 0:].applymap(
-                        round_digits
-                    )
-                    results_data.iloc[0, 0:] = results_data.iloc[0, 0:].map(
-                        format_percent
-                    )
-                else:
-                    results_data = results_data.applymap(round_digits)
-                # label of the table rows
-                table_rows = TABLE_ROWS[result_cat]
-                results_data['labels'] = pd.Series(table_rows)
-
-                answer_table = results_data[TABLE_COLUMNS_ID[result_cat]].to_dict('records')
-        return answer_table
-
-    update_table.__name__ = 'update_%s_table' % id_name
-    return update_table
+        if region_id is None:
+            raise PreventUpdate
 
+        x_vals, y_vals, yaxis_label = barplot_values(region_id, y_sel)
 
-def country_aggregate_title_callback(app_handle, result_type, result_category):
-
-    id_name = '{}-{}'.format(result_type, result_category)
-
-    if result_type == RES_COUNTRY:
-        inputs = [Input('country-input', 'value')]
-    elif result_type == RES_AGGREGATE:
-        inputs = [Input('region-input', 'value')]
-
-    inputs.append(Input('scenario-input', 'value'))
+        for j, opt in enumerate(BARPLOT_YAXIS_OPT[result_cat]):
+            fig['data'][j].update({'x': x_vals})
+            fig['data'][j].update({'y': y_vals[:, j]})
 
-    if result_category == POP_RES:
-        description = 'Electrification Mix'
-    elif result_category == INVEST_RES:
-        description = 'Initial Investments Needed (in billion USD)'
-    else:
-        description = 'Cumulated GHG Emissions (2017-2030) (in million tons CO2)'
+        set_barplot_yaxis_label(fig, yaxis_label)
 
-    @app_handle.callback(
-        Output('{}-results-title'.format(id_name), 'children'),
-        inputs,
-        [State('data-store', 'data')]
-    )
-    def update_title(input_trigger, scenario, cur_data):
-
-        answer = 'Results'
-        if scenario in SCENARIOS and input_trigger is not None:
-            if result_type == RES_COUNTRY:
-                df = pd.read_json(cur_data[scenario])
-                answer = '{}: '.format(df.loc[df.country_iso == input_trigger].country.values[0])
-            elif result_type == RES_AGGREGATE:
-                answer = '{}: Aggregated '.format(
-                    REGIONS_GPD[input_trigger]
-                )
-        return '{}{}'.format(answer, description)
+        return fig
 
-    update_title.__name__ = 'update_%s_title' % id_name
-    return update_title
+    update_barplot.__name__ = 'update_%s_barplot' % id_name
+    return update_barplot
 
 
 # Barplot and results callbacks for comparison between region and country
@@ -693,310 +502,101 @@ def compare_barplot_callback(app_handle, result_category):
 
     result_cat = result_category
 
-    @app_handle.callback(
-        Output('{}-barplot'.format(id_name), 'figure'),
-        [
-            Input('country-input', 'value'),
-            Input('compare-input', 'value'),
-            Input('scenario-input', 'value'),
-            Input('{}-barplot-yaxis-input'.format(id_name), 'value')
-        ],
-        [
-            State('data-store', 'data'),
-            State('{}-barplot'.format(id_name), 'figure')
-        ]
-    )
-    def update_barplot(country_sel, comp_sel, scenario, y_sel, cur_data, fig):
+    # only the values of the barplot are memoized, they are applied to the figure of the session
+    @memoize_callback('{}-barplot'.format(id_name))
+    def barplot_values(country_sel, comp_sel, scenario, y_sel):
+
         if y_sel is None:
             idx_y = 0
         else:
             idx_y = TABLE_ROWS[result_category].index(y_sel)
 
-        if country_sel is not None and comp_sel is not None:
-            comp_name = comp_sel
-            df = pd.read_json(cur_data[scenario])
-            df_comp = df.copy()
-            df_ref = df.loc[df.country_iso == country_sel]
-            if comp_sel in REGIONS_NDC:
-                # compare the reference country to a region
-                if comp_sel != WORLD_ID:
-                    df_comp = df_comp.loc[df_comp.region == REGIONS_NDC[comp_sel]]
-                df_comp = df_comp[EXO_RESULTS + ['pop_newly_electrified_2030']].sum(axis=0)
-                comp_name = REGIONS_GPD[comp_sel]
-                comp_iso = comp_name
-            else:
-                # compare the reference country to a country
-                df_comp = df_comp.loc[df_comp.country_iso == comp_sel]
-                comp_name = df_comp.country.values[0]
-                comp_iso = df_comp.country_iso.values[0]
-
-            ref_results_data = prepare_results_tables(df_ref, scenario, result_category)
-            comp_results_data = prepare_results_tables(df_comp, scenario, result_category)
-
-            x = [opt.upper() for opt in ELECTRIFICATION_OPTIONS] + [NO_ACCESS]
-            y_ref = ref_results_data[idx_y]
-            y_comp = comp_results_data[idx_y]
-
-            country_txt = [country_sel for i in range(4)]
-
-            comp_txt = [comp_iso for i in range(4)]
-
-            if result_cat == INVEST_RES:
-                x = x[:-1]
-                y_ref = y_ref[:-1]
-                y_comp = y_comp[:-1]
-                country_txt = country_txt[:-1]
-                comp_txt = comp_txt[:-1]
-
-            fs = 15
-
-            fig.update(
-                {
-                    'data': [
-                        go.Bar(
-                            x=x,
-                            y=y_ref,
-                            text=country_txt,
-                            insidetextfont={'size': fs, 'color': 'white'},
-                            textposition='auto',
-                            marker=dict(
-                                color=list(BARPLOT_ELECTRIFICATION_COLORS.values())
-                            ),
-                            hoverinfo='y+text'
-                        ),
-                        go.Bar(
-                            x=x,
-                            y=y_comp,
-                            text=comp_txt,
-                            insidetextfont={'size': fs, 'color': 'white'},
-                            textposition='auto',
-                            marker=dict(
-                                color=['#a062d0', '#9ac1e5', '#f3a672', '#cccccc']
-                            ),
-                            hoverinfo='y+text'
-                        ),
-                    ],
-                }
-            )
-
-            if result_cat == INVEST_RES:
-                yaxis_label = BARPLOT_INVEST_YLABEL
-            elif result_cat == GHG_RES:
-                yaxis_label = BARPLOT_GHG_YLABEL
-            else:
-                yaxis_label = y_sel
+        if comp_sel in REGIONS_NDC:
+            # compare the reference country to a region
+            comp_iso = REGIONS_GPD[comp_sel]
+        else:
+            # compare the reference country to a country
+            comp_iso = comp_sel
 
-            fig['layout'].update(
-                {
-                    'yaxis': go.layout.YAxis(
-                        title=go.layout.yaxis.Title(
-                            text=yaxis_label,
-                        )
-                    )
-                }
-            )
+        ref_results_data = results_tables.table_numbers(scenario, country_sel, result_category)
+        comp_results_data = results_tables.table_numbers(scenario, comp_sel, result_category)
 
-        return fig
+        x = [opt.upper() for opt in ELECTRIFICATION_OPTIONS] + [NO_ACCESS]
+        y_ref = ref_results_data[idx_y]
+        y_comp = comp_results_data[idx_y]
 
-    update_barplot.__name__ = 'update_%s_barplot' % id_name
-    return update_barplot
+        country_txt = [country_sel for i in range(4)]
 
+        comp_txt = [comp_iso for i in range(4)]
 
-def compare_table_callback(app_handle, result_category):
-    """Generate a callback for input components."""
+        if result_cat == INVEST_RES:
+            x = x[:-1]
+            y_ref = y_ref[:-1]
+            y_comp = y_comp[:-1]
+            country_txt = country_txt[:-1]
+            comp_txt = comp_txt[:-1]
 
-    id_name = '{}-{}'.format(RES_COMPARE, result_category)
+        return x, y_ref, y_comp, country_txt, comp_txt, barplot_yaxis_label(result_cat, y_sel)
 
     @app_handle.callback(
-        Output('{}-results-table'.format(id_name), 'data'),
+        Output('{}-barplot'.format(id_name), 'figure'),
         [
             Input('country-input', 'value'),
             Input('compare-input', 'value'),
             Input('scenario-input', 'value'),
+            Input('{}-barplot-yaxis-input'.format(id_name), 'value')
         ],
-        [State('data-store', 'data')]
-    )
-    def update_table(country_iso, comp_sel, scenario, cur_data):
-        """Display information and study's results comparison between countries."""
-        answer_table = []
-
-        result_cat = result_category
-
-        # extract the data from the selected scenario if a country was selected
-        if country_iso is not None and comp_sel is not None:
-            if scenario in SCENARIOS:
-                df = pd.read_json(cur_data[scenario])
-                df_comp = df.copy()
-                df = df.loc[df.country_iso == country_iso]
-                if comp_sel in REGIONS_NDC:
-                    # compare the reference country to a region
-                    if comp_sel != WORLD_ID:
-                        df_comp = df_comp.loc[df_comp.region == REGIONS_NDC[comp_sel]]
-                    df_comp = df_comp[EXO_RESULTS + ['pop_newly_electrified_2030']].sum(axis=0)
-                else:
-                    # compare the reference country to a country
-                    df_comp = df_comp.loc[df_comp.country_iso == comp_sel]
-
-                ghg_er = False
-                if result_cat == GHG_RES and scenario != BAU_SCENARIO:
-                    ghg_er = True
-                    result_cat = GHG_ER_RES
-
-                results_data = prepare_results_tables(df, scenario, result_cat, ghg_er)
-                comp_results_data = prepare_results_tables(df_comp, scenario, result_cat, ghg_er)
-
-                total = np.nansum(results_data, axis=1)
-                comp_total = np.nansum(comp_results_data, axis=1)
-
-                results_data = np.hstack([results_data, comp_results_data])
-
-                comp_ids = ['comp_{}'.format(c) for c in ELECTRIFICATION_OPTIONS] \
-                           + ['comp_No Electricity']
-                # prepare a DataFrame
-                results_data = pd.DataFrame(
-                    data=results_data,
-                    columns=ELECTRIFICATION_OPTIONS + [NO_ACCESS] + comp_ids
-                )
-                # sums of the rows
-                results_data['total'] = pd.Series(total)
-                results_data['comp_total'] = pd.Series(comp_total)
-                # Format the digits
-                if result_cat == POP_RES:
-                    results_data.iloc[1:, 0:] = results_data.iloc[1:, 0:].applymap(
-                        round_digits
-                    )
-                    results_data.iloc[0, 0:] = results_data.iloc[0, 0:].map(
-                        format_percent
-                    )
-                else:
-                    results_data = results_data.applymap(round_digits)
-                # label of the table rows
-                table_rows = TABLE_ROWS[result_cat]
-                results_data['labels'] = pd.Series(table_rows)
-
-                answer_table = results_data[COMPARE_COLUMNS_ID].to_dict('records')
-        return answer_table
-
-    update_table.__name__ = 'update_%s_table' % id_name
-    return update_table
-
-
-def compare_title_callback(app_handle, result_category):
-
-    id_name = '{}-{}'.format(RES_COMPARE, result_category)
-
-    if result_category == POP_RES:
-        description = 'Electrification Mix {}'
-    elif result_category == INVEST_RES:
-        description = 'Initial Investments needed {} (in billion USD)'
-    else:
-        description = 'Cumulated GHG Emissions (2017-2030) {} (in million tons CO2)'
-
-    @app_handle.callback(
-        Output('{}-results-title'.format(id_name), 'children'),
-        [
-            Input('country-input', 'value'),
-            Input('compare-input', 'value'),
-            Input('scenario-input', 'value')
-        ],
-        [State('data-store', 'data')]
-    )
-    def update_title(country_iso, comp_sel, scenario, cur_data):
-
-        answer = 'Results'
-        if scenario in SCENARIOS and country_iso is not None and comp_sel is not None:
-            df = pd.read_json(cur_data[scenario])
-            if comp_sel in REGIONS_NDC:
-                comp_name = REGIONS_GPD[comp_sel]
-            else:
-                comp_name = df.loc[df.country_iso == comp_sel].country.values[0]
-                comp_iso = df.loc[df.country_iso == comp_sel].country_iso.values[0]
-                comp_name = '{} ({})'.format(comp_name, comp_iso)
-
-            country_name = df.loc[df.country_iso == country_iso].country.values[0]
-
-            answer = 'Comparison of {}'.format(
-                description.format(
-                    'between {} ({}) and {}'.format(
-                        country_name,
-                        country_iso,
-                        comp_name,
-                    )
-                )
-            )
-        return answer
-
-    update_title.__name__ = 'update_%s_title' % id_name
-    return update_title
-
-
-def table_title_callback(app_handle, result_type, result_category):
-
-    id_name = '{}-{}'.format(result_type, result_category)
-
-    if result_type == RES_COUNTRY:
-        inputs = [Input('country-input', 'value')]
-    elif result_type == RES_AGGREGATE:
-        inputs = [Input('region-input', 'value')]
-    elif result_type == RES_COMPARE:
-        inputs = [Input('compare-input', 'value')]
-
-    inputs.append(Input('scenario-input', 'value'))
-
-    @app_handle.callback(
-        Output('{}-results-table-title'.format(id_name), 'children'),
-        inputs,
+        [State('{}-barplot'.format(id_name), 'figure')]
     )
-    def update_title(input_trigger, scenario):
+    def update_barplot(country_sel, comp_sel, scenario, y_sel, fig):
 
-        answer = 'Detailed results'
-        if scenario in SCENARIOS and input_trigger is not None:
-            answer = 'Detailed Results for {} ({}) Scenario'.format(
-                SCENARIOS_NAMES[scenario],
-                SCENARIOS_DICT[scenario]
-            )
-        if result_category == INVEST_RES:
-            answer = answer + ' (in billion USD)'
-        elif result_category == GHG_RES:
-            answer = answer + ' (in million tons CO2)'
-
-        return answer
-
-    update_title.__name__ = 'update_%s_title' % id_name
-    return update_title
+        if country_sel is None or comp_sel is None:
+            raise PreventUpdate
 
+        x, y_ref, y_comp, country_txt, comp_txt, yaxis_label = barplot_values(
+            country_sel,
+            comp_sel,
+            scenario,
+            y_sel
+        )
 
-def compare_table_columns_title_callback(app_handle, result_category):
+        fs = 15
 
-    id_name = '{}-{}'.format(RES_COMPARE, result_category)
+        fig.update(
+            {
+                'data': [
+                    go.Bar(
+                        x=x,
+                        y=y_ref,
+                        text=country_txt,
+                        insidetextfont={'size': fs, 'color': 'white'},
+                        textposition='auto',
+                        marker=dict(
+                            color=list(BARPLOT_ELECTRIFICATION_COLORS.values())
+                        ),
+                        hoverinfo='y+text'
+                    ),
+                    go.Bar(
+                        x=x,
+                        y=y_comp,
+                        text=comp_txt,
+                        insidetextfont={'size': fs, 'color': 'white'},
+                        textposition='auto',
+                        marker=dict(
+                            color=['#a062d0', '#9ac1e5', '#f3a672', '#cccccc']
+                        ),
+                        hoverinfo='y+text'
+                    ),
+                ],
+            }
+        )
 
-    result_cat = result_category
+        set_barplot_yaxis_label(fig, yaxis_label)
 
-    @app_handle.callback(
-        Output('{}-results-table'.format(id_name), 'columns'),
-        [
-            Input('country-input', 'value'),
-            Input('compare-input', 'value'),
-        ]
-    )
-    def update_table_columns_title(country_sel, comp_sel):
-
-        columns_ids = []
-        if country_sel is not None and comp_sel is not None:
-            for col in TABLE_COLUMNS_ID[result_cat]:
-                if col != 'labels':
-                    columns_ids.append(
-                        {'name': [TABLE_COLUMNS_LABEL[col], country_sel], 'id': col}
-                    )
-                    columns_ids.append(
-                        {'name': [TABLE_COLUMNS_LABEL[col], comp_sel], 'id': 'comp_{}'.format(col)}
-                    )
-                else:
-                    columns_ids.append({'name': TABLE_COLUMNS_LABEL[col], 'id': col})
-        return columns_ids
+        return fig
 
-    update_table_columns_title.__name__ = 'update_%s_table_columns_title' % id_name
-    return update_table_columns_title
+    update_barplot.__name__ = 'update_%s_barplot' % id_name
+    return update_barplot
 
 
 # def compare_table_styling_callback(app_handle, result_category):
@@ -1063,6 +663,175 @@ def compare_table_columns_title_callback(app_handle, result_category):
 #     return update_table_styling
 
 
+def entity_table_rows(result_category, entity, scenario):
+    """Rows of the results table of a country or a region."""
+    answer_table = []
+    if entity is not None and scenario in SCENARIOS:
+        result_cat = result_category
+        ghg_er = False
+        if result_cat == GHG_RES and scenario != BAU_SCENARIO:
+            ghg_er = True
+            result_cat = GHG_ER_RES
+
+        answer_table = results_tables.table_rows(scenario, entity, result_cat, ghg_er)
+    return answer_table
+
+
+def compare_table_rows(result_category, country_iso, comp_sel, scenario):
+    """Rows of the results table comparing a country with a region or another country."""
+    answer_table = []
+    if country_iso is not None and comp_sel is not None and scenario in SCENARIOS:
+        result_cat = result_category
+        ghg_er = False
+        if result_cat == GHG_RES and scenario != BAU_SCENARIO:
+            ghg_er = True
+            result_cat = GHG_ER_RES
+
+        # the comparison is either with a region or with a country
+        answer_table = results_tables.compare_rows(
+            scenario,
+            country_iso,
+            comp_sel,
+            result_cat,
+            ghg_er
+        )
+    return answer_table
+
+
+def results_title(result_type, result_category, input_trigger, scenario):
+    """Title of the results of a country or a region."""
+    if result_category == POP_RES:
+        description = 'Electrification Mix'
+    elif result_category == INVEST_RES:
+        description = 'Initial Investments Needed (in billion USD)'
+    else:
+        description = 'Cumulated GHG Emissions (2017-2030) (in million tons CO2)'
+
+    answer = 'Results'
+    if scenario in SCENARIOS and input_trigger is not None:
+        if result_type == RES_COUNTRY:
+            answer = '{}: '.format(results_store.country_name(input_trigger))
+        elif result_type == RES_AGGREGATE:
+            answer = '{}: Aggregated '.format(
+                REGIONS_GPD[input_trigger]
+            )
+    return '{}{}'.format(answer, description)
+
+
+def compare_title(result_category, country_iso, comp_sel, scenario):
+    """Title of the results comparing a country with a region or another country."""
+    if result_category == POP_RES:
+        description = 'Electrification Mix {}'
+    elif result_category == INVEST_RES:
+        description = 'Initial Investments needed {} (in billion USD)'
+    else:
+        description = 'Cumulated GHG Emissions (2017-2030) {} (in million tons CO2)'
+
+    answer = 'Results'
+    if scenario in SCENARIOS and country_iso is not None and comp_sel is not None:
+        if comp_sel in REGIONS_NDC:
+            comp_name = REGIONS_GPD[comp_sel]
+        else:
+            comp_name = '{} ({})'.format(results_store.country_name(comp_sel), comp_sel)
+
+        country_name = results_store.country_name(country_iso)
+
+        answer = 'Comparison of {}'.format(
+            description.format(
+                'between {} ({}) and {}'.format(
+                    country_name,
+                    country_iso,
+                    comp_name,
+                )
+            )
+        )
+    return answer
+
+
+def table_title(result_category, input_trigger, scenario):
+    """Title of a results table."""
+    answer = 'Detailed results'
+    if scenario in SCENARIOS and input_trigger is not None:
+        answer = 'Detailed Results for {} ({}) Scenario'.format(
+            SCENARIOS_NAMES[scenario],
+            SCENARIOS_DICT[scenario]
+        )
+    if result_category == INVEST_RES:
+        answer = answer + ' (in billion USD)'
+    elif result_category == GHG_RES:
+        answer = answer + ' (in million tons CO2)'
+
+    return answer
+
+
+def compare_table_columns(result_category, country_sel, comp_sel):
+    """Columns of a results table comparing a country with a region or another country."""
+    columns_ids = []
+    if country_sel is not None and comp_sel is not None:
+        for col in TABLE_COLUMNS_ID[result_category]:
+            if col != 'labels':
+                columns_ids.append(
+                    {'name': [TABLE_COLUMNS_LABEL[col], country_sel], 'id': col}
+                )
+                columns_ids.append(
+                    {'name': [TABLE_COLUMNS_LABEL[col], comp_sel], 'id': 'comp_{}'.format(col)}
+                )
+            else:
+                columns_ids.append({'name': TABLE_COLUMNS_LABEL[col], 'id': col})
+    return columns_ids
+
+
+def results_panels_callback(app_handle, result_type):
+    """Generate a callback updating the titles and tables of all result categories at once."""
+
+    if result_type == RES_COUNTRY:
+        inputs = [Input('country-input', 'value')]
+    elif result_type == RES_AGGREGATE:
+        inputs = [Input('region-input', 'value')]
+    elif result_type == RES_COMPARE:
+        inputs = [Input('country-input', 'value'), Input('compare-input', 'value')]
+
+    inputs.append(Input('scenario-input', 'value'))
+
+    outputs = []
+    for res_cat in RESULTS_CATEGORIES:
+        id_name = '{}-{}'.format(result_type, res_cat)
+        outputs = outputs + [
+            Output('{}-results-title'.format(id_name), 'children'),
+            Output('{}-results-table-title'.format(id_name), 'children'),
+            Output('{}-results-table'.format(id_name), 'data'),
+        ]
+        if result_type == RES_COMPARE:
+            outputs.append(Output('{}-results-table'.format(id_name), 'columns'))
+
+    @app_handle.callback(outputs, inputs)
+    @memoize_callback('{}-results-panels'.format(result_type))
+    def update_results_panels(*args):
+        """Display the titles and the tables of the study's results."""
+        scenario = args[-1]
+        answer = []
+        for res_cat in RESULTS_CATEGORIES:
+            if result_type == RES_COMPARE:
+                country_iso, comp_sel = args[:2]
+                answer = answer + [
+                    compare_title(res_cat, country_iso, comp_sel, scenario),
+                    table_title(res_cat, comp_sel, scenario),
+                    compare_table_rows(res_cat, country_iso, comp_sel, scenario),
+                    compare_table_columns(res_cat, country_iso, comp_sel),
+                ]
+            else:
+                entity = args[0]
+                answer = answer + [
+                    results_title(result_type, res_cat, entity, scenario),
+                    table_title(res_cat, entity, scenario),
+                    entity_table_rows(res_cat, entity, scenario),
+                ]
+        return answer
+
+    update_results_panels.__name__ = 'update_%s_results_panels' % result_type
+    return update_results_panels
+
+
 def ghg_dropdown_options_callback(app_handle, result_type):
     """Generate a callback for input components."""
 
@@ -1083,126 +852,244 @@ def ghg_dropdown_options_callback(app_handle, result_type):
     return update_barplot
 
 
-def toggle_results_div_callback(app_handle, result_type, result_category):
+def toggle_specific_info_display(cur_view, cur_style):
+    """Change the display information between the app's views."""
+    if cur_style is None:
+        cur_style = {'display': 'block'}
 
-    id_name = '{}-{}'.format(result_type, result_category)
+    if cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE]:
+        cur_style = {}
+    elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
+        cur_style.update({'display': 'none'})
+    return cur_style
 
-    @app_handle.callback(
-        Output('{}-div'.format(id_name), 'style'),
-        [Input('view-store', 'data')],
-        [State('{}-div'.format(id_name), 'style')]
-    )
-    def toggle_results_div_display(cur_view, cur_style):
-        """Change the display of results-div between the app's views."""
-        if cur_style is None:
-            cur_style = {'display': 'none'}
 
-        if result_type == RES_COUNTRY:
-            if cur_view['app_view'] == VIEW_COUNTRY:
-                cur_style = {}
-            elif cur_view['app_view'] in [VIEW_GENERAL,VIEW_AGGREGATE, VIEW_COMPARE]:
-                cur_style.update({'display': 'none'})
-        elif result_type == RES_AGGREGATE:
-            if cur_view['app_view'] == VIEW_AGGREGATE:
-                cur_style = {}
-            elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
-                cur_style.update({'display': 'none'})
-        elif result_type == RES_COMPARE:
-            if cur_view['app_view'] == VIEW_COMPARE:
-                cur_style = {}
-            elif cur_view['app_view'] in [VIEW_GENERAL, VIEW_COUNTRY, VIEW_AGGREGATE]:
-                cur_style.update({'display': 'none'})
+def toggle_map_div_display(cur_view, cur_style):
+    """Change the display of map between the app's views."""
+    if cur_style is None:
+        cur_style = {'display': 'block'}
 
-        return cur_style
+    if cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE]:
+        cur_style = {}
+    elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
+        cur_style.update({'display': 'none'})
+    return cur_style
 
-    toggle_results_div_display.__name__ = 'toggle_%s_display' % id_name
-    return toggle_results_div_display
 
+def toggle_results_info_div_display(cur_view, cur_style):
+    """Change the display of results-info-div between the app's views."""
+    if cur_style is None:
+        cur_style = {'display': 'none'}
 
-def update_maps_callback(app_handle, region):
+    if cur_view['app_view'] == VIEW_COUNTRY:
+        cur_style = {}
+    elif cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE, VIEW_COMPARE]:
+        cur_style.update({'display': 'none'})
+    return cur_style
 
-    @app_handle.callback(
-        Output('{}-map'.format(region), 'figure'),
-        [
-            Input('scenario-input', 'value'),
-        ],
-        [
-            State('{}-map'.format(region), 'figure'),
-            State('data-store', 'data')
-        ]
+
+def toggle_compare_input_div_display(cur_view, cur_style):
+    """Change the display of compare-input-div between the app's views."""
+    if cur_style is None:
+        cur_style = {'visibility': 'hidden'}
+
+    if cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE]:
+        cur_style.update({'visibility': 'hidden'})
+    elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
+        cur_style.update({'visibility': 'visible'})
+    return cur_style
+
+
+def toggle_results_div_display(result_type, cur_view, cur_style):
+    """Change the display of results-div between the app's views."""
+    if cur_style is None:
+        cur_style = {'display': 'none'}
+
+    if result_type == RES_COUNTRY:
+        if cur_view['app_view'] == VIEW_COUNTRY:
+            cur_style = {}
+        elif cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE, VIEW_COMPARE]:
+            cur_style.update({'display': 'none'})
+    elif result_type == RES_AGGREGATE:
+        if cur_view['app_view'] == VIEW_AGGREGATE:
+            cur_style = {}
+        elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
+            cur_style.update({'display': 'none'})
+    elif result_type == RES_COMPARE:
+        if cur_view['app_view'] == VIEW_COMPARE:
+            cur_style = {}
+        elif cur_view['app_view'] in [VIEW_GENERAL, VIEW_COUNTRY, VIEW_AGGREGATE]:
+            cur_style.update({'display': 'none'})
+
+    return cur_style
+
+
+def _map_glyphs_per_country(centroid, z, options):
+    """Draw the bar plots of the map with one trace per country and electrification option."""
+    n = 4
+    colors = BARPLOT_ELECTRIFICATION_COLORS
+    show_legend = True
+    points = []
+    i = 0
+    for idx, c in centroid.iterrows():
+        for j, opt in enumerate(options):
+            if j == n - 1 and z.iloc[i, j] == 0:
+                # Otherwise points with radius of 0 are displayed with non zero radius
+                pass
+            else:
+                points.append(
+                    go.Scattergeo(
+                        lon=[c['Longitude']],
+                        lat=[c['Latitude']],
+                        hoverinfo='skip',
+                        marker=go.scattergeo.Marker(
+                            size=z.iloc[i, j:n].sum() * 25,
+                            color=colors[opt],
+                            line=go.scattergeo.marker.Line(width=0)
+                        ),
+                        showlegend=show_legend,
+                        legendgroup='group{}'.format(j),
+                        name=ELECTRIFICATION_DICT[opt],
+                    )
+                )
+        show_legend = False
+        i = i + 1
+    return points
+
+
+def _map_glyphs_per_option(centroid, z, options):
+    """Draw the bar plots of the map with one trace per electrification option.
+
+    The circles of an option are drawn for all countries at once, the circles of the next option
+    are smaller and drawn above them.
+    """
+    n = 4
+    colors = BARPLOT_ELECTRIFICATION_COLORS
+    points = []
+    lon = centroid['Longitude'].values
+    lat = centroid['Latitude'].values
+    z = z.values
+    for j, opt in enumerate(options):
+        sizes = np.nansum(z[:, j:n], axis=1) * 25
+        keep = np.ones(len(sizes), dtype=bool)
+        if j == n - 1:
+            # Otherwise points with radius of 0 are displayed with non zero radius
+            keep = z[:, j] != 0
+        points.append(
+            go.Scattergeo(
+                lon=lon[keep],
+                lat=lat[keep],
+                hoverinfo='skip',
+                marker=go.scattergeo.Marker(
+                    size=sizes[keep],
+                    color=colors[opt],
+                    line=go.scattergeo.marker.Line(width=0)
+                ),
+                showlegend=True,
+                legendgroup='group{}'.format(j),
+                name=ELECTRIFICATION_DICT[opt],
+            )
+        )
+    return points
+
+
+def region_map_figure(region, scenario, single_trace=None):
+    """Plot color map of the percentage of people with a given electrification option.
+
+    :param region: one of the keys of MAP_REGIONS
+    :param scenario: name of the scenario
+    :param single_trace: (bool) draw one trace per electrification option instead of one per
+    country and option, default is MAP_SINGLE_TRACE
+    :return: the figure as a dict of json types, ready to be sent to the browser
+    """
+    if single_trace is None:
+        single_trace = MAP_SINGLE_TRACE
+
+    region_id = MAP_REGIONS[region]
+
+    fig = _figure_json(go.Figure(data=map_data, layout=MAP_LAYOUTS[region]))
+
+    # load the data of the scenario, narrowed to the region
+    df = results_store.region_countries(scenario, region_id)
+
+    centroid = results_store.region_centroids(region_id)
+
+    fig['data'][0].update(
+        {
+            'locations': df['country_iso'],
+            'z': np.ones(len(df.index)),
+            'text': country_hover_text(df),
+        }
     )
-    def update_map(scenario, fig, cur_data):
-        """Plot color map of the percentage of people with a given electrification option."""
-        region_id = MAP_REGIONS[region]
 
-        # load the data of the scenario
-        df = pd.read_json(cur_data[scenario])
+    if scenario == BAU_SCENARIO:
+        z = df[POP_GET].div(df.pop_newly_electrified_2030, axis=0).round(3)
+        z[NO_ACCESS] = 1 - z.sum(axis=1)
+        options = ELECTRIFICATION_OPTIONS + [NO_ACCESS]
 
-        centroid = pd.read_json(cur_data[region_id])
+    else:
+        z = df[POP_GET].div(df.pop_newly_electrified_2030, axis=0).round(3)
+        z[NO_ACCESS] = 0
+        options = ELECTRIFICATION_OPTIONS
 
-        # narrow to the region if the scope is not on the whole world
-        df = df.loc[df.region == REGIONS_NDC[region_id]]
+    # Populate the map with bar plots mapped onto circles
+    if single_trace:
+        fig['data'][1:] = _map_glyphs_per_option(centroid, z, options)
+    else:
+        fig['data'][1:] = _map_glyphs_per_country(centroid, z, options)
 
-        if region_id == 'SA':
-            region_name = REGIONS_GPD[WORLD_ID]
-        elif region_id == 'AS':
-            region_name = REGIONS_GPD[region_id]
-        elif region_id == 'AF':
-            region_name = REGIONS_GPD[region_id]
-        else:
-            region_name = REGIONS_GPD[region_id]
+    fig = _figure_json(fig)
+    # the random ids of the traces would make the figures differ from one process to the other
+    for trace in fig['data']:
+        trace.pop('uid', None)
+    return fig
 
-        fig['data'][0].update(
-            {
-                'locations': df['country_iso'],
-                'z': np.ones(len(df.index)),
-                'text': country_hover_text(df),
-            }
+
+def _figure_json(fig):
+    """Convert a figure with plotly, numpy or pandas objects to a dict of json types."""
+    return json.loads(json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def _build_map_figures():
+    return {
+        (region, sce): region_map_figure(region, sce)
+        for region in MAP_REGIONS
+        for sce in SCENARIOS
+    }
+
+
+def warm_up_maps():
+    """Compute the figures of the maps of all regions and scenarios."""
+    with _MAP_FIGURES_LOCK:
+        if _MAP_FIGURES:
+            return
+        _MAP_FIGURES.update(
+            snapshot.cached(
+                'map_figures-{}-{}'.format(results_store.results_version(), MAP_SINGLE_TRACE),
+                _build_map_figures
+            )
         )
 
-        points = []
-        i = 0
-        if scenario == BAU_SCENARIO:
-            z = df[POP_GET].div(df.pop_newly_electrified_2030, axis=0).round(3)
-            z[NO_ACCESS] = 1 - z.sum(axis=1)
-            options = ELECTRIFICATION_OPTIONS + [NO_ACCESS]
 
-        else:
-            z = df[POP_GET].div(df.pop_newly_electrified_2030, axis=0).round(3)
-            z[NO_ACCESS] = 0
-            options = ELECTRIFICATION_OPTIONS
-        n = 4
-        colors = BARPLOT_ELECTRIFICATION_COLORS
-        show_legend = True
-
-        # Populate the map with bar plots mapped onto circles
-        for idx, c in centroid.iterrows():
-            for j, opt in enumerate(options):
-                if j == n - 1 and z.iloc[i, j] == 0:
-                    # Otherwise points with radius of 0 are displayed with non zero radius
-                    pass
-                else:
-                    points.append(
-                        go.Scattergeo(
-                            lon=[c['Longitude']],
-                            lat=[c['Latitude']],
-                            hoverinfo='skip',
-                            marker=go.scattergeo.Marker(
-                                size=z.iloc[i, j:n].sum() * 25,
-                                color=colors[opt],
-                                line=go.scattergeo.marker.Line(width=0)
-                            ),
-                            showlegend=show_legend,
-                            legendgroup='group{}'.format(j),
-                            name=ELECTRIFICATION_DICT[opt],
-                        )
-                    )
-            show_legend = False
-            i = i + 1
+def map_figure(region, scenario):
+    """Return the precomputed figure of the map of a region for a scenario."""
+    warm_up_maps()
+    return _MAP_FIGURES[(region, scenario)]
 
-        fig['data'][1:] = points
 
-        return fig
+def update_maps_callback(app_handle, region):
+
+    @app_handle.callback(
+        Output('{}-map'.format(region), 'figure'),
+        [
+            Input('scenario-input', 'value'),
+        ]
+    )
+    def update_map(scenario):
+        """Send the precomputed map of the scenario."""
+        if scenario not in SCENARIOS:
+            raise PreventUpdate
+        return map_figure(region, scenario)
 
     update_map.__name__ = 'update_%s_map' % region
     return update_map
@@ -1233,28 +1120,15 @@ def select_map_callback(app_handle, region):
 def callbacks(app_handle):
 
     # build callbacks automatically for various categories
-    for res_cat in [POP_RES, INVEST_RES, GHG_RES]:
+    for res_cat in RESULTS_CATEGORIES:
 
         country_barplot_callback(app_handle, res_cat)
-        country_table_callback(app_handle, res_cat)
-
         aggregate_barplot_callback(app_handle, res_cat)
-        aggregate_table_callback(app_handle, res_cat)
-
         compare_barplot_callback(app_handle, res_cat)
-        compare_table_callback(app_handle, res_cat)
         # compare_table_styling_callback(app_handle, res_cat)
-        compare_table_columns_title_callback(app_handle, res_cat)
-
-        for res_type in [RES_COUNTRY, RES_AGGREGATE]:
-            country_aggregate_title_callback(app_handle, res_type, res_cat)
-        compare_title_callback(app_handle, res_cat)
 
-        for res_type in [RES_COUNTRY, RES_AGGREGATE, RES_COMPARE]:
-            toggle_results_div_callback(app_handle, res_type, res_cat)
-            table_title_callback(app_handle, res_type, res_cat)
-
-    for res_type in [RES_COUNTRY, RES_AGGREGATE, RES_COMPARE]:
+    for res_type in RESULTS_TYPES:
+        results_panels_callback(app_handle, res_type)
         ghg_dropdown_options_callback(app_handle, res_type)
 
     for region in MAP_REGIONS:
@@ -1327,87 +1201,39 @@ def callbacks(app_handle):
                             cur_view.update({'app_view': VIEW_AGGREGATE})
         return cur_view
 
-    @app_handle.callback(
-        Output('specific-info-div', 'style'),
-        [Input('view-store', 'data')],
-        [State('specific-info-div', 'style')]
-    )
-    def toggle_specific_info_display(cur_view, cur_style):
-        """Change the display information between the app's views."""
-        if cur_style is None:
-            cur_style = {'display': 'block'}
-
-        if cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE]:
-            cur_style = {}
-        elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
-            cur_style.update({'display': 'none'})
-        return cur_style
-
-    @app_handle.callback(
-        Output('maps-div', 'style'),
-        [Input('view-store', 'data')],
-        [State('maps-div', 'style')]
-    )
-    def toggle_map_div_display(cur_view, cur_style):
-        """Change the display of map between the app's views."""
-        if cur_style is None:
-            cur_style = {'display': 'block'}
-
-        if cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE]:
-            cur_style = {}
-        elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
-            cur_style.update({'display': 'none'})
-        return cur_style
-
-    @app_handle.callback(
-        Output('right-map-div', 'style'),
-        [Input('view-store', 'data')],
-        [State('right-map-div', 'style')]
-    )
-    def toggle_map_div_display(cur_view, cur_style):
-        """Change the display of map between the app's views."""
-        if cur_style is None:
-            cur_style = {'display': 'block'}
-
-        if cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE]:
-            cur_style = {}
-        elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
-            cur_style.update({'display': 'none'})
-        return cur_style
+    results_divs = [
+        ('{}-{}-div'.format(res_type, res_cat), res_type)
+        for res_type in RESULTS_TYPES
+        for res_cat in RESULTS_CATEGORIES
+    ]
 
     @app_handle.callback(
-        Output('results-info-div', 'style'),
+        [
+            Output('specific-info-div', 'style'),
+            Output('maps-div', 'style'),
+            Output('results-info-div', 'style'),
+            Output('compare-input-div', 'style'),
+        ] + [Output(div_id, 'style') for div_id, _ in results_divs],
         [Input('view-store', 'data')],
-        [State('results-info-div', 'style')]
-    )
-    def toggle_results_info_div_display(cur_view, cur_style):
-        """Change the display of results-info-div between the app's views."""
-        if cur_style is None:
-            cur_style = {'display': 'none'}
-
-        if cur_view['app_view'] == VIEW_COUNTRY:
-            cur_style = {}
-        elif cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE, VIEW_COMPARE]:
-            cur_style.update({'display': 'none'})
-        return cur_style
-
-    @app_handle.callback(
-        Output('compare-input-div', 'style'),
         [
-            Input('view-store', 'data'),
-        ],
-        [State('compare-input-div', 'style')]
+            State('specific-info-div', 'style'),
+            State('maps-div', 'style'),
+            State('results-info-div', 'style'),
+            State('compare-input-div', 'style'),
+        ] + [State(div_id, 'style') for div_id, _ in results_divs]
     )
-    def toggle_compare_input_div_display(cur_view, cur_style):
-        """Change the display of compare-input-div between the app's views."""
-        if cur_style is None:
-            cur_style = {'visibility': 'hidden'}
-
-        if cur_view['app_view'] in [VIEW_GENERAL, VIEW_AGGREGATE]:
-            cur_style.update({'visibility': 'hidden'})
-        elif cur_view['app_view'] in [VIEW_COUNTRY, VIEW_COMPARE]:
-            cur_style.update({'visibility': 'visible'})
-        return cur_style
+    def toggle_view_display(cur_view, specific_info_style, map_style, results_info_style,
+                            compare_input_style, *results_styles):
+        """Change the display of the divs between the app's views."""
+        return [
+            toggle_specific_info_display(cur_view, specific_info_style),
+            toggle_map_div_display(cur_view, map_style),
+            toggle_results_info_div_display(cur_view, results_info_style),
+            toggle_compare_input_div_display(cur_view, compare_input_style),
+        ] + [
+            toggle_results_div_display(res_type, cur_view, cur_style)
+            for (_, res_type), cur_style in zip(results_divs, results_styles)
+        ]
 
     @app_handle.callback(
         Output('region-input', 'value'),
@@ -1454,19 +1280,16 @@ def callbacks(app_handle):
         [
             Input('scenario-input', 'value'),
             Input('country-input', 'value')
-        ],
-        [State('data-store', 'data')]
+        ]
     )
-    def update_results_info_div(scenario, country_iso, cur_data):
+    @memoize_callback('results-info-div')
+    def update_results_info_div(scenario, country_iso):
 
         divs = []
         if scenario in SCENARIOS and country_iso is not None:
-            df = pd.read_json(cur_data[scenario])
-            df = df.loc[df.country_iso == country_iso]
+            df = results_store.entity_results(scenario, country_iso)
             pop_2017 = np.round(df.pop_2017.values[0] * 1e-6, 2)
             name = df.country.values[0]
-            image_filename = 'icons/{}.png'.format(country_iso)
-            encoded_image = base64.b64encode(open(image_filename, 'rb').read())
 
             divs = [
                 html.Div(
@@ -1474,7 +1297,7 @@ def callbacks(app_handle):
                     className='grid-x',
                     children=[
                         html.Img(
-                            src='data:image/png;base64,{}'.format(encoded_image.decode()),
+                            src=image_url('icons/{}.png'.format(country_iso)),
                             className='country__info__flag cell medium-4',
                         ),
                         html.H1(
@@ -1524,14 +1347,13 @@ def callbacks(app_handle):
         [
             Input('scenario-input', 'value'),
             Input('region-input', 'value')
-        ],
-        [State('data-store', 'data')]
+        ]
     )
-    def update_aggregate_info_div(scenario, region_id, cur_data):
+    def update_aggregate_info_div(scenario, region_id):
 
         pop_2017 = ''
         if scenario in SCENARIOS and region_id is not None:
-            df = pd.read_json(cur_data[scenario])
+            df = results_store.scenario_results(scenario)
             pop_2017 = df.pop_2017.sum(axis=0)
 
         return html.Div('Population (2017) : {}'.format(pop_2017))
@@ -1539,24 +1361,17 @@ def callbacks(app_handle):
     @app_handle.callback(
         Output('country-input', 'options'),
         [Input('region-input', 'value')],
-        [
-            State('scenario-input', 'value'),
-            State('data-store', 'data')
-        ]
+        [State('scenario-input', 'value')]
     )
-    def update_country_selection_options(region_id, scenario, cur_data):
+    def update_country_selection_options(region_id, scenario):
         """List the countries in a given region in alphabetical order."""
         countries_in_region = []
         if scenario is not None:
-            # load the data of the scenario
-            df = pd.read_json(cur_data[scenario])
-
             if region_id is None:
                 region_id = WORLD_ID
 
-            if region_id != WORLD_ID:
-                # narrow to the region if the scope is not on the whole world
-                df = df.loc[df.region == REGIONS_NDC[region_id]]
+            # load the data of the scenario, narrowed to the region
+            df = results_store.region_countries(scenario, region_id)
 
             # sort alphabetically by country
             df = df.sort_values('country')
@@ -1572,10 +1387,13 @@ def callbacks(app_handle):
     )
     def update_data_store(*args):
         cur_data = args[-1]
-        for clicked_data in args[:-2]:
+        if cur_data is None:
+            cur_data = {}
+        for clicked_data in args[:-1]:
             if clicked_data is not None:
                 country_iso = clicked_data['points'][0]['location']
                 cur_data.update({'selected_country': country_iso})
+        cur_data.update({'version': results_store.results_version()})
         return cur_data
 
     @app_handle.callback(
@@ -1,23 +1,25 @@
-import base64
 import os
 from flask import Flask, send_from_directory
 
 import dash
 
+from app_server.images import image_url
+
 URL_BASEPATH = 'NDC-visualization'
 
+# urls of the images, they contain a hash of the images' content and can be cached by the browser
 LOGOS = [
-    base64.b64encode(open('logos/{}'.format(fn), 'rb').read())
-    for fn in os.listdir('logos') if fn.endswith('.png')
+    image_url('logos/{}'.format(fn))
+    for fn in sorted(os.listdir('logos')) if fn.endswith('.png')
 ]
 
-HDR_LOGO = base64.b64encode(open('icons/header-logo.png', 'rb').read())
+HDR_LOGO = image_url('icons/header-logo.png')
 
-INFO_ICON = base64.b64encode(open('icons/information.png', 'rb').read())
+INFO_ICON = image_url('icons/information.png')
 
-REPORT_IMG = base64.b64encode(open('assets/report_frontpage.png', 'rb').read())
+REPORT_IMG = image_url('assets/report_frontpage.png')
 
-PLACEHOLDER = base64.b64encode(open('assets/placeholder.png', 'rb').read())
+PLACEHOLDER = image_url('assets/placeholder.png')
 
 APP_BG_COLOR = '#FFFFFF'
 
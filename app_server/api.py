@@ -0,0 +1,265 @@
+"""JSON API for batches of model queries
+
+POST /api/v1/results with a json body {"queries": [query, ...]}, a query being a dict with:
+- scenario : one of the SCENARIOS
+- min_tier_level : minimum TIER level (default MIN_TIER_LEVEL)
+- countries : list of iso codes of countries
+- regions : list of region ids of REGIONS_NDC, the results of a region are the sums over its
+countries
+- rise : optional dict with custom RISE scores (0 to 100) for some of 'rise_grid', 'rise_mg' and
+'rise_shs', not allowed for the bau scenario, only 'rise_grid' is allowed for the prog scenario
+which sets the scores of mg and shs to 100
+- columns : list of names of groups of columns of export.EXPORT_COLUMNS (default POP_GET, INVEST
+and GHG)
+
+The response is {"version": version of the results store, "results": [result, ...]}, a result
+being a dict with the iso codes and region ids of its query as keys and dicts of the results'
+columns as values. An invalid batch gets a 400 response with the position of the first invalid
+query.
+
+The results of the queries without RISE scores are read from the results store. The queries of a
+batch with RISE scores are grouped by scenario and minimum TIER level and each group is computed
+in a single run of the model (see `results_store.custom_rise_results`), the computations are jobs
+of the compute pool (see compute_pool.py). The results of each query are kept in a bounded cache
+keyed by a hash of the query.
+
+Environment variables:
+- NDC_API_MAX_BATCH : maximum number of queries per request (default 1000)
+- NDC_API_CACHE_SIZE : maximum number of queries' results kept in memory (default 4096)
+"""
+import collections
+import os
+import threading
+import numpy as np
+import pandas as pd
+from flask import jsonify, request
+
+from data import results_store
+from data.data_preparation import (
+    SCENARIOS,
+    BAU_SCENARIO,
+    PROG_SCENARIO,
+    MIN_TIER_LEVEL,
+    MIN_RATED_CAPACITY,
+    REGIONS_NDC,
+    WORLD_ID,
+    RISE_INDICES,
+)
+
+from .compute_pool import run_job
+from .export import EXPORT_COLUMNS
+from .keys import canonical_key
+
+API_URL = '/api/v1'
+
+API_MAX_BATCH = int(os.environ.get('NDC_API_MAX_BATCH', 1000))
+
+API_CACHE_SIZE = int(os.environ.get('NDC_API_CACHE_SIZE', 4096))
+
+DEFAULT_COLUMNS = ['POP_GET', 'INVEST', 'GHG']
+
+_LOCK = threading.Lock()
+
+# hash of a query -> its results
+_CACHE = collections.OrderedDict()
+
+
+def _string_list(query, name):
+    values = query.get(name, [])
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ValueError('"{}" must be a list of strings'.format(name))
+    return sorted(set(values))
+
+
+def parse_query(query):
+    """Validate a query and give it a canonical form.
+
+    :param query: dict decoded from the json body
+    :return: a dict with the scenario, min_tier_level, countries, regions, rise and columns
+    :raise ValueError: if the query is not valid
+    """
+    if not isinstance(query, dict):
+        raise ValueError('a query must be an object')
+
+    scenario = query.get('scenario')
+    if scenario not in SCENARIOS:
+        raise ValueError('unknown scenario "{}"'.format(scenario))
+
+    min_tier_level = query.get('min_tier_level', MIN_TIER_LEVEL)
+    if not isinstance(min_tier_level, int) or isinstance(min_tier_level, bool) \
+            or min_tier_level not in MIN_RATED_CAPACITY:
+        raise ValueError('unknown minimum TIER level {}'.format(min_tier_level))
+
+    countries = _string_list(query, 'countries')
+    known_countries = set(results_store.countries())
+    for country_iso in countries:
+        if country_iso not in known_countries:
+            raise ValueError('unknown country "{}"'.format(country_iso))
+
+    regions = _string_list(query, 'regions')
+    for reg in regions:
+        if reg not in REGIONS_NDC:
+            raise ValueError('unknown region "{}"'.format(reg))
+
+    if not countries and not regions:
+        raise ValueError('a query needs at least one country or region')
+
+    rise = query.get('rise') or {}
+    if not isinstance(rise, dict):
+        raise ValueError('"rise" must be an object')
+    if rise and scenario == BAU_SCENARIO:
+        raise ValueError('the RISE scores are not used by the bau scenario')
+    for rise_idx, value in rise.items():
+        if rise_idx not in RISE_INDICES:
+            raise ValueError('unknown RISE index "{}"'.format(rise_idx))
+        if not isinstance(value, (int, float)) or isinstance(value, bool) \
+                or not 0 <= value <= 100:
+            raise ValueError('the RISE scores must be numbers between 0 and 100')
+    if scenario == PROG_SCENARIO and ('rise_mg' in rise or 'rise_shs' in rise):
+        raise ValueError('the prog scenario sets the RISE scores of mg and shs to 100')
+
+    groups = query.get('columns', DEFAULT_COLUMNS)
+    if not isinstance(groups, list):
+        raise ValueError('"columns" must be a list of strings')
+    columns = []
+    for group in groups:
+        if group not in EXPORT_COLUMNS:
+            raise ValueError('unknown group of columns "{}"'.format(group))
+        columns.extend(col for col in EXPORT_COLUMNS[group] if col not in columns)
+
+    return dict(
+        scenario=scenario,
+        min_tier_level=min_tier_level,
+        countries=countries,
+        regions=regions,
+        rise={rise_idx: float(rise[rise_idx]) for rise_idx in RISE_INDICES if rise_idx in rise},
+        columns=columns,
+    )
+
+
+def _query_countries(query, df):
+    """Return the iso codes of the countries of a query and of its regions."""
+    isos = set(query['countries'])
+    for reg in query['regions']:
+        if reg == WORLD_ID:
+            isos.update(df.country_iso)
+        else:
+            isos.update(df.loc[df.region == REGIONS_NDC[reg]].country_iso)
+    return sorted(isos)
+
+
+def _json_values(values):
+    """Convert a Series of floats to a dict, NaN becomes None as it is not valid json."""
+    return {col: None if np.isnan(v) else v for col, v in values.items()}
+
+
+def _query_result(query, rows):
+    """Assemble the results of a query from the rows of its countries.
+
+    :param query: output of `parse_query`
+    :param rows: DataFrame indexed by the iso codes of the countries of the query
+    """
+    values = rows[query['columns']].astype(float)
+    result = {
+        country_iso: _json_values(values.loc[country_iso])
+        for country_iso in query['countries']
+    }
+    for reg in query['regions']:
+        if reg == WORLD_ID:
+            selected = values
+        else:
+            selected = values.loc[rows.region == REGIONS_NDC[reg]]
+        result[reg] = _json_values(selected.sum(axis=0))
+    return result
+
+
+def run_queries(queries):
+    """Compute the results of a batch of queries.
+
+    :param queries: list of outputs of `parse_query`
+    :return: the list of the results of the queries
+    """
+    version = results_store.results_version()
+    keys = [canonical_key([version, query]) for query in queries]
+    results = [None] * len(queries)
+
+    with _LOCK:
+        for i, key in enumerate(keys):
+            if key in _CACHE:
+                _CACHE.move_to_end(key)
+                results[i] = _CACHE[key]
+
+    # the queries to compute, grouped by scenario and minimum TIER level
+    groups = collections.defaultdict(list)
+    for i, query in enumerate(queries):
+        if results[i] is None:
+            groups[(query['scenario'], query['min_tier_level'])].append(i)
+
+    for (scenario, min_tier_level), indexes in groups.items():
+        df = run_job(results_store.tier_scenario_results, scenario, min_tier_level)
+        df = df.set_index(df.country_iso, drop=False)
+
+        custom = [i for i in indexes if queries[i]['rise']]
+        for i in indexes:
+            if not queries[i]['rise']:
+                results[i] = _query_result(
+                    queries[i],
+                    df.loc[_query_countries(queries[i], df)]
+                )
+
+        if custom:
+            # the countries of all the queries with RISE scores are computed at once
+            countries = []
+            rise = []
+            for i in custom:
+                isos = _query_countries(queries[i], df)
+                countries.extend(isos)
+                rise.extend(
+                    [[queries[i]['rise'].get(rise_idx, np.nan) for rise_idx in RISE_INDICES]]
+                    * len(isos)
+                )
+            custom_df = run_job(
+                results_store.custom_rise_results,
+                scenario,
+                min_tier_level,
+                countries,
+                np.array(rise)
+            )
+            custom_df.index = pd.Index(countries)
+            start = 0
+            for i in custom:
+                n = len(_query_countries(queries[i], df))
+                results[i] = _query_result(queries[i], custom_df.iloc[start:start + n])
+                start = start + n
+
+    with _LOCK:
+        for key, result in zip(keys, results):
+            _CACHE[key] = result
+            _CACHE.move_to_end(key)
+        while len(_CACHE) > API_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+    return results
+
+
+def routes(server_handle):
+    """Register the routes of the API."""
+
+    @server_handle.route('{}/results'.format(API_URL), methods=['POST'])
+    def serve_results():
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('queries'), list):
+            return jsonify(error='the body must be a json object with a list of "queries"'), 400
+        if len(body['queries']) > API_MAX_BATCH:
+            return jsonify(
+                error='at most {} queries per request'.format(API_MAX_BATCH)
+            ), 400
+
+        queries = []
+        for i, query in enumerate(body['queries']):
+            try:
+                queries.append(parse_query(query))
+            except ValueError as e:
+                return jsonify(error=str(e), query=i), 400
+
+        return jsonify(version=results_store.results_version(), results=run_queries(queries))
@@ -0,0 +1,219 @@
+"""Compression of the responses of the server
+
+The responses (layout, callbacks, stylesheets, scripts, ...) are compressed with brotli or gzip
+depending on the `Accept-Encoding` header of the request. Brotli is used when the optional
+`brotli` package is installed and the client accepts it, gzip otherwise.
+
+The static files (the stylesheets of /static and the files of /assets) are compressed once at the
+highest level and kept in memory, `precompress_static` fills this cache at warm-up. The large
+dynamic responses which are sent again identical (e.g. the memoized figures) are kept in a small
+cache keyed by a hash of their content. The other responses are compressed on the fly.
+
+Environment variables:
+- NDC_COMPRESSION : set to '0' to disable the compression
+- NDC_COMPRESSION_MIN_SIZE : responses smaller than this size in bytes are not compressed
+(default 500)
+- NDC_COMPRESSION_LEVEL : level of the compression of the dynamic responses (default 6)
+"""
+import collections
+import glob
+import gzip
+import hashlib
+import os
+import threading
+from flask import jsonify, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_ENABLED = os.environ.get('NDC_COMPRESSION', '1') != '0'
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('NDC_COMPRESSION_MIN_SIZE', 500))
+
+COMPRESSION_LEVEL = int(os.environ.get('NDC_COMPRESSION_LEVEL', 6))
+
+# encodings by order of preference
+ENCODINGS = (['br'] if brotli is not None else []) + ['gzip']
+
+COMPRESSIBLE_MIMETYPES = [
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/x-ndjson',
+    'image/svg+xml',
+]
+
+# url prefix -> directory of the static files
+STATIC_DIRS = {
+    '/static/': 'assets',
+    '/assets/': 'assets',
+}
+
+# dynamic responses larger than this size in bytes are cached once compressed
+CACHE_MIN_SIZE = 64 * 1024
+
+CACHE_SIZE = 64
+
+_LOCK = threading.Lock()
+
+# (file name, modification time, encoding) -> compressed content
+_STATIC = {}
+
+# (hash of the content, encoding) -> compressed content
+_DYNAMIC = collections.OrderedDict()
+
+# encoding -> number of responses, bytes before and after compression
+_STATS = {}
+
+
+def compress(data, encoding, level=None):
+    """Compress bytes with gzip or brotli.
+
+    :param data: (bytes) content to compress
+    :param encoding: (str) 'gzip' or 'br'
+    :param level: (int) level of gzip (1 to 9), the quality of brotli is 11 * level / 9,
+    default is COMPRESSION_LEVEL
+    :return: the compressed bytes
+    """
+    if level is None:
+        level = COMPRESSION_LEVEL
+    if encoding == 'br':
+        return brotli.compress(data, quality=int(round(11 * level / 9)))
+    # the modification time is fixed so that the same content gives the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def negotiate_encoding(accept_encodings):
+    """Pick the preferred encoding among the ones accepted by the client, None if no match.
+
+    :param accept_encodings: the `accept_encodings` of a flask request
+    """
+    for encoding in ENCODINGS:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def _static_file(path):
+    """Return the file name of a static file from the path of the request, None otherwise."""
+    for prefix, dirname in STATIC_DIRS.items():
+        if path.startswith(prefix):
+            fname = os.path.join(dirname, path[len(prefix):])
+            if os.path.dirname(os.path.normpath(fname)) == dirname and os.path.isfile(fname):
+                return fname
+    return None
+
+
+def precompressed(fname, encoding):
+    """Return the content of a static file compressed at the highest level."""
+    key = (fname, os.path.getmtime(fname), encoding)
+    with _LOCK:
+        if key in _STATIC:
+            return _STATIC[key]
+    with open(fname, 'rb') as f:
+        data = compress(f.read(), encoding, level=9)
+    with _LOCK:
+        _STATIC[key] = data
+    return data
+
+
+def precompress_static():
+    """Compress all the stylesheets and scripts of the static directories."""
+    for dirname in set(STATIC_DIRS.values()):
+        for pattern in ['*.css', '*.js']:
+            for fname in sorted(glob.glob(os.path.join(dirname, pattern))):
+                for encoding in ENCODINGS:
+                    precompressed(fname, encoding)
+
+
+def _compress_dynamic(data, encoding):
+    if len(data) < CACHE_MIN_SIZE:
+        return compress(data, encoding)
+
+    key = (hashlib.sha1(data).hexdigest(), encoding)
+    with _LOCK:
+        if key in _DYNAMIC:
+            _DYNAMIC.move_to_end(key)
+            return _DYNAMIC[key]
+    compressed = compress(data, encoding)
+    with _LOCK:
+        _DYNAMIC[key] = compressed
+        while len(_DYNAMIC) > CACHE_SIZE:
+            _DYNAMIC.popitem(last=False)
+    return compressed
+
+
+def _record(encoding, size, compressed_size):
+    with _LOCK:
+        stats = _STATS.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0})
+        stats['responses'] = stats['responses'] + 1
+        stats['bytes_in'] = stats['bytes_in'] + size
+        stats['bytes_out'] = stats['bytes_out'] + compressed_size
+
+
+def compress_response(response):
+    """Compress a response if the client accepts it and it is worth it."""
+    if response.status_code != 200 \
+            or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    encoding = negotiate_encoding(request.accept_encodings)
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    if response.direct_passthrough:
+        # files sent by flask are only compressed if they are static files
+        fname = _static_file(request.path)
+        if fname is None:
+            return response
+        size = os.path.getsize(fname)
+        if size < COMPRESSION_MIN_SIZE:
+            return response
+        data = precompressed(fname, encoding)
+        # the file opened by flask is replaced by its compressed content
+        if hasattr(response.response, 'close'):
+            response.response.close()
+        response.direct_passthrough = False
+    else:
+        if response.is_streamed:
+            return response
+        size = response.content_length
+        if size is None or size < COMPRESSION_MIN_SIZE:
+            return response
+        data = _compress_dynamic(response.get_data(), encoding)
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # the compressed content is equivalent to the original content but not identical
+    etag, weak = response.get_etag()
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    _record(encoding, size, len(data))
+    return response
+
+
+def compression_stats():
+    """Return the number of compressed responses and the bytes saved per encoding."""
+    with _LOCK:
+        stats = {encoding: dict(values) for encoding, values in _STATS.items()}
+    for values in stats.values():
+        values['bytes_saved'] = values['bytes_in'] - values['bytes_out']
+    return stats
+
+
+def routes(server_handle):
+    """Compress the responses of the server and register the route of the statistics."""
+    if COMPRESSION_ENABLED:
+        server_handle.after_request(compress_response)
+
+    @server_handle.route('/compression-stats')
+    def serve_compression_stats():
+        return jsonify(compression_stats())
@@ -0,0 +1,173 @@
+"""Pool of workers for the heavy model computations
+
+The callbacks and endpoints which run the model (the flex scenario, the batch API, the exports)
+submit their computation as a job with `run_job` instead of running it in the request thread.
+The number of jobs running or waiting at the same time is bounded: when the pool is full a new job
+fails at once with ComputePoolBusy, which the server answers with a 503 response, and a job which
+is not done after its timeout fails with ComputeTimeout, answered with a 504 response. The
+requests of the cheap callbacks thus never wait behind a pile of heavy ones (with gunicorn, serve
+the app with several threads per worker, see gunicorn.conf.py).
+
+With a pool of threads, the jobs share the caches of the results store with the request threads.
+With a pool of processes, the jobs run in processes forked from the worker: they are not limited
+by the GIL but the results they cache stay in their own process, the caller caches the output of
+the job in the worker instead (e.g. `results_store.flex_scenario_results`). The pool of a process
+is created at its first job, so that each forked worker gets its own pool.
+
+Environment variables:
+- NDC_COMPUTE_POOL : 'thread' (default), 'process', or '0' to run the jobs in the request thread
+- NDC_COMPUTE_WORKERS : number of jobs running at the same time (default 2)
+- NDC_COMPUTE_QUEUE : number of jobs waiting for a free worker (default 8)
+- NDC_COMPUTE_TIMEOUT : seconds after which a request stops waiting for its job (default 30)
+"""
+import concurrent.futures
+import contextlib
+import os
+import threading
+from flask import jsonify
+
+COMPUTE_POOL = os.environ.get('NDC_COMPUTE_POOL', 'thread')
+
+COMPUTE_WORKERS = int(os.environ.get('NDC_COMPUTE_WORKERS', 2))
+
+COMPUTE_QUEUE = int(os.environ.get('NDC_COMPUTE_QUEUE', 8))
+
+COMPUTE_TIMEOUT = float(os.environ.get('NDC_COMPUTE_TIMEOUT', 30))
+
+# seconds after which the client can retry when the pool is full
+RETRY_AFTER = 1
+
+_LOCK = threading.Lock()
+
+# 'pid' -> process which created the pool, 'executor' -> the pool, 'slots' -> free places
+_POOL = {}
+
+# number of jobs per outcome
+_STATS = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timeouts': 0}
+
+# set in the threads and processes running a job
+_LOCAL = threading.local()
+
+
+class ComputePoolBusy(Exception):
+    """Raised when the pool has no free place for a new job."""
+
+
+class ComputeTimeout(Exception):
+    """Raised when a job is not done within its timeout."""
+
+
+def _pool():
+    """Return the executor and the semaphore of free places of the current process."""
+    with _LOCK:
+        if _POOL.get('pid') != os.getpid():
+            if COMPUTE_POOL == 'process':
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=COMPUTE_WORKERS)
+            else:
+                executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=COMPUTE_WORKERS,
+                    thread_name_prefix='compute'
+                )
+            _POOL.update(
+                pid=os.getpid(),
+                executor=executor,
+                slots=threading.BoundedSemaphore(COMPUTE_WORKERS + COMPUTE_QUEUE),
+            )
+        return _POOL['executor'], _POOL['slots']
+
+
+def _count(outcome):
+    with _LOCK:
+        _STATS[outcome] = _STATS[outcome] + 1
+
+
+def _job(func, args):
+    """Run a job, the jobs it submits itself are run in its own thread."""
+    _LOCAL.in_job = True
+    try:
+        return func(*args)
+    finally:
+        _LOCAL.in_job = False
+
+
+@contextlib.contextmanager
+def inline_jobs():
+    """Run the jobs submitted by the current thread in the thread itself, e.g. to profile them."""
+    in_job = getattr(_LOCAL, 'in_job', False)
+    _LOCAL.in_job = True
+    try:
+        yield
+    finally:
+        _LOCAL.in_job = in_job
+
+
+def _job_done(future):
+    if future.cancelled() or future.exception() is not None:
+        _count('failed')
+    else:
+        _count('completed')
+
+
+def run_job(func, *args, timeout=None):
+    """Run a function in the pool and wait for its output.
+
+    :param func: module level function, it must be picklable for a pool of processes
+    :param args: its arguments
+    :param timeout: (float) seconds to wait for the output, default is COMPUTE_TIMEOUT
+    :return: the output of func
+    :raise ComputePoolBusy: if the pool is full
+    :raise ComputeTimeout: if the job is not done within the timeout
+    """
+    if COMPUTE_POOL == '0' or getattr(_LOCAL, 'in_job', False):
+        return func(*args)
+    if timeout is None:
+        timeout = COMPUTE_TIMEOUT
+
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        _count('rejected')
+        raise ComputePoolBusy('the compute pool is full, retry later')
+    try:
+        future = executor.submit(_job, func, args)
+    except Exception:
+        slots.release()
+        raise
+    _count('submitted')
+    # the place is freed when the job is done, even if the request stopped waiting for it
+    future.add_done_callback(lambda f: slots.release())
+    future.add_done_callback(_job_done)
+
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        # a job which is still waiting for a worker is dropped, a running one cannot be stopped
+        future.cancel()
+        _count('timeouts')
+        raise ComputeTimeout('the computation took more than {} seconds'.format(timeout))
+
+
+def compute_stats():
+    """Return the number of jobs per outcome and the configuration of the pool."""
+    with _LOCK:
+        stats = dict(_STATS)
+    stats.update(pool=COMPUTE_POOL, workers=COMPUTE_WORKERS, queue=COMPUTE_QUEUE)
+    return stats
+
+
+def routes(server_handle):
+    """Answer the failed jobs with 503 or 504 and register the route of the statistics."""
+
+    @server_handle.errorhandler(ComputePoolBusy)
+    def pool_busy(e):
+        response = jsonify(error=str(e))
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RETRY_AFTER)
+        return response
+
+    @server_handle.errorhandler(ComputeTimeout)
+    def pool_timeout(e):
+        return jsonify(error=str(e)), 504
+
+    @server_handle.route('/compute-stats')
+    def serve_compute_stats():
+        return jsonify(compute_stats())
@@ -0,0 +1,341 @@
+"""Export of the results of the scenarios in CSV, NDJSON or Parquet
+
+The route /export streams the results selected by the parameters of the query:
+- scenarios : comma separated scenarios (default is all the SCENARIOS)
+- min_tier_levels : comma separated minimum TIER levels (default is MIN_TIER_LEVEL)
+- countries : comma separated iso codes of countries
+- regions : comma separated region ids of REGIONS_NDC, the countries of the regions are exported
+(default is all the countries if neither countries nor regions are given)
+- columns : comma separated names of groups of columns of EXPORT_COLUMNS (default 'EXO_RESULTS')
+- format : 'csv', 'ndjson' or 'parquet' (default 'csv'), parquet requires the optional package
+`pyarrow`
+
+The results of the minimum TIER levels which are not in the results store are computed by jobs of
+the compute pool (see compute_pool.py) before the response starts. The rows of each scenario and
+TIER level are then selected one at a time while the export is written by chunks of rows from a
+generator, the export is never held in memory as a whole. The exports smaller than EXPORT_CACHE_MAX_ENTRY are kept in a bounded cache keyed by a hash
+of the parameters and of the version of the results store, the hash is also the ETag of the
+response. The responses served from the cache support conditional and range requests.
+
+Environment variables:
+- NDC_EXPORT_CACHE_SIZE : maximum size in bytes of the cached exports (default 32 MB)
+"""
+import collections
+import io
+import os
+import threading
+from flask import Response, jsonify, request
+
+from data import results_store
+from data.data_preparation import (
+    SCENARIOS,
+    MIN_TIER_LEVEL,
+    MIN_RATED_CAPACITY,
+    REGIONS_NDC,
+    WORLD_ID,
+    POP_GET,
+    HH_GET,
+    HH_CAP,
+    HH_SCN2,
+    INVEST,
+    INVEST_CAP,
+    GHG,
+    GHG_ER,
+    GHG_CAP,
+    GHG_CAP_ER,
+    GHG_ALL,
+    EXO_RESULTS,
+    RISE_INDICES,
+)
+
+from .compute_pool import run_job
+from .keys import canonical_key
+
+EXPORT_CACHE_SIZE = int(os.environ.get('NDC_EXPORT_CACHE_SIZE', 32 * 1024 * 1024))
+
+# larger exports are only streamed
+EXPORT_CACHE_MAX_ENTRY = EXPORT_CACHE_SIZE // 4
+
+# number of rows written at once
+CHUNK_ROWS = 500
+
+# name of a group of columns -> columns of the results
+EXPORT_COLUMNS = {
+    'POP_GET': POP_GET,
+    'HH_GET': HH_GET,
+    'HH_CAP': HH_CAP,
+    'HH_SCN2': HH_SCN2,
+    'INVEST': INVEST,
+    'INVEST_CAP': INVEST_CAP,
+    'GHG': GHG,
+    'GHG_ER': GHG_ER,
+    'GHG_CAP': GHG_CAP,
+    'GHG_CAP_ER': GHG_CAP_ER,
+    'GHG_ALL': GHG_ALL,
+    'EXO_RESULTS': EXO_RESULTS,
+    'RISE_INDICES': RISE_INDICES,
+}
+
+# columns which identify the rows, always exported
+ID_COLUMNS = ['scenario', 'min_tier_level', 'country_iso', 'country', 'region']
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+_LOCK = threading.Lock()
+
+# hash of the parameters -> content of the export
+_CACHE = collections.OrderedDict()
+
+
+def _split(value):
+    if not value:
+        return []
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def parse_export_parameters(args):
+    """Validate the parameters of an export.
+
+    :param args: the query parameters of the request
+    :return: a dict with the scenarios, min_tier_levels, countries, columns and format
+    :raise ValueError: if a parameter is not valid
+    """
+    scenarios = _split(args.get('scenarios')) or list(SCENARIOS)
+    for sce in scenarios:
+        if sce not in SCENARIOS:
+            raise ValueError('unknown scenario "{}"'.format(sce))
+
+    try:
+        min_tier_levels = [int(t) for t in _split(args.get('min_tier_levels'))] \
+            or [MIN_TIER_LEVEL]
+    except ValueError:
+        raise ValueError('the minimum TIER levels must be integers')
+    for tier_level in min_tier_levels:
+        if tier_level not in MIN_RATED_CAPACITY:
+            raise ValueError('unknown minimum TIER level {}'.format(tier_level))
+
+    countries = _split(args.get('countries'))
+    known_countries = set(results_store.countries())
+    for country_iso in countries:
+        if country_iso not in known_countries:
+            raise ValueError('unknown country "{}"'.format(country_iso))
+
+    regions = _split(args.get('regions'))
+    for reg in regions:
+        if reg not in REGIONS_NDC:
+            raise ValueError('unknown region "{}"'.format(reg))
+
+    groups = _split(args.get('columns')) or ['EXO_RESULTS']
+    columns = []
+    for group in groups:
+        if group not in EXPORT_COLUMNS:
+            raise ValueError('unknown group of columns "{}"'.format(group))
+        columns.extend(col for col in EXPORT_COLUMNS[group] if col not in columns)
+
+    export_format = args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError('unknown format "{}"'.format(export_format))
+
+    return dict(
+        scenarios=scenarios,
+        min_tier_levels=min_tier_levels,
+        countries=sorted(set(countries)),
+        regions=sorted(set(regions)),
+        columns=columns,
+        format=export_format,
+    )
+
+
+def _select_rows(df, countries, regions):
+    if (not countries and not regions) or WORLD_ID in regions:
+        return df
+    selected = df.country_iso.isin(countries) \
+        | df.region.isin([REGIONS_NDC[reg] for reg in regions])
+    return df.loc[selected]
+
+
+def export_frames(params):
+    """Generate the selected rows and columns of the results of each scenario and TIER level.
+
+    The DataFrames are built one at a time, as the export is written.
+    """
+    for tier_level in params['min_tier_levels']:
+        for sce in params['scenarios']:
+            df = _select_rows(
+                results_store.tier_scenario_results(sce, tier_level),
+                params['countries'],
+                params['regions']
+            )
+            # a single copy of the selected columns, some are integers in one scenario and floats
+            # in another
+            labels = [col for col in ID_COLUMNS if col in df.columns]
+            df = df[labels + params['columns']].astype({col: float for col in params['columns']})
+            df.insert(0, 'min_tier_level', tier_level)
+            df.insert(0, 'scenario', sce)
+            yield df.reset_index(drop=True)
+
+
+def export_chunks(frames):
+    """Generate the rows of the selected DataFrames by chunks of CHUNK_ROWS rows."""
+    for df in frames:
+        for start in range(0, len(df.index), CHUNK_ROWS):
+            yield df.iloc[start:start + CHUNK_ROWS]
+
+
+def _csv_writer(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode()
+        header = False
+
+
+def _ndjson_writer(chunks):
+    for chunk in chunks:
+        text = chunk.to_json(orient='records', lines=True)
+        if not text.endswith('\n'):
+            text = text + '\n'
+        yield text.encode()
+
+
+class _ParquetSink(io.RawIOBase):
+    """Write-only file which hands over the bytes written so far when asked.
+
+    The position keeps counting the bytes already handed over, as the parquet footer refers to
+    the offsets of the row groups in the whole file.
+    """
+
+    def __init__(self):
+        super(_ParquetSink, self).__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position = self._position + len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def pop(self):
+        """Return the bytes written since the last call."""
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_writer(chunks):
+    import pyarrow
+    import pyarrow.parquet
+
+    sink = _ParquetSink()
+    writer = None
+    for chunk in chunks:
+        if writer is None:
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            writer = pyarrow.parquet.ParquetWriter(sink, table.schema)
+        else:
+            table = pyarrow.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+        # each chunk is a row group, its bytes are sent as soon as it is written
+        writer.write_table(table)
+        yield sink.pop()
+    if writer is not None:
+        writer.close()
+        yield sink.pop()
+
+
+WRITERS = {
+    'csv': _csv_writer,
+    'ndjson': _ndjson_writer,
+    'parquet': _parquet_writer,
+}
+
+
+def export_key(params):
+    """Hash the parameters of an export and the version of the results store."""
+    return canonical_key([results_store.results_version(), params])
+
+
+def _cache_get(key):
+    with _LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
+    return None
+
+
+def _cache_set(key, content):
+    with _LOCK:
+        _CACHE[key] = content
+        while sum(len(c) for c in _CACHE.values()) > EXPORT_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+
+def _stream_and_cache(key, parts):
+    """Send the parts of an export and keep them in the cache if the export is small enough."""
+    kept = []
+    size = 0
+    for part in parts:
+        if kept is not None:
+            size = size + len(part)
+            if size > EXPORT_CACHE_MAX_ENTRY:
+                kept = None
+            else:
+                kept.append(part)
+        yield part
+    if kept is not None:
+        _cache_set(key, b''.join(kept))
+
+
+def export_response(params):
+    """Build the response of an export, streamed or from the cache."""
+    key = export_key(params)
+    mimetype, extension = EXPORT_FORMATS[params['format']]
+    headers = {
+        'Content-Disposition': 'attachment; filename=ndc_results.{}'.format(extension),
+    }
+
+    if request.if_none_match.contains_weak(key):
+        response = Response(status=304, headers=headers)
+        response.set_etag(key)
+        return response
+
+    content = _cache_get(key)
+    if content is not None:
+        response = Response(content, mimetype=mimetype, headers=headers)
+        response.set_etag(key)
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(content))
+
+    if params['format'] == 'parquet':
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return jsonify(error='the parquet format requires the package pyarrow'), 501
+
+    # the results are computed before the response starts, a full compute pool gives a 503
+    for tier_level in params['min_tier_levels']:
+        results_store.warm_up_tier(tier_level, run=run_job)
+    parts = WRITERS[params['format']](export_chunks(export_frames(params)))
+    response = Response(_stream_and_cache(key, parts), mimetype=mimetype, headers=headers)
+    response.set_etag(key)
+    return response
+
+
+def routes(server_handle):
+    """Register the route which exports the results."""
+
+    @server_handle.route('/export')
+    def serve_export():
+        try:
+            params = parse_export_parameters(request.args)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return export_response(params)
@@ -0,0 +1,86 @@
+"""Delivery of the images of the app (flags, logos, icons) with content-hash urls
+
+The url of an image contains a short hash of its content, so the browser can cache it for as long
+as it wants: a new version of the image gets a new url. The layouts only reference these urls
+instead of inlining the images as base64 data, so the images are not sent again with each layout
+or callback response.
+
+The images are read once per process and kept in memory with their hash.
+"""
+import hashlib
+import os
+import threading
+from flask import Response, abort, redirect, request
+
+# directories from which the images can be served
+IMAGES_DIRS = ['icons', 'logos', 'assets']
+
+IMAGES_URL = '/images'
+
+# one year, the content of an url never changes
+IMAGES_MAX_AGE = 365 * 24 * 3600
+
+_LOCK = threading.Lock()
+
+# path of the image -> (short hash of the content, content)
+_IMAGES = {}
+
+
+def _load_image(path):
+    """Return the hash and the content of an image, None if the image cannot be served."""
+    with _LOCK:
+        if path in _IMAGES:
+            return _IMAGES[path]
+
+    dirname, fname = os.path.split(path)
+    if dirname not in IMAGES_DIRS or not fname.endswith('.png'):
+        return None
+    try:
+        with open(os.path.join(dirname, fname), 'rb') as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    image = (hashlib.sha1(content).hexdigest()[:12], content)
+    with _LOCK:
+        _IMAGES[path] = image
+    return image
+
+
+def image_url(path):
+    """Return the url of an image of the app.
+
+    :param path: (str) path of the image relative to the app's root, e.g. 'icons/AGO.png'
+    :return: the url of the image, which contains the hash of its content
+    """
+    image = _load_image(path)
+    if image is None:
+        raise ValueError('"{}" is not an image which can be served'.format(path))
+    return '{}/{}/{}'.format(IMAGES_URL, image[0], path)
+
+
+def image_response(digest, path):
+    """Build the response serving an image.
+
+    A request with an outdated hash is redirected to the current url of the image, a request
+    with the current hash in `If-None-Match` gets an empty 304 response and `Range` requests are
+    supported.
+    """
+    image = _load_image(path)
+    if image is None:
+        abort(404)
+    if digest != image[0]:
+        return redirect(image_url(path))
+
+    response = Response(image[1], mimetype='image/png')
+    response.set_etag(image[0])
+    response.headers['Cache-Control'] = 'public, max-age={}, immutable'.format(IMAGES_MAX_AGE)
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(image[1]))
+
+
+def routes(server_handle):
+    """Register the route which serves the images."""
+
+    @server_handle.route('{}/<digest>/<path:path>'.format(IMAGES_URL))
+    def serve_image(digest, path):
+        return image_response(digest, path)
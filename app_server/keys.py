@@ -0,0 +1,16 @@
+"""Canonical keys of json arguments, shared by the caches of the layouts and of the server
+
+This module has no dependency on the model data, so that it can be imported by any module.
+"""
+import hashlib
+import json
+
+
+def canonical_key(args):
+    """Hash the canonical json representation of a list of arguments.
+
+    :param args: list of json serializable arguments
+    :return: the hexadecimal sha1 digest
+    """
+    text = json.dumps(args, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
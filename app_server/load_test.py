@@ -0,0 +1,452 @@
+"""Load test of a running deployment of the app with simulated users
+
+Each virtual user opens the static or the flex page and interacts with it as a browser would: the
+layout and the callback graph are read from the server (/_dash-layout and /_dash-dependencies),
+the callbacks are fired when their inputs change, the outputs of the responses update the state of
+the page and trigger the callbacks depending on them. The callbacks of a wave are sent in parallel
+on at most BROWSER_CONNECTIONS connections, as a browser does.
+
+The actions of the users are drawn from ACTIONS with think times between them: select a region, a
+country, a scenario or a comparison on the static page, select a country, a scenario or a minimum
+TIER level on the flex page and drag the RISE sliders, which sends a request for every step of the
+slider without waiting for the responses.
+
+The report gives the throughput and, per callback output id, the number of requests, the error
+rate and the 50th, 95th and 99th percentiles of the latency. A response 204 (no update) is not an
+error, a status of 400 or above or a failed connection is.
+
+Usage, with the server running on http://127.0.0.1:8050:
+
+    python -m app_server.load_test http://127.0.0.1:8050 --users 20 --duration 60
+"""
+import collections
+import concurrent.futures
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+URL_BASEPATH = 'NDC-visualization'
+
+# page -> pathname of the page
+PAGES = {
+    'static': '/{}/static'.format(URL_BASEPATH),
+    'flex': '/{}/flex'.format(URL_BASEPATH),
+}
+
+# page -> probability that a user opens it
+PAGES_MIX = {'static': 0.6, 'flex': 0.4}
+
+# page -> action -> weight of the action among the actions of the page
+ACTIONS = {
+    'static': {'region': 2, 'country': 4, 'scenario': 2, 'compare': 2},
+    'flex': {'flex-country': 2, 'flex-scenario': 1, 'flex-tier': 1, 'flex-drag': 6},
+}
+
+# action -> id of the component whose value is set
+ACTION_INPUTS = {
+    'region': 'region-input',
+    'country': 'country-input',
+    'scenario': 'scenario-input',
+    'compare': 'compare-input',
+    'flex-country': 'flex-country-input',
+    'flex-scenario': 'flex-scenario-input',
+}
+
+FLEX_SLIDERS = ['flex-rise-grid-input', 'flex-rise-mg-input', 'flex-rise-shs-input']
+
+FLEX_TIERS = ['flex-min-tier-mg-input', 'flex-min-tier-shs-input']
+
+# maximum number of requests of a user at the same time
+BROWSER_CONNECTIONS = 6
+
+# seconds between two requests sent while a slider is dragged and size of a step of the slider
+DRAG_INTERVAL = 0.05
+DRAG_STEP = 3
+
+# the waves of callbacks triggered by an action stop after this number
+MAX_WAVES = 20
+
+REQUEST_TIMEOUT = 60
+
+
+def parse_output(output):
+    """Return the (id, property) pairs of the output id of a callback.
+
+    The id of a callback with multiple outputs is '..id1.prop1...id2.prop2..'.
+    """
+    if output.startswith('..') and output.endswith('..'):
+        parts = output[2:-2].split('...')
+    else:
+        parts = [output]
+    return [tuple(part.rsplit('.', 1)) for part in parts]
+
+
+def components(node, found=None):
+    """Collect the properties of the components with an id of a layout in json form.
+
+    :param node: the layout, or a part of it
+    :param found: dict to fill, id -> properties
+    :return: found
+    """
+    if found is None:
+        found = {}
+    if isinstance(node, list):
+        for child in node:
+            components(child, found)
+    elif isinstance(node, dict) and 'props' in node:
+        props = node['props']
+        if props.get('id') is not None:
+            found[props['id']] = dict(props)
+        components(props.get('children'), found)
+    return found
+
+
+def percentile(values, q):
+    """Return the q-th percentile (0 to 100) of a list of numbers by the nearest rank."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(1, int(round(q / 100. * len(values) + 0.5 - 1e-9)))
+    return values[min(rank, len(values)) - 1]
+
+
+class Recorder(object):
+    """Thread safe record of the latency and status of the requests per callback."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self.start = time.monotonic()
+        self.end = None
+
+    def record(self, name, latency, status):
+        with self._lock:
+            self.latencies[name].append(latency)
+            if status == 0 or status >= 400:
+                self.errors[name] = self.errors[name] + 1
+
+    def report(self):
+        """Return the throughput and the statistics of each callback."""
+        end = self.end if self.end is not None else time.monotonic()
+        with self._lock:
+            latencies = {name: list(values) for name, values in self.latencies.items()}
+            errors = dict(self.errors)
+        total = sum(len(values) for values in latencies.values())
+        callbacks = {}
+        for name, values in latencies.items():
+            callbacks[name] = {
+                'requests': len(values),
+                'errors': errors.get(name, 0),
+                'error_rate': errors.get(name, 0) / len(values),
+                'p50_ms': 1000 * percentile(values, 50),
+                'p95_ms': 1000 * percentile(values, 95),
+                'p99_ms': 1000 * percentile(values, 99),
+            }
+        return {
+            'duration': end - self.start,
+            'requests': total,
+            'throughput': total / max(end - self.start, 1e-9),
+            'errors': sum(errors.values()),
+            'error_rate': sum(errors.values()) / total if total else 0.,
+            'callbacks': callbacks,
+        }
+
+
+def format_report(report):
+    """Format a report as a table, the slowest callbacks first."""
+    lines = [
+        'duration {:.1f} s, {} requests, {:.1f} requests/s, {} errors ({:.2%})'.format(
+            report['duration'],
+            report['requests'],
+            report['throughput'],
+            report['errors'],
+            report['error_rate']
+        ),
+        '{:>8} {:>7} {:>9} {:>9} {:>9}  {}'.format(
+            'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'callback'
+        ),
+    ]
+    callbacks = sorted(report['callbacks'].items(), key=lambda item: -item[1]['p95_ms'])
+    for name, stats in callbacks:
+        lines.append('{:>8} {:>7.1%} {:>9.1f} {:>9.1f} {:>9.1f}  {}'.format(
+            stats['requests'],
+            stats['error_rate'],
+            stats['p50_ms'],
+            stats['p95_ms'],
+            stats['p99_ms'],
+            name
+        ))
+    return '\n'.join(lines)
+
+
+class Client(object):
+    """HTTP client of the dash endpoints which records the requests."""
+
+    def __init__(self, url, recorder):
+        self.url = url.rstrip('/')
+        self.recorder = recorder
+
+    def request(self, name, path, body=None):
+        """Send a request and return its status and decoded json, (0, None) if it failed."""
+        data = None
+        headers = {'Accept-Encoding': 'identity'}
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.url + path, data=data, headers=headers)
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as response:
+                status = response.status
+                content = response.read()
+        except urllib.error.HTTPError as e:
+            status = e.code
+            content = b''
+        except (urllib.error.URLError, OSError):
+            status = 0
+            content = b''
+        self.recorder.record(name, time.monotonic() - start, status)
+        if status != 200 or not content:
+            return status, None
+        return status, json.loads(content.decode())
+
+
+class Session(object):
+    """State of a page opened by a virtual user."""
+
+    def __init__(self, client, dependencies, layout, pathname, executor):
+        self.client = client
+        self.executor = executor
+        self._lock = threading.Lock()
+        self.callbacks = [
+            dict(
+                id=dep['output'],
+                outputs=parse_output(dep['output']),
+                inputs=[(i['id'], i['property']) for i in dep['inputs']],
+                state=[(s['id'], s['property']) for s in dep['state']],
+            )
+            for dep in dependencies
+        ]
+        self.props = components(layout)
+        self.props.setdefault('url', {})['pathname'] = pathname
+        self.update(self._all_props(self.props))
+
+    @staticmethod
+    def _all_props(found):
+        return set((cid, prop) for cid, props in found.items() for prop in props)
+
+    def value(self, cid, prop):
+        with self._lock:
+            return self.props.get(cid, {}).get(prop)
+
+    def _ready(self, callback):
+        """A callback is fired only if its outputs and inputs are in the page."""
+        return all(cid in self.props for cid, _ in callback['outputs'] + callback['inputs'])
+
+    def _body(self, callback, changed):
+        with self._lock:
+            return {
+                'output': callback['id'],
+                'inputs': [
+                    {'id': cid, 'property': prop, 'value': self.props[cid].get(prop)}
+                    for cid, prop in callback['inputs']
+                ],
+                'state': [
+                    {'id': cid, 'property': prop, 'value': self.props.get(cid, {}).get(prop)}
+                    for cid, prop in callback['state']
+                ],
+                'changedPropIds': [
+                    '{}.{}'.format(cid, prop) for cid, prop in callback['inputs']
+                    if (cid, prop) in changed
+                ],
+            }
+
+    def _fire(self, callback, changed):
+        """Send a callback and apply its outputs, return the properties it changed."""
+        status, answer = self.client.request(
+            callback['id'],
+            '/_dash-update-component',
+            self._body(callback, changed)
+        )
+        if answer is None:
+            return set()
+        if answer.get('multi'):
+            outputs = [
+                ((cid, prop), value)
+                for cid, props in answer['response'].items() for prop, value in props.items()
+            ]
+        else:
+            cid, prop = callback['outputs'][0]
+            outputs = [((cid, prop), answer['response']['props'][prop])]
+
+        updated = set()
+        with self._lock:
+            for (cid, prop), value in outputs:
+                self.props.setdefault(cid, {})[prop] = value
+                updated.add((cid, prop))
+                if prop == 'children':
+                    # the new components trigger the callbacks depending on them
+                    found = components(value)
+                    self.props.update(found)
+                    updated.update(self._all_props(found))
+        return updated
+
+    def update(self, changed):
+        """Fire the callbacks triggered by changed properties until no property changes."""
+        waiting = []
+        for _ in range(MAX_WAVES):
+            with self._lock:
+                triggered = waiting + [
+                    callback for callback in self.callbacks
+                    if callback not in waiting
+                    and self._ready(callback)
+                    and any(i in changed for i in callback['inputs'])
+                ]
+            if not triggered:
+                return
+            # a callback waits for the callbacks of the wave which update its inputs
+            wave = []
+            waiting = []
+            for callback in triggered:
+                others = set(
+                    o for other in triggered if other is not callback for o in other['outputs']
+                )
+                if any(i in others for i in callback['inputs']):
+                    waiting.append(callback)
+                else:
+                    wave.append(callback)
+            if not wave:
+                # a cycle of callbacks, fire them all
+                wave, waiting = waiting, []
+            fired = changed
+            updates = self.executor.map(lambda callback: self._fire(callback, fired), wave)
+            changed = set().union(*updates)
+
+    def set_value(self, cid, value, prop='value'):
+        """Set a property as the user would and fire the callbacks depending on it."""
+        with self._lock:
+            self.props.setdefault(cid, {})[prop] = value
+        self.update({(cid, prop)})
+
+
+def _options(session, cid):
+    return [
+        option['value'] for option in session.value(cid, 'options') or []
+        if option.get('value') is not None
+    ]
+
+
+def run_action(session, action, rng):
+    """Perform an action of a user on its page, return False if it is not possible."""
+    if action in ACTION_INPUTS:
+        options = _options(session, ACTION_INPUTS[action])
+        if not options:
+            return False
+        session.set_value(ACTION_INPUTS[action], rng.choice(options))
+    elif action == 'flex-tier':
+        cid = rng.choice(FLEX_TIERS)
+        session.set_value(cid, 4 if session.value(cid, 'value') == 3 else 3)
+    elif action == 'flex-drag':
+        if session.value('flex-country-input', 'value') is None:
+            return False
+        cid = rng.choice(FLEX_SLIDERS)
+        start = int(round(session.value(cid, 'value') or 0))
+        target = rng.randint(0, 100)
+        step = DRAG_STEP if target >= start else -DRAG_STEP
+        values = list(range(start + step, target, step)) + [target]
+        # the browser sends the steps of the drag without waiting for the responses
+        threads = []
+        for value in values:
+            thread = threading.Thread(target=session.set_value, args=(cid, value))
+            thread.start()
+            threads.append(thread)
+            time.sleep(DRAG_INTERVAL)
+        for thread in threads:
+            thread.join()
+    return True
+
+
+def virtual_user(url, recorder, deadline, think_time, seed):
+    """Open pages and interact with them until the deadline."""
+    rng = random.Random(seed)
+    client = Client(url, recorder)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS) as executor:
+        while time.monotonic() < deadline:
+            page = rng.choices(list(PAGES_MIX), weights=list(PAGES_MIX.values()))[0]
+            _, layout = client.request('_dash-layout', '/_dash-layout')
+            _, dependencies = client.request('_dash-dependencies', '/_dash-dependencies')
+            if layout is None or dependencies is None:
+                time.sleep(think_time)
+                continue
+            session = Session(client, dependencies, layout, PAGES[page], executor)
+
+            actions = ACTIONS[page]
+            for _ in range(rng.randint(3, 10)):
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(rng.uniform(0.5, 1.5) * think_time)
+                action = rng.choices(list(actions), weights=list(actions.values()))[0]
+                run_action(session, action, rng)
+
+
+def load_test(url, users=10, duration=60., think_time=1., ramp_up=0., seed=0):
+    """Run virtual users against a server and return the report of their requests.
+
+    :param url: (str) root url of the server, e.g. http://127.0.0.1:8050
+    :param users: (int) number of virtual users at the same time
+    :param duration: (float) seconds of the test
+    :param think_time: (float) mean seconds between two actions of a user
+    :param ramp_up: (float) seconds over which the users start
+    :param seed: (int) seed of the random choices of the users
+    :return: the report of `Recorder.report`
+    """
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    threads = []
+    for n in range(users):
+        thread = threading.Thread(
+            target=virtual_user,
+            args=(url, recorder, deadline, think_time, seed + n),
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+        if ramp_up > 0:
+            time.sleep(ramp_up / users)
+    for thread in threads:
+        thread.join()
+    recorder.end = time.monotonic()
+    return recorder.report()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Load test of a running server of the app')
+    parser.add_argument('url', help='root url of the server, e.g. http://127.0.0.1:8050')
+    parser.add_argument('--users', type=int, default=10, help='number of virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='seconds of the test')
+    parser.add_argument('--think-time', type=float, default=1,
+                        help='mean seconds between two actions of a user')
+    parser.add_argument('--ramp-up', type=float, default=0,
+                        help='seconds over which the users start')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='file in which the report is written as json')
+    args = parser.parse_args()
+
+    answer = load_test(
+        args.url,
+        users=args.users,
+        duration=args.duration,
+        think_time=args.think_time,
+        ramp_up=args.ramp_up,
+        seed=args.seed
+    )
+    print(format_report(answer))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(answer, f, indent=2)
@@ -0,0 +1,96 @@
+"""Memory report of the process serving the app
+
+The report is read from /proc/self/smaps_rollup (linux), the Pss field is the fair share of the
+process in the memory pages it shares with the other workers: summed over all the workers it
+gives the total memory used by the deployment.
+"""
+import os
+import resource
+from flask import jsonify
+
+from data import results_store
+
+# fields of /proc/self/smaps_rollup which are reported, in kB
+SMAPS_FIELDS = ['Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty']
+
+
+def read_smaps_rollup(fname='/proc/self/smaps_rollup'):
+    """Return the memory fields of the process in kB, an empty dict if they are not available."""
+    answer = {}
+    try:
+        with open(fname) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in SMAPS_FIELDS:
+                    answer[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return answer
+
+
+def memory_report():
+    """Gather the memory usage of the current worker."""
+    report = {
+        'pid': os.getpid(),
+        # maximum resident set size, in kB on linux
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'results_buffers': results_store.buffers_nbytes() // 1024,
+    }
+    report.update(read_smaps_rollup())
+    return report
+
+
+def format_memory_report(report):
+    """Format a memory report on a single line for the logs."""
+    return ' '.join('{}={}'.format(k, v) for k, v in sorted(report.items()))
+
+
+def routes(server_handle):
+    """Register the route which returns the memory report of the worker serving the request."""
+
+    @server_handle.route('/memory-report')
+    def serve_memory_report():
+        return jsonify(memory_report())
+
+
+def children_pids(parent_pid):
+    """List the pids of the children of a process (linux)."""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/{}/stat'.format(entry)) as f:
+                # the process name is in parenthesis and may contain spaces
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def deployment_report(master_pid):
+    """Gather the memory of the master process and of each of its workers, and the totals."""
+    workers = {
+        pid: read_smaps_rollup('/proc/{}/smaps_rollup'.format(pid))
+        for pid in children_pids(master_pid)
+    }
+    master = read_smaps_rollup('/proc/{}/smaps_rollup'.format(master_pid))
+    total = {
+        field: master.get(field, 0) + sum(w.get(field, 0) for w in workers.values())
+        for field in SMAPS_FIELDS
+    }
+    return {'master': master, 'workers': workers, 'total': total}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description='Report the memory (in kB) of a WSGI master process and of its workers'
+    )
+    parser.add_argument('master_pid', type=int)
+    args = parser.parse_args()
+    print(json.dumps(deployment_report(args.master_pid), indent=2))
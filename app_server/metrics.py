@@ -0,0 +1,227 @@
+"""Metrics of the callbacks and of the server in the Prometheus text format
+
+`instrument` wraps every registered callback of the app. The number of calls, the calls which
+raised an exception or did not update their output (PreventUpdate), the histogram of the latency
+and the bytes of the requests and responses are recorded per callback output id. The route
+/metrics exposes them with the statistics of the callback caches, of the compression, of the
+compute pool and of the coalescing of the flex recomputations.
+
+The metrics of the callbacks are held in shared memory allocated by `instrument`, which is called
+when the app is loaded: the workers forked afterwards (see wsgi.py) update the same counters, so
+/metrics reports the whole deployment whichever worker serves it. The other statistics are those
+of the worker serving the request, except the flex recomputations which are shared as well.
+
+A call costs two reads of the clock and the update of a few counters under a lock.
+"""
+import functools
+import multiprocessing
+import time
+from flask import Response, has_request_context, request
+from dash.exceptions import PreventUpdate
+
+from app_layouts.callback_cache import cache_stats
+from app_layouts.debounce import debounce_stats
+
+from .compression import compression_stats
+from .compute_pool import compute_stats
+
+# upper bounds in seconds of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+
+# fields recorded per callback, followed by the counts of the buckets
+FIELDS = ['calls', 'exceptions', 'prevented', 'request_bytes', 'response_bytes', 'latency_sum']
+N_FIELDS = len(FIELDS) + len(LATENCY_BUCKETS) + 1
+
+_LOCK = multiprocessing.Lock()
+
+# 'callbacks' -> list of the output ids of the instrumented callbacks, 'values' -> shared array
+_METRICS = {'callbacks': [], 'values': None}
+
+
+def _record(row, latency, request_bytes, response_bytes=0, exception=False, prevented=False):
+    values = _METRICS['values']
+    start = row * N_FIELDS
+    bucket = len(LATENCY_BUCKETS)
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if latency <= bound:
+            bucket = i
+            break
+    with _LOCK:
+        values[start] += 1
+        values[start + 1] += exception
+        values[start + 2] += prevented
+        values[start + 3] += request_bytes
+        values[start + 4] += response_bytes
+        values[start + 5] += latency
+        values[start + len(FIELDS) + bucket] += 1
+
+
+def _instrumented(func, row):
+    """Wrap the function of a callback, which returns its json response, to record its metrics."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        request_bytes = (request.content_length or 0) if has_request_context() else 0
+        start = time.perf_counter()
+        try:
+            answer = func(*args, **kwargs)
+        except PreventUpdate:
+            _record(row, time.perf_counter() - start, request_bytes, prevented=True)
+            raise
+        except Exception:
+            _record(row, time.perf_counter() - start, request_bytes, exception=True)
+            raise
+        # the json of the response is ascii, its length is its size in bytes
+        _record(row, time.perf_counter() - start, request_bytes, len(answer))
+        return answer
+
+    return wrapper
+
+
+def instrument(app_handle):
+    """Record the metrics of all the callbacks registered in the app so far.
+
+    Only the first call has an effect, it must come after the callbacks are registered.
+    """
+    if _METRICS['values'] is not None:
+        return
+    callbacks = sorted(app_handle.callback_map)
+    _METRICS['values'] = multiprocessing.RawArray('d', N_FIELDS * len(callbacks))
+    _METRICS['callbacks'] = callbacks
+    for row, output in enumerate(callbacks):
+        entry = app_handle.callback_map[output]
+        entry['callback'] = _instrumented(entry['callback'], row)
+
+
+def callback_metrics():
+    """Return the metrics of each callback, the bucket counts are cumulative."""
+    values = _METRICS['values']
+    with _LOCK:
+        values = list(values) if values is not None else []
+    metrics = {}
+    for row, output in enumerate(_METRICS['callbacks']):
+        row_values = values[row * N_FIELDS:(row + 1) * N_FIELDS]
+        metric = dict(zip(FIELDS, row_values))
+        bounds = LATENCY_BUCKETS + (float('inf'),)
+        buckets = []
+        count = 0
+        for bound, bucket_count in zip(bounds, row_values[len(FIELDS):]):
+            count = count + bucket_count
+            buckets.append((bound, count))
+        metric['buckets'] = buckets
+        metrics[output] = metric
+    return metrics
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Exposition(object):
+    """Lines of the Prometheus text format."""
+
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, description, samples):
+        """Add a metric with its samples, a list of (suffix, labels, value)."""
+        self.lines.append('# HELP {} {}'.format(name, description))
+        self.lines.append('# TYPE {} {}'.format(name, kind))
+        for suffix, labels, value in samples:
+            labels = ','.join('{}="{}"'.format(k, _label(v)) for k, v in labels)
+            self.lines.append('{}{}{} {}'.format(
+                name, suffix, '{' + labels + '}' if labels else '', _number(value)
+            ))
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def metrics_text():
+    """Write all the metrics in the Prometheus text format."""
+    out = _Exposition()
+    callbacks = callback_metrics()
+
+    for field, kind, description in [
+        ('calls', 'counter', 'Number of calls of the callback'),
+        ('exceptions', 'counter', 'Number of calls of the callback which raised an exception'),
+        ('prevented', 'counter', 'Number of calls of the callback which did not update'),
+        ('request_bytes', 'counter', 'Bytes of the requests of the callback'),
+        ('response_bytes', 'counter', 'Bytes of the responses of the callback'),
+    ]:
+        out.metric(
+            'ndc_callback_{}_total'.format(field),
+            kind,
+            description,
+            [('', [('callback', output)], m[field]) for output, m in callbacks.items()]
+        )
+
+    samples = []
+    for output, m in callbacks.items():
+        for bound, count in m['buckets']:
+            samples.append(('_bucket', [('callback', output), ('le', _number(bound))], count))
+        samples.append(('_sum', [('callback', output)], m['latency_sum']))
+        samples.append(('_count', [('callback', output)], m['calls']))
+    out.metric(
+        'ndc_callback_latency_seconds',
+        'histogram',
+        'Latency of the callback, serialization of the response included',
+        samples
+    )
+
+    caches = cache_stats()
+    for field in ['hits', 'misses']:
+        out.metric(
+            'ndc_callback_cache_{}_total'.format(field),
+            'counter',
+            'Number of {} of the memoized callback in this worker'.format(field),
+            [('', [('callback', name)], stats[field]) for name, stats in caches.items()]
+        )
+
+    compression = compression_stats()
+    for field, description in [
+        ('responses', 'Number of compressed responses in this worker'),
+        ('bytes_in', 'Bytes of the responses before compression in this worker'),
+        ('bytes_out', 'Bytes of the responses after compression in this worker'),
+    ]:
+        out.metric(
+            'ndc_compression_{}_total'.format(field),
+            'counter',
+            description,
+            [('', [('encoding', enc)], stats[field]) for enc, stats in compression.items()]
+        )
+
+    jobs = compute_stats()
+    out.metric(
+        'ndc_compute_jobs_total',
+        'counter',
+        'Number of jobs of the compute pool per outcome in this worker',
+        [
+            ('', [('outcome', outcome)], jobs[outcome])
+            for outcome in ['submitted', 'completed', 'failed', 'rejected', 'timeouts']
+        ]
+    )
+
+    out.metric(
+        'ndc_flex_recomputes_total',
+        'counter',
+        'Number of recomputations of the flex scenario per outcome',
+        [('', [('outcome', outcome)], n) for outcome, n in sorted(debounce_stats().items())]
+    )
+    return out.text()
+
+
+def routes(server_handle):
+    """Register the route of the metrics."""
+
+    @server_handle.route('/metrics')
+    def serve_metrics():
+        return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,85 @@
+"""Opt-in profiling of the callbacks of real requests
+
+When NDC_PROFILE_DIR is set, `instrument` wraps every registered callback: a fraction
+NDC_PROFILE_RATE of the calls, and the calls whose request has the header `X-NDC-Profile: 1`, run
+under cProfile and the profile is saved in NDC_PROFILE_DIR as
+`<callback output id>-<hash of the arguments>-<timestamp>.prof`. When NDC_PROFILE_DIR is not set
+the callbacks are not wrapped at all.
+
+cProfile only records the calling thread, the jobs of the compute pool submitted by a profiled call
+are therefore run in the request thread (see compute_pool.inline_jobs).
+
+A profile can be read with `python -m pstats <file>` or with a viewer such as snakeviz.
+
+Environment variables:
+- NDC_PROFILE_DIR : directory of the profiles, the profiling is disabled if it is not set
+- NDC_PROFILE_RATE : fraction of the calls which are profiled (default 0.01)
+"""
+import cProfile
+import functools
+import os
+import random
+import re
+import time
+from flask import has_request_context, request
+
+from .compute_pool import inline_jobs
+from .keys import canonical_key
+
+PROFILE_DIR = os.environ.get('NDC_PROFILE_DIR')
+
+PROFILE_RATE = float(os.environ.get('NDC_PROFILE_RATE', 0.01))
+
+PROFILE_HEADER = 'X-NDC-Profile'
+
+# the output ids of the callbacks are shortened to this length in the names of the files
+MAX_NAME_LENGTH = 80
+
+
+def profile_fname(output, args, directory=None):
+    """Return the name of the file of the profile of a call.
+
+    :param output: (str) output id of the callback
+    :param args: list of the arguments of the call
+    :param directory: (str) directory of the profiles, default is PROFILE_DIR
+    """
+    if directory is None:
+        directory = PROFILE_DIR
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', output).strip('_')[:MAX_NAME_LENGTH]
+    return os.path.join(directory, '{}-{}-{}.prof'.format(
+        name,
+        canonical_key(list(args))[:12],
+        time.strftime('%Y%m%dT%H%M%S')
+    ))
+
+
+def _requested():
+    """Return True if the request asks to be profiled."""
+    return has_request_context() and request.headers.get(PROFILE_HEADER) == '1'
+
+
+def _profiled(func, output):
+    """Wrap the function of a callback to profile a sample of its calls."""
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        if random.random() >= PROFILE_RATE and not _requested():
+            return func(*args)
+        profiler = cProfile.Profile()
+        try:
+            with inline_jobs():
+                return profiler.runcall(func, *args)
+        finally:
+            # the profile of a call which raised, e.g. PreventUpdate, is saved as well
+            profiler.dump_stats(profile_fname(output, args))
+
+    return wrapper
+
+
+def instrument(app_handle):
+    """Profile a sample of the calls of all the callbacks, if NDC_PROFILE_DIR is set."""
+    if not PROFILE_DIR:
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    for output, entry in app_handle.callback_map.items():
+        entry['callback'] = _profiled(entry['callback'], output)
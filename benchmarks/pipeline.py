@@ -0,0 +1,249 @@
+"""Benchmark of the stages of the model pipeline of data/data_preparation.py
+
+The raw data is scaled by repeating its rows (1, 10, 100 and 10 000 times by default). Each stage
+is timed on the same prepared input `--repeat` times, then run once more under tracemalloc to
+measure the peak of the memory it allocates. The inputs of a stage are prepared outside of its
+timing.
+
+The scaling exponent of a stage is the slope of log(time) against log(rows) between the two
+largest scales: 1 is linear, 2 quadratic. The smallest scales are dominated by the fixed costs of
+pandas and are not used.
+
+With `--synthetic` the rows of each scale are drawn by data/synthetic_data.py from the
+distributions of the raw data instead of being copies of its rows.
+
+Usage, from the root of the repository:
+
+    python -m benchmarks.pipeline --scales 1 10 100 --json benchmark.json
+"""
+import math
+import statistics
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from data.data_preparation import (
+    BAU_SCENARIO,
+    SE4ALL_SCENARIO,
+    PROG_SCENARIO,
+    SCENARIOS,
+    MIN_TIER_LEVEL,
+    POP_RES,
+    INVEST_RES,
+    GHG_RES,
+    GHG_ER_RES,
+    prepare_endogenous_variables,
+    prepare_bau_data,
+    prepare_se4all_data,
+    prepare_prog_data,
+    extract_results_scenario,
+    _compute_ghg_emissions,
+    prepare_results_tables,
+)
+from data.results_store import AGGREGATE_COLUMNS
+from data.synthetic_data import fit_raw_data, read_raw_data, sample_raw_data
+
+SCALES = [1, 10, 100, 10000]
+
+# (result category, ghg_er) of the results tables
+TABLE_CATEGORIES = [(POP_RES, False), (INVEST_RES, False), (GHG_RES, False), (GHG_ER_RES, True)]
+
+STAGES = [
+    'prepare_endogenous_variables',
+    'prepare_bau_data',
+    'prepare_se4all_data',
+    'prepare_prog_data',
+    'extract_results_scenario[bau]',
+    'extract_results_scenario[uea]',
+    'extract_results_scenario[prog]',
+    '_compute_ghg_emissions',
+    'prepare_results_tables',
+]
+
+
+def scale_raw_data(df, scale):
+    """Repeat the rows of the raw data.
+
+    :param df: (pandas.DataFrame) raw data
+    :param scale: (int) number of copies of the rows
+    :return: a DataFrame with scale times the rows of df
+    """
+    return pd.concat([df] * scale, ignore_index=True)
+
+
+def _results_tables(results):
+    """Aggregate the results of each scenario over all rows and compute their tables."""
+    for sce in SCENARIOS:
+        world = results[sce][AGGREGATE_COLUMNS].sum(axis=0)
+        for result_category, ghg_er in TABLE_CATEGORIES:
+            prepare_results_tables(world.copy(), sce, result_category, ghg_er)
+
+
+def pipeline_stages(raw_df, min_tier_level=MIN_TIER_LEVEL):
+    """Prepare the inputs of the stages of the pipeline.
+
+    :param raw_df: (pandas.DataFrame) raw data
+    :param min_tier_level: (int) minimum TIER level
+    :return: a dict with the STAGES as keys and (setup, func) as values, setup returns the
+    arguments of func
+    """
+    endo = prepare_endogenous_variables(input_df=raw_df, min_tier_level=min_tier_level)
+    prepared = {
+        BAU_SCENARIO: prepare_bau_data(input_df=endo),
+        SE4ALL_SCENARIO: prepare_se4all_data(input_df=endo),
+        PROG_SCENARIO: prepare_prog_data(input_df=endo),
+    }
+    results = {}
+    for sce in SCENARIOS:
+        results[sce] = extract_results_scenario(
+            prepared[sce],
+            sce,
+            min_tier_level,
+            bau_results=results.get(BAU_SCENARIO),
+            save_bau_results=False
+        )
+
+    def extract(sce):
+        return (
+            lambda: (prepared[sce], sce, min_tier_level),
+            lambda *args: extract_results_scenario(
+                *args,
+                bau_results=results[BAU_SCENARIO] if sce != BAU_SCENARIO else None,
+                save_bau_results=False
+            )
+        )
+
+    return {
+        'prepare_endogenous_variables': (
+            lambda: (raw_df, min_tier_level),
+            prepare_endogenous_variables
+        ),
+        'prepare_bau_data': (lambda: (endo,), prepare_bau_data),
+        'prepare_se4all_data': (lambda: (endo,), prepare_se4all_data),
+        'prepare_prog_data': (lambda: (endo,), prepare_prog_data),
+        'extract_results_scenario[bau]': extract(BAU_SCENARIO),
+        'extract_results_scenario[uea]': extract(SE4ALL_SCENARIO),
+        'extract_results_scenario[prog]': extract(PROG_SCENARIO),
+        # the emissions are computed in place, each run gets its own copy
+        '_compute_ghg_emissions': (
+            lambda: (results[SE4ALL_SCENARIO].copy(), min_tier_level, results[BAU_SCENARIO]),
+            _compute_ghg_emissions
+        ),
+        'prepare_results_tables': (lambda: (results,), _results_tables),
+    }
+
+
+def run_stage(setup, func, repeat):
+    """Time a stage and measure the peak of its allocations.
+
+    :return: a dict with the min and median of the times in seconds and the peak in MB
+    """
+    times = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+
+    args = setup()
+    tracemalloc.start()
+    try:
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'peak_mb': peak / 1e6,
+    }
+
+
+def run_benchmark(raw_df, scales=None, repeat=3, stages=None, synthetic=False):
+    """Run the stages of the pipeline at each scale of the raw data.
+
+    :param raw_df: (pandas.DataFrame) raw data
+    :param scales: list of the numbers of copies of the rows, default is SCALES
+    :param repeat: (int) number of timed runs of each stage
+    :param stages: list of the STAGES to run, default is all of them
+    :param synthetic: (bool) draw synthetic rows instead of repeating the rows of raw_df
+    :return: a list of records, one per stage and scale
+    """
+    if scales is None:
+        scales = SCALES
+    if stages is None:
+        stages = STAGES
+    if synthetic:
+        model = fit_raw_data(raw_df)
+        rng = np.random.default_rng(0)
+    records = []
+    for scale in scales:
+        if synthetic:
+            df = sample_raw_data(model, scale * len(raw_df.index), rng)
+        else:
+            df = scale_raw_data(raw_df, scale)
+        stage_funcs = pipeline_stages(df)
+        for stage in stages:
+            setup, func = stage_funcs[stage]
+            record = {'stage': stage, 'scale': scale, 'rows': len(df.index), 'repeat': repeat}
+            record.update(run_stage(setup, func, repeat))
+            records.append(record)
+    return records
+
+
+def scaling_exponents(records):
+    """Return the slope of log(time) against log(rows) between the two largest scales per stage."""
+    exponents = {}
+    for stage in dict.fromkeys(r['stage'] for r in records):
+        points = sorted(
+            (r['rows'], r['median_s']) for r in records if r['stage'] == stage
+        )
+        if len(points) < 2:
+            continue
+        (rows_a, time_a), (rows_b, time_b) = points[-2:]
+        if rows_a == rows_b or time_a <= 0 or time_b <= 0:
+            continue
+        exponents[stage] = math.log(time_b / time_a) / math.log(rows_b / rows_a)
+    return exponents
+
+
+def format_records(records, exponents):
+    """Format the records as a table followed by the scaling exponents."""
+    lines = ['{:>9} {:>11} {:>11} {:>10}  {}'.format(
+        'rows', 'median ms', 'min ms', 'peak MB', 'stage'
+    )]
+    for r in records:
+        lines.append('{:>9} {:>11.2f} {:>11.2f} {:>10.1f}  {}'.format(
+            r['rows'], 1000 * r['median_s'], 1000 * r['min_s'], r['peak_mb'], r['stage']
+        ))
+    lines.append('')
+    lines.append('scaling exponents (1 is linear)')
+    for stage, exponent in exponents.items():
+        lines.append('{:>9.2f}  {}'.format(exponent, stage))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Benchmark of the stages of the model pipeline')
+    parser.add_argument('--input', default='data/raw_data.csv', help='raw data csv file')
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES,
+                        help='numbers of copies of the rows of the raw data')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, help='stages to run')
+    parser.add_argument('--synthetic', action='store_true',
+                        help='draw synthetic rows instead of repeating the rows of the raw data')
+    parser.add_argument('--json', help='file in which the results are written as json')
+    args = parser.parse_args()
+
+    raw = read_raw_data(args.input)
+    answer = run_benchmark(raw, args.scales, args.repeat, args.stages, args.synthetic)
+    slopes = scaling_exponents(answer)
+    print(format_records(answer, slopes))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'records': answer, 'scaling_exponents': slopes}, f, indent=2)
@@ -71,6 +71,13 @@ SCENARIOS_NAMES = {
 
 FLEX_SCENARIO_NAME = 'Custom'
 
+WORLD_ID = 'WD'
+# Region names in nice format
+REGIONS_GPD = dict(WD='World', SA='Central & South America', AF='Africa', AS='Asia')
+
+# code in the raw data columns
+REGIONS_NDC = dict(WD=['LA', 'SSA', 'DA'], SA='LA', AF='SSA', AS='DA')
+
 POP_RES = 'pop'
 INVEST_RES = 'invest'
 GHG_RES = 'ghg'
@@ -319,6 +326,64 @@ def compute_rise_shifts(rise, pop_get, opt, flag=''):
     return df.iloc[4, ELECTRIFICATION_OPTIONS.index(opt)]
 
 
+def compute_all_rise_shifts(rise, pop_get, flags=None):
+    """Compute the shifts due to RISE indicators of many rows at once
+
+    Same model as `compute_rise_shifts`, for all the electrification options of all the rows.
+
+    :param rise: array of shape (n, 3) with the RISE scores for grid, mg, shs, resp.
+    :param pop_get: array of shape (n, 3) with the endogenous population getting grid, mg, shs,
+    resp.
+    :param flags: list of n labels displayed in the error message of the rows whose shifts do not
+    sum to zero (could be the names of the countries)
+    :return: array of shape (n, 3) with the shifts in the endo population of grid, mg, shs, resp.
+    """
+    rise = np.asarray(rise, dtype=float)
+    pop_get = np.asarray(pop_get, dtype=float)
+    rows = np.arange(rise.shape[0])
+
+    # options with the lowest (n), highest (m) and intermediate (p) RISE scores
+    n = np.argmin(rise, axis=1)
+    m = np.argmax(rise, axis=1)
+    # rows where the RISE scores are all equal have no shifts
+    unequal = n != m
+    p = np.where(unequal, 3 - n - m, 0)
+    R_n = rise[rows, n]
+    R_m = rise[rows, m]
+    R_p = rise[rows, p]
+
+    shifts = np.zeros(rise.shape)
+
+    Delta_n = (R_m - R_n) / 100
+    shifts[rows, n] = - pop_get[rows, n] * Delta_n
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        norm = (R_m - R_n) + (R_p - R_n)
+        shifts[rows, m] = np.abs(shifts[rows, n]) * (R_m - R_n) / norm
+        shifts[rows, p] = np.abs(shifts[rows, n]) * (R_p - R_n) / norm
+
+    # $\Delta N_{pm} =  N_p \frac{\delta_{mp}}{100}$
+    DeltaN_pm = pop_get[rows, p] * (R_m - R_p) / 100
+    # $\Delta N_{p} = \Delta N_{np} - \Delta N_{pm}$
+    shifts[rows, p] = shifts[rows, p] - DeltaN_pm
+    # $\Delta N_{m} = \Delta N_{nm} + \Delta N_{pm}$
+    shifts[rows, m] = shifts[rows, m] + DeltaN_pm
+
+    shifts[~unequal] = 0
+
+    if flags is None:
+        flags = rows
+    for i in np.flatnonzero(shifts.sum(axis=1) > 1e-6):
+        logging.error(
+            'Error ({}): the sum of the shifts ({}) is not equal to zero!'.format(
+                flags[i],
+                shifts[i].sum(),
+            )
+        )
+
+    return shifts
+
+
 def _slope_capacity_vs_yearly_consumption(tier_level):
     """Linearize the relation between min rated capacity and min annual consumption
 
@@ -579,21 +644,11 @@ def prepare_se4all_data(
     for opt in ELECTRIFICATION_OPTIONS:
         df['endo_pop_get_%s_2030' % opt] = df['pop_%s_share' % opt] * df.pop_newly_electrified_2030
 
-    shift_rise_df = []
-
-    for idx, row in df.iterrows():
-        shift_rise = []
-        for opt in ELECTRIFICATION_OPTIONS:
-            shift_rise.append(
-                compute_rise_shifts(
-                    row[RISE_INDICES].values,
-                    row[ENDO_POP_GET].values,
-                    opt,
-                    row['country_iso'],
-                )
-            )
-        shift_rise_df.append(shift_rise)
-    shift_rise_df = np.vstack(shift_rise_df)
+    shift_rise_df = compute_all_rise_shifts(
+        df[RISE_INDICES].values,
+        df[ENDO_POP_GET].values,
+        df['country_iso'].values
+    )
 
     for i, opt in enumerate(ELECTRIFICATION_OPTIONS):
         df['shift_rise_%s' % opt] = shift_rise_df[:, i]
@@ -850,8 +905,23 @@ def extract_results_scenario(
         min_tier_level,
         regions=None,
         bau_data=None,
-
+        bau_results=None,
+        save_bau_results=True,
 ):
+    """Compute the exogenous results of a scenario from the prepared data.
+
+    :param input_df: (pandas.DataFrame) output of `prepare_scenario_data`
+    :param scenario: (str) name of the scenario
+    :param min_tier_level: (int) minimum TIER level
+    :param regions: list of the regions of the bau data
+    :param bau_data: (pandas.DataFrame) regional data of the bau scenario
+    :param bau_results: (pandas.DataFrame) results of the bau scenario with the same index as
+    input_df, used to compute the emissions reductions of the other scenarios. They are read from
+    data/bau_results.csv if None
+    :param save_bau_results: (bool) write the results of the bau scenario to
+    data/bau_results.csv
+    :return: a copy of the dataframe with the results
+    """
     df = input_df.copy()
 
     if scenario == BAU_SCENARIO:
@@ -917,10 +987,12 @@ def extract_results_scenario(
 
     if scenario == BAU_SCENARIO:
         _compute_ghg_emissions(df, min_tier_level)
-        df.to_csv('data/bau_results.csv')
+        if save_bau_results:
+            df.to_csv('data/bau_results.csv')
     else:
-        bau_data = pd.read_csv('data/bau_results.csv')
-        _compute_ghg_emissions(df, min_tier_level, bau_df=bau_data)
+        if bau_results is None:
+            bau_results = pd.read_csv('data/bau_results.csv')
+        _compute_ghg_emissions(df, min_tier_level, bau_df=bau_results)
 
     _compute_investment_cost(df)
 
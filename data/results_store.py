@@ -0,0 +1,428 @@
+"""Process-wide store of the scenarios' results
+
+The model is computed once per process for all the scenarios and the results are shared by the
+static and flex layouts (and any other page) which read from this store instead of computing
+their own copy. The store is populated by `warm_up` and is not modified afterwards, the getters
+always return copies so that callbacks can freely alter what they receive.
+
+The results of the custom scenarios of the flex page are computed on demand and kept in a bounded
+cache keyed by the scenario's parameters, so that the browser only needs to hold these parameters.
+
+The numeric results are kept in read-only numpy buffers rather than in many python objects. When
+the store is warmed up before the WSGI server forks its workers (see wsgi.py), the memory pages of
+these buffers are never written to and stay shared between the workers.
+"""
+import collections
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from data import snapshot
+from data.data_preparation import (
+    MIN_TIER_LEVEL,
+    SCENARIOS,
+    BAU_SCENARIO,
+    SE4ALL_SCENARIO,
+    EXO_RESULTS,
+    RISE_INDICES,
+    WORLD_ID,
+    REGIONS_NDC,
+    compute_ndc_results_from_raw_data,
+    prepare_results_tables,
+    prepare_endogenous_variables,
+    prepare_scenario_data,
+    extract_results_scenario,
+)
+
+# columns which are summed over the countries to obtain the results of a region
+AGGREGATE_COLUMNS = EXO_RESULTS + ['pop_newly_electrified_2030']
+
+# maximum number of custom scenarios' results kept in memory
+FLEX_CACHE_SIZE = 512
+
+# maximum number of other minimum TIER levels whose results are kept in memory
+TIER_CACHE_SIZE = 4
+
+_LOCK = threading.Lock()
+
+# scenario -> results of all countries, as returned by `_freeze_results`
+_RESULTS = {}
+# short hash of the results, identifies the version of the store
+_VERSION = {}
+# parameters of `warm_up` used to compute the results of the store
+_PARAMETERS = {}
+# scenario -> {country iso: row position in the buffers of the scenario}
+_POSITIONS = {}
+# (scenario, region id) -> read-only array with the row positions of the region's countries
+_REGION_POSITIONS = {}
+# minimum TIER level -> results of all scenarios, the least recently used are dropped first
+_TIER_RESULTS = collections.OrderedDict()
+_TIER_LOCK = threading.Lock()
+# parameters of a custom scenario -> its results, the least recently used are dropped first
+_FLEX_RESULTS = collections.OrderedDict()
+_FLEX_LOCK = threading.Lock()
+# country iso -> country name
+_NAMES = {}
+# region id -> DataFrame with the countries' centroids
+_CENTROIDS = {}
+# (scenario, region id) -> read-only array with the sums of the countries' results
+_AGGREGATES = {}
+
+
+def extract_centroids(reg):
+    """Load the longitude and latitude of countries per region."""
+    if not isinstance(reg, list):
+        reg = [reg]
+    centroids = pd.read_csv('data/centroid.csv')
+    return centroids.loc[centroids.region.isin(reg)].copy()
+
+
+def _read_only(values):
+    """Return a contiguous float copy of values which cannot be modified."""
+    values = np.array(values, dtype=float, order='C')
+    values.setflags(write=False)
+    return values
+
+
+def _read_positions(positions):
+    """Return an integer copy of positions which cannot be modified."""
+    positions = np.array(positions, dtype=np.intp)
+    positions.setflags(write=False)
+    return positions
+
+
+def _freeze_results(df):
+    """Split a DataFrame between a read-only buffer for the numeric columns and the others."""
+    numeric_columns = df.select_dtypes(include=[np.number]).columns
+    return dict(
+        values=_read_only(df[numeric_columns].values),
+        numeric_columns=list(numeric_columns),
+        numeric_positions={col: j for j, col in enumerate(numeric_columns)},
+        dtypes=df[numeric_columns].dtypes.to_dict(),
+        labels=df.drop(columns=numeric_columns),
+        columns=list(df.columns),
+        index=df.index,
+    )
+
+
+def _thaw_results(frozen, positions=None):
+    """Build a DataFrame from the output of `_freeze_results`.
+
+    :param frozen: output of `_freeze_results`
+    :param positions: row positions to select, all the rows if None
+    """
+    values = frozen['values']
+    labels = frozen['labels']
+    index = frozen['index']
+    if positions is None:
+        values = np.array(values)
+    else:
+        # indexing with an array of positions copies the rows
+        values = values[positions]
+        labels = labels.iloc[positions]
+        index = index[positions]
+    df = pd.DataFrame(
+        values,
+        columns=frozen['numeric_columns'],
+        index=index,
+    ).astype(frozen['dtypes'])
+    df = pd.concat([df, labels], axis=1)
+    return df[frozen['columns']]
+
+
+def _index_positions(results):
+    """Resolve the row positions of the countries and of the regions once for all."""
+    positions = {}
+    region_positions = {}
+    for sce, df in results.items():
+        positions[sce] = {iso: i for i, iso in enumerate(df.country_iso)}
+        for reg in REGIONS_NDC:
+            if reg == WORLD_ID:
+                region_positions[(sce, reg)] = _read_positions(np.arange(len(df.index)))
+            else:
+                region_positions[(sce, reg)] = _read_positions(
+                    np.flatnonzero((df.region == REGIONS_NDC[reg]).values)
+                )
+    return positions, region_positions
+
+
+def _compute_results(min_tier_level, fname):
+    """Compute the results, the centroids and the regional aggregates of all scenarios."""
+    results = {
+        sce: compute_ndc_results_from_raw_data(sce, min_tier_level, fname)
+        for sce in SCENARIOS
+    }
+    centroids = {reg: extract_centroids(REGIONS_NDC[reg]) for reg in REGIONS_NDC}
+    aggregates = {}
+    for sce in SCENARIOS:
+        for reg in REGIONS_NDC:
+            df = results[sce]
+            if reg != WORLD_ID:
+                df = df.loc[df.region == REGIONS_NDC[reg]]
+            aggregates[(sce, reg)] = df[AGGREGATE_COLUMNS].sum(axis=0)
+    return results, centroids, aggregates
+
+
+def warm_up(min_tier_level=MIN_TIER_LEVEL, fname='data/raw_data.csv'):
+    """Compute the results of all scenarios, only the first call in a process has an effect.
+
+    The results are restored from the app's snapshot if it is valid.
+
+    :param min_tier_level: (int) minimum TIER level
+    :param fname: (str) path to the raw data csv file
+    """
+    # every getter calls warm_up, once the store is ready they do not wait for the lock
+    if _RESULTS:
+        return
+    with _LOCK:
+        if _RESULTS:
+            return
+        results, centroids, aggregates = snapshot.cached(
+            'results_store-{}-{}'.format(min_tier_level, fname),
+            lambda: _compute_results(min_tier_level, fname)
+        )
+
+        # the other scenarios read the bau results from this file when they are recomputed
+        if not os.path.exists('data/bau_results.csv'):
+            results[BAU_SCENARIO].to_csv('data/bau_results.csv')
+
+        frozen = {sce: _freeze_results(df) for sce, df in results.items()}
+        positions, region_positions = _index_positions(results)
+        digest = hashlib.sha1()
+        for sce in SCENARIOS:
+            digest.update(frozen[sce]['values'].tobytes())
+        _VERSION['results'] = digest.hexdigest()[:12]
+
+        _PARAMETERS.update(min_tier_level=min_tier_level, fname=fname)
+        _POSITIONS.update(positions)
+        _REGION_POSITIONS.update(region_positions)
+        _NAMES.update(zip(results[BAU_SCENARIO].country_iso, results[BAU_SCENARIO].country))
+        _CENTROIDS.update(centroids)
+        _AGGREGATES.update({k: _read_only(v.values) for k, v in aggregates.items()})
+        # filled last as it is the flag that the store is ready
+        _RESULTS.update(frozen)
+
+
+def results_version():
+    """Return a short hash identifying the content of the store."""
+    warm_up()
+    return _VERSION['results']
+
+
+def scenario_results(scenario):
+    """Return the results of all countries for a scenario."""
+    warm_up()
+    return _thaw_results(_RESULTS[scenario])
+
+
+def compute_tier_results(min_tier_level, fname):
+    """Compute the results of all scenarios for another minimum TIER level, without cache.
+
+    The bau results are passed to the other scenarios in memory, data/bau_results.csv is left
+    untouched as it holds the results of the store.
+    """
+    df = pd.read_csv(fname, float_precision='high', encoding='latin')
+    df = prepare_endogenous_variables(input_df=df, min_tier_level=min_tier_level)
+    results = {}
+    for sce in SCENARIOS:
+        results[sce] = extract_results_scenario(
+            prepare_scenario_data(df, sce, min_tier_level),
+            sce,
+            min_tier_level,
+            bau_results=results.get(BAU_SCENARIO),
+            save_bau_results=False
+        )
+    return {sce: _freeze_results(df) for sce, df in results.items()}
+
+
+def _tier_results(min_tier_level, run=None):
+    """Return the results of all scenarios for another minimum TIER level, see `warm_up_tier`."""
+    with _TIER_LOCK:
+        results = _TIER_RESULTS.get(min_tier_level)
+        if results is not None:
+            _TIER_RESULTS.move_to_end(min_tier_level)
+    if results is None:
+        if run is None:
+            results = compute_tier_results(min_tier_level, _PARAMETERS['fname'])
+        else:
+            # the results are cached in this process even if run computes them in another one
+            results = run(compute_tier_results, min_tier_level, _PARAMETERS['fname'])
+        with _TIER_LOCK:
+            _TIER_RESULTS[min_tier_level] = results
+            while len(_TIER_RESULTS) > TIER_CACHE_SIZE:
+                _TIER_RESULTS.popitem(last=False)
+    return results
+
+
+def warm_up_tier(min_tier_level, run=None):
+    """Compute the results of a minimum TIER level if they are neither in the store nor cached.
+
+    :param min_tier_level: (int) minimum TIER level
+    :param run: function called as run(func, *args) to compute the results, e.g.
+    compute_pool.run_job, the results are computed in the current thread if None
+    """
+    warm_up()
+    if min_tier_level != _PARAMETERS['min_tier_level']:
+        _tier_results(min_tier_level, run)
+
+
+def tier_scenario_results(scenario, min_tier_level):
+    """Return the results of all countries for a scenario and a minimum TIER level.
+
+    The results of the minimum TIER level of the store are read from the store, the results of
+    the other levels are computed on demand and kept in a bounded cache.
+    """
+    warm_up()
+    if min_tier_level == _PARAMETERS['min_tier_level']:
+        return scenario_results(scenario)
+    return _thaw_results(_tier_results(min_tier_level)[scenario])
+
+
+def custom_rise_results(scenario, min_tier_level, countries, rise):
+    """Compute the results of many countries with custom RISE scores in a single run.
+
+    :param scenario: (str) name of the scenario, the RISE scores are not used by the bau scenario
+    and the prog scenario sets the scores of mg and shs to 100
+    :param min_tier_level: (int) minimum TIER level
+    :param countries: list of n iso codes, a country can appear several times
+    :param rise: array of shape (n, 3) with the RISE scores for grid, mg, shs, NaN keeps the
+    country's score
+    :return: a DataFrame with n rows, in the order of countries
+    """
+    results = tier_scenario_results(scenario, min_tier_level)
+    bau = tier_scenario_results(BAU_SCENARIO, min_tier_level)
+    results_positions = pd.Series(np.arange(len(results.index)), index=results.country_iso)
+    bau_positions = pd.Series(np.arange(len(bau.index)), index=bau.country_iso)
+
+    df = results.iloc[results_positions.loc[countries].values].reset_index(drop=True)
+    rise = np.asarray(rise, dtype=float).reshape(len(df.index), len(RISE_INDICES))
+    df[RISE_INDICES] = np.where(np.isnan(rise), df[RISE_INDICES].values, rise)
+
+    df = prepare_scenario_data(df, scenario, min_tier_level)
+    return extract_results_scenario(
+        df,
+        scenario,
+        min_tier_level,
+        bau_results=bau.iloc[bau_positions.loc[countries].values].reset_index(drop=True),
+        save_bau_results=False
+    )
+
+
+def countries():
+    """Return the iso codes of the countries of the store."""
+    warm_up()
+    return list(_NAMES)
+
+
+def region_centroids(region_id):
+    """Return the centroids of the countries of a region."""
+    warm_up()
+    return _CENTROIDS[region_id].copy()
+
+
+def region_countries(scenario, region_id):
+    """Return the results of the countries of a region for a scenario."""
+    warm_up()
+    return _thaw_results(_RESULTS[scenario], _REGION_POSITIONS[(scenario, region_id)])
+
+
+def _country_positions(scenario, country_iso):
+    """Return the row positions of a country, an empty list if the country is unknown."""
+    pos = _POSITIONS[scenario].get(country_iso)
+    if pos is None:
+        return []
+    return [pos]
+
+
+def entity_results(scenario, entity):
+    """Return the results of a country or the aggregated results of a region.
+
+    :param scenario: (str) name of the scenario
+    :param entity: (str) either a country iso code or one of the region ids of REGIONS_NDC
+    :return: a DataFrame with one row for a country, a Series with the sums for a region
+    """
+    if entity in REGIONS_NDC:
+        warm_up()
+        return pd.Series(np.array(_AGGREGATES[(scenario, entity)]), index=AGGREGATE_COLUMNS)
+    warm_up()
+    return _thaw_results(_RESULTS[scenario], _country_positions(scenario, entity))
+
+
+def country_value(scenario, country_iso, column):
+    """Return the value of one column of the results of a country."""
+    warm_up()
+    frozen = _RESULTS[scenario]
+    pos = _POSITIONS[scenario][country_iso]
+    if column in frozen['numeric_positions']:
+        value = frozen['values'][pos, frozen['numeric_positions'][column]]
+        # the buffers are float, restore the original type of the column
+        return frozen['dtypes'][column].type(value).item()
+    return frozen['labels'][column].values[pos]
+
+
+def country_name(country_iso):
+    """Return the name of a country from its iso code."""
+    warm_up()
+    return _NAMES[country_iso]
+
+
+def results_table(scenario, entity, result_category, ghg_er=False):
+    """Return the numbers displayed in the results tables for a country or a region."""
+    return prepare_results_tables(
+        entity_results(scenario, entity),
+        scenario,
+        result_category,
+        ghg_er
+    )
+
+
+def buffers_nbytes():
+    """Return the size in bytes of the numeric buffers of the store."""
+    warm_up()
+    return sum(frozen['values'].nbytes for frozen in _RESULTS.values()) \
+        + sum(values.nbytes for values in _AGGREGATES.values())
+
+
+def compute_flex_scenario_results(country_iso, rise_grid, rise_mg, rise_shs, min_tier_level):
+    """Recompute the uEA scenario for one country with custom RISE scores, without cache."""
+    # restrict recalculation to one country to save time
+    df = entity_results(SE4ALL_SCENARIO, country_iso)
+    for rise_idx, rise in zip(RISE_INDICES, [rise_grid, rise_mg, rise_shs]):
+        if rise is not None:
+            df[rise_idx] = rise
+    # Compute endogenous results for the given scenario
+    df = prepare_scenario_data(df, SE4ALL_SCENARIO, min_tier_level, prepare_endogenous=True)
+    # Compute the exogenous results
+    return extract_results_scenario(df, SE4ALL_SCENARIO, min_tier_level)
+
+
+def flex_scenario_results(country_iso, rise_grid, rise_mg, rise_shs, min_tier_level, run=None):
+    """Return the results of a custom scenario of the flex page.
+
+    :param country_iso: (str) iso code of the country
+    :param rise_grid: RISE score for grid, the country's uEA score is used if None
+    :param rise_mg: RISE score for mg, the country's uEA score is used if None
+    :param rise_shs: RISE score for shs, the country's uEA score is used if None
+    :param min_tier_level: (int) minimum TIER level
+    :param run: function called as run(func, *args) to compute the results if they are not
+    cached, e.g. compute_pool.run_job, the results are computed in the current thread if None
+    :return: a DataFrame with one row
+    """
+    key = (country_iso, rise_grid, rise_mg, rise_shs, min_tier_level)
+    with _FLEX_LOCK:
+        df = _FLEX_RESULTS.get(key)
+        if df is not None:
+            _FLEX_RESULTS.move_to_end(key)
+    if df is None:
+        if run is None:
+            df = compute_flex_scenario_results(*key)
+        else:
+            # the results are cached in this process even if run computes them in another one
+            df = run(compute_flex_scenario_results, *key)
+        with _FLEX_LOCK:
+            _FLEX_RESULTS[key] = df
+            while len(_FLEX_RESULTS) > FLEX_CACHE_SIZE:
+                _FLEX_RESULTS.popitem(last=False)
+    return df.copy()
@@ -0,0 +1,151 @@
+"""Impacts of the RISE sub-indicators questions on the uEA results of every country
+
+For each country, every question of the RISE sub-indicators answered with no is flipped to yes in
+turn, which raises the RISE score of its electrification option by the weight of the question
+(see data.rise_sub_indicators). The uEA results of all the (country, question) pairs are computed
+in a single run of the model (see `results_store.custom_rise_results`). The changes with respect
+to the country's uEA results are ranked per country in the impacts table, which is built at
+warm-up so that the flex page only looks it up.
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+from data import results_store, snapshot, rise_sub_indicators
+from data.data_preparation import (
+    MIN_TIER_LEVEL,
+    SE4ALL_SCENARIO,
+    ELECTRIFICATION_OPTIONS,
+    MG,
+    SHS,
+    RISE_INDICES,
+    RISE_SUB_INDICATORS,
+    INVEST,
+)
+
+POP_OFFGRID_IMPACT = 'pop_offgrid'
+INVEST_IMPACT = 'invest'
+GHG_IMPACT = 'ghg'
+
+# impact -> (description, True if the largest change ranks first)
+IMPACT_METRICS = {
+    POP_OFFGRID_IMPACT: ('Additional people getting off-grid access', True),
+    INVEST_IMPACT: ('Change of the investment (USD)', False),
+    GHG_IMPACT: ('Change of the cumulated GHG emissions (t CO2)', False),
+}
+
+IMPACTS_COLUMNS = [
+    'country_iso',
+    'indicator',
+    'sub_indicator_group',
+    'sub_indicator_text',
+    'rise_before',
+    'rise_after',
+] + list(IMPACT_METRICS) + ['rank_{}'.format(impact) for impact in IMPACT_METRICS]
+
+_LOCK = threading.Lock()
+
+# 'table' -> DataFrame with the IMPACTS_COLUMNS
+_IMPACTS = {}
+# country iso -> row positions of the country's questions in the impacts table
+_POSITIONS = {}
+
+
+def _impact_values(df):
+    """Compute the values of the IMPACT_METRICS from the results of a scenario."""
+    return np.vstack([
+        df['pop_get_{}_2030'.format(MG)].values + df['pop_get_{}_2030'.format(SHS)].values,
+        df[INVEST].sum(axis=1).values,
+        df.ghg_tot_cumul.values,
+    ]).T
+
+
+def _question_labels():
+    """Return the indicator, group and text of each column of the answers of all options."""
+    labels = [
+        RISE_SUB_INDICATORS.loc[[rise_idx]].reset_index()
+        for rise_idx in RISE_INDICES
+    ]
+    return pd.concat(labels, ignore_index=True)[
+        ['indicator', 'sub_indicator_group', 'sub_indicator_text']
+    ]
+
+
+def build_impacts(min_tier_level=MIN_TIER_LEVEL):
+    """Compute the impacts of flipping each question answered with no for every country.
+
+    :param min_tier_level: (int) minimum TIER level
+    :return: DataFrame with the IMPACTS_COLUMNS, one row per country and question
+    """
+    uea = results_store.tier_scenario_results(SE4ALL_SCENARIO, min_tier_level) \
+        .reset_index(drop=True)
+
+    countries = [iso for iso in rise_sub_indicators.COUNTRIES if iso in set(uea.country_iso)]
+    answers = np.hstack([
+        rise_sub_indicators.yes_answers(rise_sub_indicators.ANSWERS[opt])
+        for opt in ELECTRIFICATION_OPTIONS
+    ])
+    answers = answers[[rise_sub_indicators.COUNTRY_POSITIONS[iso] for iso in countries]]
+
+    # pairs of (country, question) where the question is answered with no
+    country_idx, question_idx = np.nonzero(answers == 0)
+    pair_countries = list(np.array(countries, dtype=object)[country_idx])
+    uea_positions = pd.Series(uea.index, index=uea.country_iso).loc[pair_countries].values
+
+    # one row per pair, the RISE score of the option of the question is raised by its weight
+    pairs = np.arange(len(pair_countries))
+    option_idx = np.argmax(rise_sub_indicators.WEIGHTS[question_idx] > 0, axis=1)
+    rise_before = uea[RISE_INDICES].values.astype(float)[uea_positions, option_idx]
+    rise_after = np.minimum(
+        100,
+        rise_before + rise_sub_indicators.WEIGHTS[question_idx, option_idx]
+    )
+    rise = np.full((len(pairs), len(RISE_INDICES)), np.nan)
+    rise[pairs, option_idx] = rise_after
+
+    df = results_store.custom_rise_results(SE4ALL_SCENARIO, min_tier_level, pair_countries, rise)
+
+    changes = _impact_values(df) - _impact_values(uea.iloc[uea_positions])
+
+    impacts = _question_labels().iloc[question_idx].reset_index(drop=True)
+    impacts.insert(0, 'country_iso', pair_countries)
+    impacts['rise_before'] = rise_before
+    impacts['rise_after'] = rise_after
+    for j, (impact, (_, descending)) in enumerate(IMPACT_METRICS.items()):
+        impacts[impact] = changes[:, j]
+        impacts['rank_{}'.format(impact)] = impacts.groupby('country_iso')[impact] \
+            .rank(method='first', ascending=not descending).astype(int)
+    return impacts[IMPACTS_COLUMNS]
+
+
+def warm_up():
+    """Build the impacts table, only the first call in a process has an effect."""
+    with _LOCK:
+        if _IMPACTS:
+            return
+        impacts = snapshot.cached(
+            'rise_impacts-{}'.format(results_store.results_version()),
+            build_impacts
+        )
+        _POSITIONS.update(impacts.groupby('country_iso').indices)
+        # filled last as it is the flag that the table is ready
+        _IMPACTS['table'] = impacts
+
+
+def country_impacts(country_iso, impact=POP_OFFGRID_IMPACT, indicator=None, n=None):
+    """Return the ranked impacts of the questions answered with no by a country.
+
+    :param country_iso: iso code of the country
+    :param impact: one of the IMPACT_METRICS, the impacts are sorted by its rank
+    :param indicator: one of the RISE_INDICES to restrict the questions to an option
+    :param n: (int) maximum number of questions
+    :return: DataFrame with the IMPACTS_COLUMNS
+    """
+    warm_up()
+    impacts = _IMPACTS['table'].iloc[_POSITIONS.get(country_iso, [])]
+    if indicator is not None:
+        impacts = impacts.loc[impacts.indicator == indicator]
+    impacts = impacts.sort_values('rank_{}'.format(impact))
+    if n is not None:
+        impacts = impacts.iloc[:n]
+    return impacts.copy()
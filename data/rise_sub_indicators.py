@@ -0,0 +1,180 @@
+"""Dense arrays of the countries' answers to the RISE sub-indicators questions
+
+The answers of data/RISE_subindicators_country.csv are preprocessed once into one array per
+electrification option, with one row per country and one column per question. The columns follow
+the order of the questions in data/RISE_indicators.csv, i.e. the order of the toggles of the flex
+page and of RISE_SUB_INDICATOR_STRUCTURE. Loading the answers of a country is then a row slice.
+
+The RISE score of an option is the average over the sub-indicators groups of the share of the
+questions of the group answered with yes. This is written as a weights matrix with one row per
+question (the questions of all options side by side) and one column per option, the scores of one
+or many answer vectors (countries or hypothetical policy packages) are then a matrix product.
+"""
+import numpy as np
+import pandas as pd
+
+from data.data_preparation import (
+    ELECTRIFICATION_OPTIONS,
+    RISE_INDICES,
+    RISE_SUB_INDICATORS,
+    RISE_SUB_INDICATOR_STRUCTURE,
+)
+
+RISE_SUB_INDICATOR_SCORES_FILE = 'data/RISE_subindicators_country.csv'
+
+
+def question_columns(opt):
+    """Return the (sub-indicator group, rank of the question in its group) of each column.
+
+    :param opt: one of the ELECTRIFICATION_OPTIONS
+    :return: a list of tuples, in the order of the toggles of the flex page
+    """
+    sub_df = RISE_SUB_INDICATORS.loc['rise_{}'.format(opt)]
+    columns = []
+    for sub_group, m in zip(sub_df.sub_indicator_group.unique(), RISE_SUB_INDICATOR_STRUCTURE[opt]):
+        columns = columns + [(sub_group, q) for q in range(m)]
+    return columns
+
+
+def build_answers(scores):
+    """Arrange the countries' answers in one dense array per electrification option.
+
+    :param scores: DataFrame with the columns country_iso, indicator, sub_indicator_group and
+    value, one row per country and question
+    :return: the list of countries' iso codes (rows of the arrays) and a dict with the
+    electrification options as keys and the arrays of the answers as values. The questions
+    without answer are set to 0.
+    """
+    countries = list(scores.country_iso.unique())
+    rows = pd.Series(np.arange(len(countries)), index=countries)
+
+    answers = {}
+    for opt in ELECTRIFICATION_OPTIONS:
+        columns = question_columns(opt)
+        cols = pd.Series(np.arange(len(columns)), index=pd.MultiIndex.from_tuples(columns))
+
+        sub_df = scores.loc[scores.indicator == 'rise_{}'.format(opt)]
+        # rank of each question within its sub-indicator group for a given country
+        ranks = sub_df.groupby(['country_iso', 'sub_indicator_group']).cumcount()
+        keys = pd.MultiIndex.from_arrays([sub_df.sub_indicator_group.values, ranks.values])
+        col_idx = cols.reindex(keys).values
+        known = ~np.isnan(col_idx)
+
+        values = np.zeros((len(countries), len(columns)))
+        values[
+            rows.loc[sub_df.country_iso.values[known]].values,
+            col_idx[known].astype(int)
+        ] = sub_df.value.values[known]
+        values.setflags(write=False)
+        answers[opt] = values
+    return countries, answers
+
+
+def toggle_values(answers):
+    """Convert answers to the values of the toggles, i.e. 1 / answer and 0 for no answer."""
+    answers = np.asarray(answers, dtype=float)
+    with np.errstate(divide='ignore'):
+        return np.where(answers != 0, 1. / answers, 0.)
+
+
+def build_weights():
+    """Build the weights of the questions of all electrification options in the RISE scores.
+
+    :return: the weights matrix with one row per question and one column per option, a question
+    answered with yes weighs 100 / (number of groups * number of questions of its group). The
+    matrix is block diagonal, the questions of an option only count towards its own score.
+    """
+    blocks = []
+    for opt in ELECTRIFICATION_OPTIONS:
+        structure = RISE_SUB_INDICATOR_STRUCTURE[opt]
+        score_count_yes = RISE_SUB_INDICATORS.loc['rise_{}'.format(opt)].score_count_yes.values
+        blocks.append(100. / (len(structure) * score_count_yes))
+
+    weights = np.zeros((sum(len(b) for b in blocks), len(ELECTRIFICATION_OPTIONS)))
+    start = 0
+    for j, block in enumerate(blocks):
+        weights[start:start + len(block), j] = block
+        start = start + len(block)
+    weights.setflags(write=False)
+    return weights
+
+
+WEIGHTS = build_weights()
+
+# columns of the weights matrix and of the answer vectors belonging to each option
+QUESTION_SLICES = {}
+_start = 0
+for _opt in ELECTRIFICATION_OPTIONS:
+    QUESTION_SLICES[_opt] = slice(_start, _start + sum(RISE_SUB_INDICATOR_STRUCTURE[_opt]))
+    _start = QUESTION_SLICES[_opt].stop
+
+
+def _round_scores(scores):
+    # round the scores to 100 if they were 99.999999 due to floating point error
+    scores = np.where(100 - scores < 1e-5, 100., scores)
+    return np.round(scores, 2)
+
+
+def rise_scores(yes_answers):
+    """Compute the RISE scores of all electrification options from the answers to the questions.
+
+    :param yes_answers: array of shape (number of questions,) or (n, number of questions) with
+    1 if a question is answered with yes and 0 otherwise, the questions of the options are in the
+    order of ELECTRIFICATION_OPTIONS and of the columns of QUESTION_SLICES
+    :return: array of shape (3,) or (n, 3) with the RISE scores of grid, mg and shs, NaN answers
+    give a NaN score
+    """
+    return _round_scores(np.asarray(yes_answers, dtype=float).dot(WEIGHTS))
+
+
+def option_rise_scores(opt, yes_answers):
+    """Compute the RISE score of one electrification option from the answers to its questions.
+
+    :param opt: one of the ELECTRIFICATION_OPTIONS
+    :param yes_answers: array of shape (number of questions of opt,) or (n, number of questions
+    of opt) with 1 if a question is answered with yes and 0 otherwise
+    :return: the RISE score, or an array of shape (n,)
+    """
+    weights = WEIGHTS[QUESTION_SLICES[opt], ELECTRIFICATION_OPTIONS.index(opt)]
+    return _round_scores(np.asarray(yes_answers, dtype=float).dot(weights))
+
+
+def yes_answers(answers):
+    """Convert the answers of the csv file to 1 for yes and 0 for no, missing answers stay NaN."""
+    answers = np.asarray(answers, dtype=float)
+    return np.where(np.isnan(answers), np.nan, (answers != 0).astype(float))
+
+
+COUNTRIES, ANSWERS = build_answers(pd.read_csv(RISE_SUB_INDICATOR_SCORES_FILE))
+
+COUNTRY_POSITIONS = {country_iso: i for i, country_iso in enumerate(COUNTRIES)}
+
+
+def country_answers(country_iso, opt):
+    """Return the answers of a country to the questions of an electrification option.
+
+    :param country_iso: iso code of the country
+    :param opt: one of the ELECTRIFICATION_OPTIONS
+    :return: a read-only array, filled with 0 if the country has no answers
+    """
+    if country_iso not in COUNTRY_POSITIONS:
+        return np.zeros(sum(RISE_SUB_INDICATOR_STRUCTURE[opt]))
+    return ANSWERS[opt][COUNTRY_POSITIONS[country_iso]]
+
+
+def country_toggle_values(country_iso, opt):
+    """Return the values of the toggles of the flex page matching the answers of a country."""
+    return toggle_values(country_answers(country_iso, opt)).tolist()
+
+
+def countries_rise_scores():
+    """Compute the RISE scores of all the countries of the RISE sub-indicators file at once.
+
+    :return: DataFrame indexed by country_iso with the RISE_INDICES as columns
+    """
+    answers = np.hstack([yes_answers(ANSWERS[opt]) for opt in ELECTRIFICATION_OPTIONS])
+    return pd.DataFrame(
+        rise_scores(answers),
+        index=pd.Index(COUNTRIES, name='country_iso'),
+        columns=RISE_INDICES
+    )
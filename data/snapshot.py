@@ -0,0 +1,154 @@
+"""Warm-start snapshot of the expensive and deterministic parts of the app's state
+
+The values registered with `cached` (model results, aggregates, encoded images, ...) are saved
+together in a single file by `save`. The file is keyed by a hash of the code, of the data
+files and of the versions of python and of the packages which build or pickle the values, when a
+process boots with the same code, data and packages, the values are restored from the snapshot
+instead of being computed again.
+
+The snapshot is a pickle file, it is only meant to be read by the process which wrote it or by
+another worker of the same deployment.
+
+Environment variables:
+- NDC_SNAPSHOT : set to '0' to disable the snapshot
+- NDC_SNAPSHOT_FILE : path of the snapshot file (default is data/app_snapshot.pkl)
+"""
+import glob
+import hashlib
+import importlib
+import logging
+import os
+import pickle
+import sys
+import threading
+
+SNAPSHOT_ENABLED = os.environ.get('NDC_SNAPSHOT', '1') != '0'
+
+SNAPSHOT_FILE = os.environ.get('NDC_SNAPSHOT_FILE', os.path.join('data', 'app_snapshot.pkl'))
+
+# files whose content determine whether a snapshot is still valid
+SNAPSHOT_SOURCES = [
+    '*.py',
+    os.path.join('app_layouts', '*.py'),
+    os.path.join('app_server', '*.py'),
+    os.path.join('data', '*.py'),
+    os.path.join('data', '*.csv'),
+    os.path.join('assets', '*.png'),
+    os.path.join('icons', '*.png'),
+    os.path.join('logos', '*.png'),
+]
+
+# packages whose versions determine whether a snapshot is still valid, the figures are built by
+# dash and plotly and the frames are pickled by pandas and numpy
+SNAPSHOT_PACKAGES = ['dash', 'plotly', 'pandas', 'numpy']
+
+# files which are written by the app itself and must not invalidate the snapshot
+SNAPSHOT_EXCLUDED = [os.path.join('data', 'bau_results.csv')]
+
+_LOCK = threading.Lock()
+
+_SNAPSHOT = {
+    'key': None,
+    'entries': {},
+    # becomes True when an entry was computed instead of being restored
+    'modified': False,
+    'loaded': False,
+}
+
+
+def snapshot_key(sources=None, packages=None):
+    """Hash the content of the source and data files and the versions of the packages.
+
+    :param sources: list of glob patterns, default is SNAPSHOT_SOURCES
+    :param packages: list of names of packages, default is SNAPSHOT_PACKAGES
+    :return: the hexadecimal sha256 digest of the files' names and contents, of the version of
+    python and of the versions of the packages
+    """
+    if sources is None:
+        sources = SNAPSHOT_SOURCES
+    if packages is None:
+        packages = SNAPSHOT_PACKAGES
+
+    fnames = set()
+    for pattern in sources:
+        fnames.update(glob.glob(pattern))
+    fnames = sorted(fnames - set(SNAPSHOT_EXCLUDED))
+
+    digest = hashlib.sha256()
+    digest.update(sys.version.encode())
+    for package in packages:
+        version = getattr(importlib.import_module(package), '__version__', '')
+        digest.update('{}=={}'.format(package, version).encode())
+    for fname in fnames:
+        digest.update(fname.encode())
+        with open(fname, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _load(fname=SNAPSHOT_FILE):
+    """Restore the entries of the snapshot file if its key matches the current key."""
+    _SNAPSHOT['loaded'] = True
+    _SNAPSHOT['key'] = snapshot_key()
+    if not os.path.exists(fname):
+        return
+    try:
+        with open(fname, 'rb') as f:
+            content = pickle.load(f)
+    except Exception as e:
+        logging.warning('The snapshot {} could not be read: {}'.format(fname, e))
+        return
+
+    if content.get('key') == _SNAPSHOT['key']:
+        _SNAPSHOT['entries'].update(content.get('entries', {}))
+        logging.info('Restored {} entries from the snapshot {}'.format(
+            len(_SNAPSHOT['entries']),
+            fname
+        ))
+    else:
+        logging.info('The snapshot {} is outdated, it will be rebuilt'.format(fname))
+
+
+def cached(name, builder):
+    """Return the value stored in the snapshot under name, or build it.
+
+    :param name: (str) unique name of the value in the snapshot
+    :param builder: function without arguments which computes the value
+    :return: the value
+    """
+    if not SNAPSHOT_ENABLED:
+        return builder()
+
+    with _LOCK:
+        if not _SNAPSHOT['loaded']:
+            _load()
+        if name in _SNAPSHOT['entries']:
+            return _SNAPSHOT['entries'][name]
+
+    value = builder()
+
+    with _LOCK:
+        _SNAPSHOT['entries'][name] = value
+        _SNAPSHOT['modified'] = True
+    return value
+
+
+def save(fname=SNAPSHOT_FILE):
+    """Write the snapshot file if some of its entries were computed by this process."""
+    if not SNAPSHOT_ENABLED:
+        return
+
+    with _LOCK:
+        if not _SNAPSHOT['modified']:
+            return
+        content = {'key': _SNAPSHOT['key'], 'entries': dict(_SNAPSHOT['entries'])}
+        # write in a temporary file first so that other workers never read a partial file
+        tmp_fname = '{}.{}.tmp'.format(fname, os.getpid())
+        try:
+            with open(tmp_fname, 'wb') as f:
+                pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_fname, fname)
+        except OSError as e:
+            logging.warning('The snapshot {} could not be written: {}'.format(fname, e))
+            return
+        _SNAPSHOT['modified'] = False
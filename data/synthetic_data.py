@@ -0,0 +1,186 @@
+"""Synthetic raw data with the schema and the distributions of data/raw_data.csv
+
+The numeric columns are drawn from a Gaussian copula fitted on the real data: each column keeps
+the empirical distribution of its real values (interpolated between them, so the synthetic values
+stay within the real range), and the columns keep the rank correlations of the real data. The
+following constraints of the model are enforced:
+- the population shares of the electrification options sum to 1 (SHARE_GROUPS)
+- pop_2030 is drawn as a growth ratio of pop_2017 (RATIO_COLUMNS)
+- the columns with only integer values give integers, the constant columns stay constant and the
+missing values appear with their real frequency
+
+Each row is attached to a real country of a region which is in BAU_DATA and SHS_SALES_VOLUMES,
+drawn with the frequency of the regions in the real data: the row takes the iso code, the name and
+the other text columns of that country.
+
+The rows are generated and written by chunks, so the size of the output is not limited by the
+memory. Usage, from the root of the repository:
+
+    python -m data.synthetic_data 10000000 data/synthetic_raw_data.csv
+"""
+import numpy as np
+import pandas as pd
+
+from data.data_preparation import BAU_DATA, SHS_SALES_VOLUMES
+
+# groups of columns which sum to 1 in each row
+SHARE_GROUPS = [['pop_grid_share', 'pop_mg_share', 'pop_shs_share']]
+
+# column -> column of which it is drawn as a ratio
+RATIO_COLUMNS = {'pop_2030': 'pop_2017'}
+
+# columns which are copied from the real country of a row
+ID_COLUMNS = ['country_iso', 'region']
+
+CHUNK_ROWS = 100000
+
+
+def read_raw_data(fname='data/raw_data.csv'):
+    """Read the raw data as the model does."""
+    return pd.read_csv(fname, float_precision='high', encoding='latin')
+
+
+def _normal_cdf(z):
+    """Cumulative distribution of the standard normal, with an error below 1e-7."""
+    # Abramowitz and Stegun 7.1.26 approximation of erf
+    x = np.abs(z) / np.sqrt(2)
+    t = 1. / (1. + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741
+                + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1. - poly * np.exp(-x * x)
+    return 0.5 * (1. + np.sign(z) * erf)
+
+
+def _nearest_correlation(corr):
+    """Make a correlation matrix positive definite by clipping its eigenvalues."""
+    values, vectors = np.linalg.eigh(corr)
+    corr = vectors @ np.diag(np.maximum(values, 1e-6)) @ vectors.T
+    scale = np.sqrt(np.diag(corr))
+    return corr / np.outer(scale, scale)
+
+
+def fit_raw_data(df):
+    """Fit the distributions and the correlations of the columns of the raw data.
+
+    :param df: (pandas.DataFrame) raw data
+    :return: a dict with the parameters of the generator
+    """
+    df = df.copy()
+    for col, base in RATIO_COLUMNS.items():
+        df[col] = df[col] / df[base]
+
+    valid_regions = set(BAU_DATA.index) & set(SHS_SALES_VOLUMES.index)
+    templates = df.loc[df.region.isin(valid_regions)].reset_index(drop=True)
+    if templates.empty:
+        raise ValueError('no row of the raw data is in a region of BAU_DATA and SHS_SALES_VOLUMES')
+
+    numeric = [
+        col for col in df.columns
+        if col not in ID_COLUMNS and pd.api.types.is_numeric_dtype(df[col])
+    ]
+    constants = {col: df[col].dropna().iloc[0] for col in numeric if df[col].nunique() == 1}
+    copula = [col for col in numeric if col not in constants and df[col].notna().any()]
+
+    # correlation of the normal variables which have the rank correlations of the columns
+    spearman = df[copula].corr(method='spearman').fillna(0).values
+    np.fill_diagonal(spearman, 1)
+    corr = _nearest_correlation(2 * np.sin(np.pi * spearman / 6))
+
+    region_counts = templates.region.value_counts(sort=False)
+    return dict(
+        columns=list(df.columns),
+        copula=copula,
+        constants=constants,
+        all_nan=[col for col in numeric if df[col].isna().all()],
+        quantiles={col: np.sort(df[col].dropna().values) for col in copula},
+        nan_rates={col: df[col].isna().mean() for col in copula},
+        integers=[
+            col for col in copula if np.all(np.mod(df[col].dropna().values, 1) == 0)
+        ],
+        cholesky=np.linalg.cholesky(corr),
+        templates=templates[[col for col in df.columns if col not in numeric]],
+        region_weights=region_counts / region_counts.sum(),
+    )
+
+
+def sample_raw_data(model, n_rows, rng):
+    """Draw rows of synthetic raw data.
+
+    :param model: output of `fit_raw_data`
+    :param n_rows: (int) number of rows
+    :param rng: (numpy.random.Generator) source of randomness
+    :return: a DataFrame with the columns of the raw data
+    """
+    # text columns from a real country of a region drawn with its real frequency
+    regions = rng.choice(
+        model['region_weights'].index.values,
+        size=n_rows,
+        p=model['region_weights'].values
+    )
+    templates = model['templates']
+    rows = np.empty(n_rows, dtype=int)
+    for region in np.unique(regions):
+        selected = regions == region
+        candidates = np.flatnonzero(templates.region.values == region)
+        rows[selected] = rng.choice(candidates, size=selected.sum())
+    df = templates.iloc[rows].reset_index(drop=True)
+
+    # numeric columns from the gaussian copula
+    z = rng.standard_normal((n_rows, len(model['copula']))) @ model['cholesky'].T
+    u = _normal_cdf(z)
+    for j, col in enumerate(model['copula']):
+        quantiles = model['quantiles'][col]
+        levels = (np.arange(len(quantiles)) + 0.5) / len(quantiles)
+        values = np.interp(u[:, j], levels, quantiles)
+        if col in model['integers']:
+            values = np.round(values)
+        if model['nan_rates'][col] > 0:
+            values[rng.random(n_rows) < model['nan_rates'][col]] = np.nan
+        df[col] = values
+    for col, value in model['constants'].items():
+        df[col] = value
+    for col in model['all_nan']:
+        df[col] = np.nan
+
+    for group in SHARE_GROUPS:
+        if all(col in df.columns for col in group):
+            total = df[group].sum(axis=1)
+            df[group] = df[group].div(total.where(total > 0), axis=0).fillna(1. / len(group))
+    for col, base in RATIO_COLUMNS.items():
+        if col in df.columns:
+            df[col] = df[col] * df[base]
+
+    return df[model['columns']]
+
+
+def generate_raw_data(df, n_rows, fname, chunk_rows=CHUNK_ROWS, seed=0):
+    """Write synthetic raw data fitted on real raw data to a csv file, by chunks of rows.
+
+    :param df: (pandas.DataFrame) real raw data
+    :param n_rows: (int) number of rows to write
+    :param fname: (str) path of the csv file
+    :param chunk_rows: (int) number of rows generated and written at once
+    :param seed: (int) seed of the random generator
+    """
+    model = fit_raw_data(df)
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_rows, chunk_rows):
+        chunk = sample_raw_data(model, min(chunk_rows, n_rows - start), rng)
+        chunk.to_csv(fname, index=False, mode='w' if start == 0 else 'a', header=start == 0)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Write synthetic raw data with the distributions of the real raw data'
+    )
+    parser.add_argument('n_rows', type=int, help='number of rows')
+    parser.add_argument('output', help='path of the csv file')
+    parser.add_argument('--input', default='data/raw_data.csv', help='real raw data csv file')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generate_raw_data(read_raw_data(args.input), args.n_rows, args.output, args.chunk_rows,
+                      args.seed)
@@ -0,0 +1,29 @@
+"""Configuration of gunicorn for the app, see wsgi.py
+
+Environment variables:
+- NDC_BIND : address to listen to (default is 0.0.0.0:8050)
+- NDC_WORKERS : number of worker processes (default is 4)
+- NDC_THREADS : number of threads serving the requests in each worker (default is 1), with more
+than one thread the cheap callbacks are served while the heavy ones wait for the compute pool (see
+app_server/compute_pool.py)
+"""
+import os
+
+bind = os.environ.get('NDC_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('NDC_WORKERS', 4))
+threads = int(os.environ.get('NDC_THREADS', 1))
+
+# load the app, and thus compute the model, in the master before forking the workers
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Log the memory of each worker once it is forked."""
+    from app_server.memory import memory_report, format_memory_report
+    server.log.info('Worker memory: {}'.format(format_memory_report(memory_report())))
+
+
+def when_ready(server):
+    """Log the memory of the master process once all the workers are started."""
+    from app_server.memory import memory_report, format_memory_report
+    server.log.info('Master memory: {}'.format(format_memory_report(memory_report())))
@@ -1,9 +1,22 @@
+import uuid
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 
 from app_main import app, server, URL_BASEPATH, LOGOS, HDR_LOGO
-from app_layouts import intro_layout, static_layout, flex_layout
+from app_layouts import intro_layout, static_layout, flex_layout, results_tables
+from app_server import (
+    memory,
+    images,
+    compression,
+    export,
+    api,
+    compute_pool,
+    metrics,
+    profiling,
+)
+from data import snapshot, rise_impacts
 
 server = server
 
@@ -12,6 +25,8 @@ app.layout = html.Div(
     className='grid-x app_style',
     children=[
         dcc.Location(id='url', refresh=False),
+        # id of the page load, kept in memory as a duplicated tab copies the session storage
+        dcc.Store(id='session-store', storage_type='memory'),
         html.Div(
             id='header-div',
             className='cell header header_style',
@@ -45,7 +60,7 @@ app.layout = html.Div(
                     className='show-for-large',
                     children=html.Img(
                         className='hdr__logo',
-                        src='data:image/png;base64,{}'.format(HDR_LOGO.decode())
+                        src=HDR_LOGO
 
                     )
                 ),
@@ -53,7 +68,7 @@ app.layout = html.Div(
                     className='hide-for-large',
                     children=html.Img(
                         className='hdr__logo__small',
-                        src='data:image/png;base64,{}'.format(HDR_LOGO.decode())
+                        src=HDR_LOGO
 
                     )
                 )
@@ -73,7 +88,7 @@ app.layout = html.Div(
                 html.Div(
                     className='footer-logo',
                     children=html.Img(
-                        src='data:image/png;base64,{}'.format(logo.decode()),
+                        src=logo,
                     )
                 )
                 for logo in LOGOS
@@ -86,6 +101,15 @@ app.layout = html.Div(
 static_layout.callbacks(app)
 flex_layout.callbacks(app)
 
+# define the server routes
+memory.routes(server)
+images.routes(server)
+compression.routes(server)
+export.routes(server)
+api.routes(server)
+compute_pool.routes(server)
+metrics.routes(server)
+
 
 @app.callback(
     Output('page-content', 'children'),
@@ -124,5 +148,33 @@ def display_page(pathname, cur_style):
     return cur_style
 
 
+@app.callback(
+    Output('session-store', 'data'),
+    [Input('url', 'pathname')],
+    [State('session-store', 'data')]
+)
+def set_session_id(pathname, session_id):
+    """Give an id to the page when the app is loaded, before the sliders can be used"""
+    if session_id is not None:
+        raise PreventUpdate
+    return uuid.uuid4().hex
+
+
+# record the metrics of all the callbacks, once they are all registered, and profile a sample of
+# their calls if NDC_PROFILE_DIR is set
+profiling.instrument(app)
+metrics.instrument(app)
+
+# index the results tables of all countries and regions, draw the maps, rank the impacts of
+# the RISE sub-indicators and compress the static files
+results_tables.warm_up()
+static_layout.warm_up_maps()
+rise_impacts.warm_up()
+compression.precompress_static()
+
+# save the expensive parts of the app's state for the next workers to boot
+snapshot.save()
+
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,50 @@
+import unittest
+
+from data.data_preparation import MIN_TIER_LEVEL, POP_GET, INVEST, GHG
+from app_server.api import parse_query
+
+
+class TestApiQueries(unittest.TestCase):
+
+    def test_default_query(self):
+        query = parse_query({'scenario': 'uea', 'regions': ['AF']})
+        self.assertEqual(query['min_tier_level'], MIN_TIER_LEVEL)
+        self.assertEqual(query['columns'], POP_GET + INVEST + GHG)
+        self.assertEqual(query['rise'], {})
+
+    def test_same_query_gives_same_canonical_form(self):
+        self.assertEqual(
+            parse_query({'scenario': 'uea', 'regions': ['AF', 'AS'], 'rise': {'rise_mg': 50}}),
+            parse_query(
+                {'scenario': 'uea', 'regions': ['AS', 'AF', 'AS'], 'rise': {'rise_mg': 50.0}}
+            )
+        )
+
+    def test_prog_query_accepts_the_grid_score_only(self):
+        query = parse_query({'scenario': 'prog', 'regions': ['AF'], 'rise': {'rise_grid': 50}})
+        self.assertEqual(query['rise'], {'rise_grid': 50.0})
+
+    def test_invalid_queries_are_rejected(self):
+        for query in [
+            'uea',
+            {'scenario': 'foo', 'regions': ['AF']},
+            {'scenario': 'uea', 'regions': ['AF'], 'min_tier_level': 9},
+            {'scenario': 'uea', 'regions': ['AF'], 'min_tier_level': [3]},
+            {'scenario': 'uea', 'regions': ['AF'], 'min_tier_level': 3.0},
+            {'scenario': 'uea', 'regions': ['AF'], 'min_tier_level': True},
+            {'scenario': 'uea', 'regions': 'AF'},
+            {'scenario': 'uea', 'regions': ['ZZ']},
+            {'scenario': 'uea'},
+            {'scenario': 'bau', 'regions': ['AF'], 'rise': {'rise_mg': 50}},
+            {'scenario': 'prog', 'regions': ['AF'], 'rise': {'rise_mg': 50}},
+            {'scenario': 'prog', 'regions': ['AF'], 'rise': {'rise_shs': 50}},
+            {'scenario': 'uea', 'regions': ['AF'], 'rise': {'rise_foo': 50}},
+            {'scenario': 'uea', 'regions': ['AF'], 'rise': {'rise_mg': 150}},
+            {'scenario': 'uea', 'regions': ['AF'], 'columns': ['NOPE']},
+        ]:
+            with self.assertRaises(ValueError):
+                parse_query(query)
+
+
+if __name__ == '__main__':
+    unittest.main()
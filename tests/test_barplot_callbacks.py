@@ -0,0 +1,43 @@
+import unittest
+
+from dash.exceptions import PreventUpdate
+
+from data.data_preparation import POP_RES
+from app_layouts.app_components import BARPLOT_YAXIS_OPT
+from app_layouts.static_layout import country_barplot_callback
+
+
+class _App(object):
+    """Registers the callbacks without a dash app."""
+
+    def callback(self, *args, **kwargs):
+        return lambda func: func
+
+
+def _figure(title):
+    return {
+        'data': [{'type': 'bar', 'name': opt} for opt in BARPLOT_YAXIS_OPT[POP_RES]],
+        'layout': {'title': title},
+    }
+
+
+class TestBarplotCallbacks(unittest.TestCase):
+
+    def test_figure_of_the_session_is_updated(self):
+        update_barplot = country_barplot_callback(_App(), POP_RES)
+        first = update_barplot('AGO', None, _figure('A'))
+        second = update_barplot('AGO', None, _figure('B'))
+        self.assertEqual(first['layout']['title'], 'A')
+        self.assertEqual(second['layout']['title'], 'B')
+        self.assertIsNot(first, second)
+        self.assertEqual(list(first['data'][0]['y']), list(second['data'][0]['y']))
+
+    def test_no_selection_does_not_update(self):
+        update_barplot = country_barplot_callback(_App(), POP_RES)
+        update_barplot('AGO', None, _figure('A'))
+        with self.assertRaises(PreventUpdate):
+            update_barplot(None, None, _figure('B'))
+
+
+if __name__ == '__main__':
+    unittest.main()
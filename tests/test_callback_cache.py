@@ -0,0 +1,31 @@
+import unittest
+
+from app_layouts.callback_cache import memoize_callback, cache_stats
+from app_server.keys import canonical_key
+
+
+class TestCallbackCache(unittest.TestCase):
+
+    def test_canonical_key_ignores_dict_order(self):
+        self.assertEqual(
+            canonical_key(['FRA', {'a': 1, 'b': 2}]),
+            canonical_key(['FRA', {'b': 2, 'a': 1}])
+        )
+        self.assertNotEqual(canonical_key(['FRA', 'uea']), canonical_key(['FRA', 'bau']))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        calls = []
+
+        @memoize_callback('test-lru', maxsize=2)
+        def update_table(country_iso):
+            calls.append(country_iso)
+            return country_iso
+
+        for country_iso in ['FRA', 'DEU', 'FRA', 'ITA', 'FRA', 'DEU']:
+            update_table(country_iso)
+        self.assertEqual(calls, ['FRA', 'DEU', 'ITA', 'DEU'])
+        self.assertEqual(cache_stats()['test-lru']['size'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
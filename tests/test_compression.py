@@ -0,0 +1,49 @@
+import gzip
+import unittest
+
+from flask import Flask, jsonify
+
+from app_server import compression
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        server = Flask(__name__)
+        compression.routes(server)
+
+        @server.route('/small')
+        def small():
+            return jsonify(x=1)
+
+        @server.route('/large')
+        def large():
+            return jsonify(x=list(range(5000)))
+
+        self.client = server.test_client()
+
+    def test_large_response_is_compressed(self):
+        response = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(
+            gzip.decompress(response.data),
+            self.client.get('/large', headers={'Accept-Encoding': 'identity'}).data
+        )
+
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_response_is_not_compressed_if_not_accepted(self):
+        response = self.client.get('/large', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_bytes_saved_are_counted(self):
+        before = compression.compression_stats().get('gzip', {}).get('bytes_saved', 0)
+        self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertGreater(compression.compression_stats()['gzip']['bytes_saved'], before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app_server import compute_pool
+from app_server.compute_pool import run_job, ComputePoolBusy, ComputeTimeout
+
+
+def _wait(event):
+    event.wait(5)
+    return 'done'
+
+
+class TestComputePool(unittest.TestCase):
+
+    def setUp(self):
+        # a new pool with one worker and one waiting place for each test
+        patcher = mock.patch.multiple(
+            compute_pool,
+            COMPUTE_POOL='thread',
+            COMPUTE_WORKERS=1,
+            COMPUTE_QUEUE=1,
+            _POOL={}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_job_returns_the_output_of_the_function(self):
+        self.assertEqual(run_job(sum, [1, 2, 3]), 6)
+
+    def test_nested_job_runs_in_the_thread_of_its_parent(self):
+        self.assertEqual(run_job(run_job, sum, [1, 2]), 3)
+
+    def test_full_pool_fails_at_once(self):
+        event = threading.Event()
+        self.addCleanup(event.set)
+        requests = [
+            threading.Thread(target=run_job, args=(_wait, event)) for _ in range(2)
+        ]
+        for request in requests:
+            request.start()
+        time.sleep(0.1)
+
+        start = time.monotonic()
+        with self.assertRaises(ComputePoolBusy):
+            run_job(sum, [1])
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        event.set()
+        for request in requests:
+            request.join()
+        # the places are freed once the jobs are done
+        self.assertEqual(run_job(sum, [1]), 1)
+
+    def test_job_over_its_timeout_fails(self):
+        event = threading.Event()
+        self.addCleanup(event.set)
+        with self.assertRaises(ComputeTimeout):
+            run_job(_wait, event, timeout=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
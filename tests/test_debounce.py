@@ -0,0 +1,47 @@
+import threading
+import time
+import unittest
+from dash.exceptions import PreventUpdate
+
+from app_layouts.debounce import latest_only, debounce_stats, new_request, is_superseded
+
+
+class TestDebounce(unittest.TestCase):
+
+    def test_only_the_latest_request_of_a_session_is_computed(self):
+        calls = []
+        outputs = []
+
+        def request(value):
+            try:
+                outputs.append(latest_only('session-a', lambda: calls.append(value) or value, 0.2))
+            except PreventUpdate:
+                pass
+
+        before = debounce_stats()
+        threads = [threading.Thread(target=request, args=(value,)) for value in range(5)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, [4])
+        self.assertEqual(outputs, [4])
+        after = debounce_stats()
+        self.assertEqual(after['completed'] - before['completed'], 1)
+        self.assertEqual(after['cancelled'] - before['cancelled'], 4)
+
+    def test_sessions_do_not_supersede_each_other(self):
+        sequence = new_request('session-b')
+        new_request('session-c')
+        self.assertFalse(is_superseded('session-b', sequence))
+        new_request('session-b')
+        self.assertTrue(is_superseded('session-b', sequence))
+
+    def test_request_without_session_is_always_computed(self):
+        self.assertEqual(latest_only(None, lambda: 'FRA'), 'FRA')
+
+
+if __name__ == '__main__':
+    unittest.main()
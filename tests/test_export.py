@@ -0,0 +1,41 @@
+import unittest
+
+from data.data_preparation import SCENARIOS, MIN_TIER_LEVEL, POP_GET, INVEST, EXO_RESULTS
+from app_server.export import parse_export_parameters
+
+
+class TestExportParameters(unittest.TestCase):
+
+    def test_default_parameters(self):
+        params = parse_export_parameters({})
+        self.assertEqual(params['scenarios'], SCENARIOS)
+        self.assertEqual(params['min_tier_levels'], [MIN_TIER_LEVEL])
+        self.assertEqual(params['columns'], EXO_RESULTS)
+        self.assertEqual(params['format'], 'csv')
+
+    def test_groups_of_columns_are_merged(self):
+        params = parse_export_parameters({'columns': 'POP_GET,INVEST,POP_GET'})
+        self.assertEqual(params['columns'], POP_GET + INVEST)
+
+    def test_same_selection_gives_same_parameters(self):
+        self.assertEqual(
+            parse_export_parameters({'countries': 'KEN,AGO', 'regions': 'AF'}),
+            parse_export_parameters({'countries': 'AGO, KEN,AGO', 'regions': 'AF'})
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        for args in [
+            {'scenarios': 'foo'},
+            {'min_tier_levels': 'high'},
+            {'min_tier_levels': '9'},
+            {'regions': 'ZZ'},
+            {'countries': 'ZZZ'},
+            {'columns': 'NOPE'},
+            {'format': 'xls'},
+        ]:
+            with self.assertRaises(ValueError):
+                parse_export_parameters(args)
+
+
+if __name__ == '__main__':
+    unittest.main()
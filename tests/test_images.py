@@ -0,0 +1,39 @@
+import unittest
+
+from flask import Flask
+
+from app_server import images
+
+
+class TestImages(unittest.TestCase):
+
+    def setUp(self):
+        server = Flask(__name__)
+        images.routes(server)
+        self.client = server.test_client()
+
+    def test_image_is_cached_by_the_browser(self):
+        url = images.image_url('icons/information.png')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response.headers['Cache-Control'])
+
+        response = self.client.get(url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_outdated_url_is_redirected(self):
+        response = self.client.get('/images/outdated/icons/information.png')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            response.headers['Location'].endswith(images.image_url('icons/information.png'))
+        )
+
+    def test_only_images_are_served(self):
+        self.assertEqual(self.client.get('/images/x/data/raw_data.csv').status_code, 404)
+        self.assertEqual(self.client.get('/images/x/icons/../app_main.py').status_code, 404)
+        with self.assertRaises(ValueError):
+            images.image_url('data/raw_data.csv')
+
+
+if __name__ == '__main__':
+    unittest.main()
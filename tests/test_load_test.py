@@ -0,0 +1,40 @@
+import unittest
+
+from app_server.load_test import parse_output, components, percentile
+
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_outputs_of_callbacks(self):
+        self.assertEqual(parse_output('flex-store.data'), [('flex-store', 'data')])
+        self.assertEqual(
+            parse_output('..view-store.data...maps-div.style..'),
+            [('view-store', 'data'), ('maps-div', 'style')]
+        )
+
+    def test_components_of_a_layout(self):
+        layout = {
+            'type': 'Div',
+            'namespace': 'dash_html_components',
+            'props': {
+                'id': 'page',
+                'children': [
+                    {'type': 'Dropdown', 'props': {'id': 'region-input', 'value': 'WD'}},
+                    {'type': 'Div', 'props': {'children': 'no id'}},
+                ],
+            },
+        }
+        found = components(layout)
+        self.assertEqual(sorted(found), ['page', 'region-input'])
+        self.assertEqual(found['region-input']['value'], 'WD')
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
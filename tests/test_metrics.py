@@ -0,0 +1,63 @@
+import unittest
+from unittest import mock
+from dash.exceptions import PreventUpdate
+
+from app_server import metrics
+
+
+class _App(object):
+    """Registry of callbacks as in dash.Dash."""
+
+    def __init__(self, callbacks):
+        self.callback_map = {output: {'callback': func} for output, func in callbacks.items()}
+
+
+def _prevent():
+    raise PreventUpdate
+
+
+def _fail():
+    raise ValueError('no data')
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(metrics._METRICS, {'callbacks': [], 'values': None})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.app = _App({
+            'country-input.options': lambda: '{"response": {}}',
+            'flex-store.data': _prevent,
+            '..maps-div.style...view-store.data..': _fail,
+        })
+        metrics.instrument(self.app)
+
+    def test_calls_are_recorded_per_callback(self):
+        self.app.callback_map['country-input.options']['callback']()
+        self.app.callback_map['country-input.options']['callback']()
+        with self.assertRaises(PreventUpdate):
+            self.app.callback_map['flex-store.data']['callback']()
+        with self.assertRaises(ValueError):
+            self.app.callback_map['..maps-div.style...view-store.data..']['callback']()
+
+        answer = metrics.callback_metrics()
+        self.assertEqual(answer['country-input.options']['calls'], 2)
+        self.assertEqual(answer['country-input.options']['response_bytes'], 32)
+        self.assertEqual(answer['country-input.options']['buckets'][-1], (float('inf'), 2))
+        self.assertEqual(answer['flex-store.data']['prevented'], 1)
+        self.assertEqual(answer['..maps-div.style...view-store.data..']['exceptions'], 1)
+
+    def test_prometheus_text(self):
+        self.app.callback_map['country-input.options']['callback']()
+        text = metrics.metrics_text()
+        self.assertIn('ndc_callback_calls_total{callback="country-input.options"} 1\n', text)
+        self.assertIn(
+            'ndc_callback_latency_seconds_bucket{callback="country-input.options",le="+Inf"} 1\n',
+            text
+        )
+        self.assertIn('# TYPE ndc_callback_latency_seconds histogram\n', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
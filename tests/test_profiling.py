@@ -0,0 +1,64 @@
+import os
+import pstats
+import tempfile
+import unittest
+from unittest import mock
+
+from app_server import compute_pool, profiling
+
+
+class _App(object):
+    """Registry of callbacks as in dash.Dash."""
+
+    def __init__(self, callbacks):
+        self.callback_map = {output: {'callback': func} for output, func in callbacks.items()}
+
+
+def _update_table(country_iso):
+    return '{{"response": "{}"}}'.format(country_iso)
+
+
+def _compute_results(country_iso):
+    return {'country_iso': country_iso}
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_disabled_profiling_does_not_wrap_the_callbacks(self):
+        app = _App({'table.data': _update_table})
+        with mock.patch.object(profiling, 'PROFILE_DIR', None):
+            profiling.instrument(app)
+        self.assertIs(app.callback_map['table.data']['callback'], _update_table)
+
+    def test_sampled_calls_are_saved(self):
+        app = _App({'..table.data...table.columns..': _update_table})
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.multiple(profiling, PROFILE_DIR=directory, PROFILE_RATE=1.):
+                profiling.instrument(app)
+                answer = app.callback_map['..table.data...table.columns..']['callback']('FRA')
+            self.assertEqual(answer, _update_table('FRA'))
+            fnames = os.listdir(directory)
+            self.assertEqual(len(fnames), 1)
+            self.assertTrue(fnames[0].startswith('table_data_table_columns-'))
+            stats = pstats.Stats(os.path.join(directory, fnames[0]))
+            self.assertTrue(any(f[2] == '_update_table' for f in stats.stats))
+
+    def test_jobs_of_a_profiled_call_are_recorded(self):
+
+        def update_figure(country_iso):
+            return compute_pool.run_job(_compute_results, country_iso)
+
+        app = _App({'figure.data': update_figure})
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.multiple(profiling, PROFILE_DIR=directory, PROFILE_RATE=1.), \
+                    mock.patch.object(compute_pool, 'COMPUTE_POOL', 'thread'):
+                profiling.instrument(app)
+                answer = app.callback_map['figure.data']['callback']('FRA')
+            self.assertEqual(answer, _compute_results('FRA'))
+            fname = os.path.join(directory, os.listdir(directory)[0])
+            stats = pstats.Stats(fname)
+            self.assertTrue(any(f[2] == '_compute_results' for f in stats.stats))
+
+
+if __name__ == '__main__':
+    unittest.main()
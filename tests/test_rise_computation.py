@@ -26,6 +26,7 @@ from data.data_preparation import (
     RISE_INDICES,
     compute_ndc_results_from_raw_data,
     compute_rise_shifts,
+    compute_all_rise_shifts,
     prepare_scenario_data,
     extract_results_scenario
 )
@@ -53,6 +54,21 @@ class TestRise(unittest.TestCase):
                 pop_shift = compute_rise_shifts(rise, pop_get, opt)
                 self.assertEqual(pop_shift, 0.0)
 
+    def test_all_rise_shifts_match_rise_shifts(self):
+        rng = np.random.RandomState(0)
+        rise = rng.randint(0, 101, size=(200, 3))
+        # some rows with equal scores
+        rise[:20] = rng.randint(0, 3, size=(20, 3)) * 50
+        pop_get = rng.uniform(0, 1e7, size=(200, 3))
+        shifts = compute_all_rise_shifts(rise, pop_get)
+        for i in range(200):
+            for j, opt in enumerate(ELECTRIFICATION_OPTIONS):
+                self.assertAlmostEqual(
+                    shifts[i, j],
+                    compute_rise_shifts(rise[i], pop_get[i], opt),
+                    places=6
+                )
+
     def test_grid_compute_rise_recreates_uea(self):
         df = pd.read_json(SCENARIOS_DATA[SE4ALL_SCENARIO]).set_index('country_iso')
         for iso in df.index:
@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from data.data_preparation import (
+    ELECTRIFICATION_OPTIONS,
+    RISE_INDICES,
+    RISE_SUB_INDICATOR_STRUCTURE,
+)
+from data.rise_sub_indicators import (
+    question_columns,
+    build_answers,
+    toggle_values,
+    rise_scores,
+    option_rise_scores,
+    countries_rise_scores,
+    QUESTION_SLICES,
+)
+
+
+class TestRiseSubIndicators(unittest.TestCase):
+
+    def test_answers_are_aligned_with_the_toggles(self):
+        rows = []
+        for opt in ELECTRIFICATION_OPTIONS:
+            for i, (sub_group, q) in enumerate(question_columns(opt)):
+                rows.append(('AAA', 'rise_{}'.format(opt), sub_group, i + 1))
+        # the second country answered none of the questions
+        rows.append(('BBB', 'rise_other', 'other', 1))
+        scores = pd.DataFrame(
+            rows,
+            columns=['country_iso', 'indicator', 'sub_indicator_group', 'value']
+        )
+        countries, answers = build_answers(scores)
+        self.assertEqual(countries, ['AAA', 'BBB'])
+        for opt in ELECTRIFICATION_OPTIONS:
+            n = sum(RISE_SUB_INDICATOR_STRUCTURE[opt])
+            self.assertEqual(answers[opt].shape, (2, n))
+            np.testing.assert_array_equal(answers[opt][0], np.arange(1, n + 1))
+            np.testing.assert_array_equal(answers[opt][1], np.zeros(n))
+
+    def test_toggle_values_are_inverse_of_answers(self):
+        np.testing.assert_array_equal(toggle_values([2, 0, 4]), [0.5, 0, 0.25])
+
+    def test_all_yes_gives_full_scores(self):
+        n = sum(sum(structure) for structure in RISE_SUB_INDICATOR_STRUCTURE.values())
+        np.testing.assert_array_equal(rise_scores(np.ones(n)), [100, 100, 100])
+        np.testing.assert_array_equal(rise_scores(np.zeros((2, n))), np.zeros((2, 3)))
+
+    def test_scores_of_one_option_match_the_scores_of_all_options(self):
+        rng = np.random.RandomState(0)
+        n = sum(sum(structure) for structure in RISE_SUB_INDICATOR_STRUCTURE.values())
+        answers = rng.randint(0, 2, size=(50, n))
+        scores = rise_scores(answers)
+        for j, opt in enumerate(ELECTRIFICATION_OPTIONS):
+            np.testing.assert_array_equal(
+                option_rise_scores(opt, answers[:, QUESTION_SLICES[opt]]),
+                scores[:, j]
+            )
+
+    def test_scores_reproduce_the_published_rise_scores(self):
+        published = pd.read_csv(
+            'data/raw_data.csv',
+            float_precision='high',
+            encoding='latin'
+        ).set_index('country_iso')[RISE_INDICES]
+        scores = countries_rise_scores().dropna()
+        countries = scores.index.intersection(published.index)
+        self.assertGreater(len(countries), 0)
+        # the published scores are rounded to 2 decimals
+        np.testing.assert_allclose(
+            scores.loc[countries].values,
+            published.loc[countries].values,
+            atol=0.01
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from data.data_preparation import BAU_DATA, SHS_SALES_VOLUMES
+from data.synthetic_data import (
+    SHARE_GROUPS,
+    fit_raw_data,
+    generate_raw_data,
+    read_raw_data,
+    sample_raw_data,
+)
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.raw_df = read_raw_data()
+        cls.model = fit_raw_data(cls.raw_df)
+
+    def test_same_columns_as_raw_data(self):
+        df = sample_raw_data(self.model, 1000, np.random.default_rng(0))
+        self.assertEqual(list(df.columns), list(self.raw_df.columns))
+        self.assertEqual(len(df.index), 1000)
+
+    def test_rows_are_valid(self):
+        df = sample_raw_data(self.model, 1000, np.random.default_rng(0))
+        self.assertTrue(df.region.isin(BAU_DATA.index).all())
+        self.assertTrue(df.region.isin(SHS_SALES_VOLUMES.index).all())
+        self.assertTrue(df.country_iso.isin(self.raw_df.country_iso).all())
+        for group in SHARE_GROUPS:
+            np.testing.assert_allclose(df[group].sum(axis=1), 1)
+
+    def test_values_are_in_the_range_of_the_raw_data(self):
+        df = sample_raw_data(self.model, 1000, np.random.default_rng(0))
+        for col in self.model['copula']:
+            if col in sum(SHARE_GROUPS, ['pop_2030']):
+                continue
+            self.assertGreaterEqual(df[col].min(), self.raw_df[col].min(), col)
+            self.assertLessEqual(df[col].max(), self.raw_df[col].max(), col)
+
+    def test_chunks_are_written_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fname = os.path.join(directory, 'raw_data.csv')
+            generate_raw_data(self.raw_df, 250, fname, chunk_rows=100, seed=1)
+            df = pd.read_csv(fname)
+        self.assertEqual(len(df.index), 250)
+        self.assertEqual(list(df.columns), list(self.raw_df.columns))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+"""WSGI entry point to serve the app with several workers
+
+The model results are computed in the master process before the workers are forked, the workers
+then share the memory pages of the results store (see data/results_store.py) instead of each
+computing and holding their own copy. Use it with a server which loads the app before forking:
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+"""
+import gc
+
+from data import results_store
+
+results_store.warm_up()
+
+from index import server  # noqa: E402
+
+# move the objects created so far to the permanent generation: the garbage collector of the
+# workers then never writes in their memory pages, which would make copies of these pages
+gc.collect()
+if hasattr(gc, 'freeze'):
+    gc.freeze()